@@ -1,56 +1,100 @@
+from flask import current_app
 from app.models.risk_zone import RiskZone
-from geopy.distance import geodesic
-import json
+from app.services.risk_zone_index import RiskZoneIndex
+import threading
+import time
 
 class GeofencingService:
+    def __init__(self, refresh_interval=60):
+        # Active risk zones, loaded lazily from the database and kept up to
+        # date incrementally: every refresh_interval seconds, zones added or
+        # updated since the last load are re-indexed, and zones deleted
+        # outright (rather than deactivated) are dropped.
+        self.index = RiskZoneIndex()
+        self.refresh_interval = refresh_interval
+        self._loaded_until = None
+        self._next_refresh = 0.0
+        self._lock = threading.RLock()
+
     def check_geofence_violations(self, tourist_id, latitude, longitude):
-        # A simple geofencing check. For a hackathon, you can
-        # simulate this with dummy data. For a real app, you would
-        # use a spatial database and complex geometry checks.
-        
-        # This is a mock implementation to show the concept.
-        # In a real scenario, you'd fetch real risk zones from the database.
-        
-        # Example: a risk zone around Kaziranga National Park
-        kaziranga_center = (26.5775, 93.1711)
-        current_location = (latitude, longitude)
-        
-        if geodesic(current_location, kaziranga_center).km < 5:
-            return [{
-                'zone_id': 'kaziranga_01',
-                'zone_name': 'Kaziranga National Park',
-                'alert_message': 'You are entering a wildlife zone. Be cautious!',
-                'violation_type': 'entered'
-            }]
-        
-        return []
+        self.refresh_risk_zones()
+
+        with self._lock:
+            zones = self.index.zones_containing(latitude, longitude)
+
+        return [{
+            'zone_id': zone.id,
+            'zone_name': zone.name,
+            'zone_type': zone.zone_type,
+            'risk_level': zone.risk_level,
+            'alert_message': zone.description or f'You are entering a {zone.zone_type} zone: {zone.name}. Be cautious!',
+            'violation_type': 'entered'
+        } for zone in sorted(zones, key=lambda zone: -zone.risk_level)]
 
     def get_nearby_risk_zones(self, latitude, longitude, radius_km):
-        # This is a mock implementation. For a real app, this would
-        # query the database for all risk zones within the given radius.
-        
-        # Example: a sample risk zone as a GeoJSON polygon
-        sample_zone_geojson = {
-            "type": "Polygon",
-            "coordinates": [
-                [
-                    [91.725, 26.155],
-                    [91.735, 26.155],
-                    [91.735, 26.165],
-                    [91.725, 26.165],
-                    [91.725, 26.155]
-                ]
-            ]
-        }
-        
-        # Create a mock RiskZone object
-        sample_zone = RiskZone(
-            id='mock-zone-01',
-            name='Mock Restricted Area',
-            zone_type='restricted',
-            coordinates=sample_zone_geojson,
-            risk_level=4,
-            description='A mock restricted zone for demo purposes.'
-        )
-        
-        return [sample_zone]
\ No newline at end of file
+        self.refresh_risk_zones()
+
+        with self._lock:
+            return [zone for zone, _ in self.index.zones_within(latitude, longitude, radius_km)]
+
+    def add_or_update_zone(self, zone):
+        """Index a new or changed zone right away (inactive zones are removed)"""
+        with self._lock:
+            if zone.is_active is False:
+                self.index.remove(zone.id)
+            else:
+                self.index.upsert(_detached_copy(zone))
+
+    def remove_zone(self, zone_id):
+        with self._lock:
+            self.index.remove(zone_id)
+
+    def refresh_risk_zones(self, force=False):
+        """Index zones added or updated since the last refresh"""
+        now = time.monotonic()
+        if not force and now < self._next_refresh:
+            return
+
+        with self._lock:
+            query = RiskZone.query
+            if self._loaded_until is not None:
+                # >= so zones committed with the same timestamp aren't missed; re-indexing is harmless
+                query = query.filter(RiskZone.updated_at >= self._loaded_until)
+
+            for zone in query.all():
+                try:
+                    self.add_or_update_zone(zone)
+                except (KeyError, TypeError, ValueError) as e:
+                    current_app.logger.warning(f"Skipping risk zone {zone.id} with invalid coordinates: {e}")
+
+                if zone.updated_at and (self._loaded_until is None or zone.updated_at > self._loaded_until):
+                    self._loaded_until = zone.updated_at
+
+            # Hard deletes leave no updated_at to find, so compare ids instead
+            existing = {zone_id for zone_id, in RiskZone.query.with_entities(RiskZone.id).all()}
+            for zone_id in self.index.zone_ids():
+                if zone_id not in existing:
+                    self.index.remove(zone_id)
+
+            self._next_refresh = now + self.refresh_interval
+
+    def rebuild_risk_zones(self):
+        """Reload every zone from scratch"""
+        with self._lock:
+            self.index.clear()
+            self._loaded_until = None
+            self.refresh_risk_zones(force=True)
+
+def _detached_copy(zone):
+    # The index outlives the request's database session, so keep a transient
+    # copy rather than the session-bound instance
+    return RiskZone(
+        id=zone.id,
+        name=zone.name,
+        zone_type=zone.zone_type,
+        coordinates=zone.coordinates,
+        risk_level=zone.risk_level,
+        active_alerts=zone.active_alerts,
+        description=zone.description,
+        is_active=zone.is_active
+    )
@@ -0,0 +1,199 @@
+# app/services/risk_zone_index.py
+import math
+
+# Kilometres per degree of latitude (and of longitude at the equator)
+KM_PER_DEGREE = 111.32
+
+class _IndexedZone:
+    __slots__ = ('zone', 'polygons', 'bbox', 'cells')
+
+    def __init__(self, zone, polygons, bbox, cells):
+        self.zone = zone
+        self.polygons = polygons  # [[outer ring, hole, ...], ...] of (lng, lat) points
+        self.bbox = bbox          # (min_lng, min_lat, max_lng, max_lat)
+        self.cells = cells
+
+class RiskZoneIndex:
+    """In-memory grid index over risk zone GeoJSON polygons.
+
+    Each zone is bucketed into every cell_size-degree grid cell its
+    bounding box overlaps. A query only looks at the zones bucketed in the
+    cells it touches, rejects those whose bounding box can't match, and
+    runs the exact polygon test on the rest. Zones are added, replaced and
+    removed one at a time, so updates never rebuild the whole index.
+    """
+
+    def __init__(self, cell_size=0.05):
+        self.cell_size = cell_size
+        self._zones = {}   # zone id -> _IndexedZone
+        self._cells = {}   # (x, y) -> {zone id, ...}
+
+    def __len__(self):
+        return len(self._zones)
+
+    def __contains__(self, zone_id):
+        return zone_id in self._zones
+
+    def zone_ids(self):
+        return list(self._zones)
+
+    def upsert(self, zone):
+        """Add a zone, or replace it if a zone with the same id is indexed"""
+        self.remove(zone.id)
+
+        polygons = _polygons(zone.coordinates)
+        points = [point for polygon in polygons for ring in polygon for point in ring]
+        if not points:
+            return
+
+        lngs = [point[0] for point in points]
+        lats = [point[1] for point in points]
+        bbox = (min(lngs), min(lats), max(lngs), max(lats))
+        cells = list(self._cells_for(bbox))
+
+        self._zones[zone.id] = _IndexedZone(zone, polygons, bbox, cells)
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(zone.id)
+
+    def remove(self, zone_id):
+        entry = self._zones.pop(zone_id, None)
+        if entry is None:
+            return
+
+        for cell in entry.cells:
+            bucket = self._cells[cell]
+            bucket.discard(zone_id)
+            if not bucket:
+                del self._cells[cell]
+
+    def clear(self):
+        self._zones.clear()
+        self._cells.clear()
+
+    def zones_containing(self, latitude, longitude):
+        """Zones whose polygon contains the point"""
+        bucket = self._cells.get(self._cell(longitude, latitude), ())
+        return [
+            self._zones[zone_id].zone for zone_id in bucket
+            if _bbox_contains(self._zones[zone_id].bbox, longitude, latitude)
+            and _polygon_contains(self._zones[zone_id].polygons, longitude, latitude)
+        ]
+
+    def zones_within(self, latitude, longitude, radius_km):
+        """(zone, distance_km) for zones within radius_km of the point, nearest first.
+
+        Distances are to the nearest polygon edge (0 inside a zone), on a local
+        equirectangular projection, which is accurate to well under 1% over
+        the tens of kilometres these queries cover.
+        """
+        lat_span = radius_km / KM_PER_DEGREE
+        lng_scale = max(math.cos(math.radians(latitude)), 1e-6)
+        lng_span = lat_span / lng_scale
+        query = (longitude - lng_span, latitude - lat_span, longitude + lng_span, latitude + lat_span)
+
+        matches = []
+        for zone_id in self._candidates(query):
+            entry = self._zones[zone_id]
+            if not _bboxes_overlap(entry.bbox, query):
+                continue
+            if _bbox_distance_km(entry.bbox, longitude, latitude, lng_scale) > radius_km:
+                continue
+
+            distance = _distance_km(entry.polygons, longitude, latitude, lng_scale)
+            if distance <= radius_km:
+                matches.append((entry.zone, distance))
+
+        matches.sort(key=lambda match: match[1])
+        return matches
+
+    def _candidates(self, bbox):
+        min_x, min_y = self._cell(bbox[0], bbox[1])
+        max_x, max_y = self._cell(bbox[2], bbox[3])
+
+        # Scanning every zone is cheaper than visiting more cells than there are zones
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > len(self._zones):
+            return list(self._zones)
+
+        candidates = set()
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                candidates.update(self._cells.get((x, y), ()))
+        return candidates
+
+    def _cell(self, longitude, latitude):
+        return (math.floor(longitude / self.cell_size), math.floor(latitude / self.cell_size))
+
+    def _cells_for(self, bbox):
+        min_x, min_y = self._cell(bbox[0], bbox[1])
+        max_x, max_y = self._cell(bbox[2], bbox[3])
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                yield (x, y)
+
+def _polygons(geojson):
+    """Rings of a GeoJSON Polygon or MultiPolygon as [[ring, ...], ...]"""
+    if not geojson:
+        return []
+
+    if geojson.get('type') == 'Feature':
+        geojson = geojson.get('geometry') or {}
+
+    if geojson.get('type') == 'Polygon':
+        polygons = [geojson['coordinates']]
+    elif geojson.get('type') == 'MultiPolygon':
+        polygons = geojson['coordinates']
+    else:
+        raise ValueError(f"Unsupported risk zone geometry: {geojson.get('type')}")
+
+    return [[[(float(point[0]), float(point[1])) for point in ring] for ring in polygon if ring]
+            for polygon in polygons]
+
+def _bbox_contains(bbox, x, y):
+    return bbox[0] <= x <= bbox[2] and bbox[1] <= y <= bbox[3]
+
+def _bboxes_overlap(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+def _bbox_distance_km(bbox, x, y, lng_scale):
+    """Lower bound on the distance from the point to anything inside bbox"""
+    dx = max(bbox[0] - x, 0.0, x - bbox[2]) * lng_scale
+    dy = max(bbox[1] - y, 0.0, y - bbox[3])
+    return math.hypot(dx, dy) * KM_PER_DEGREE
+
+def _ring_contains(ring, x, y):
+    # Ray casting: count edge crossings to the right of the point
+    inside = False
+    x1, y1 = ring[-1]
+    for x2, y2 in ring:
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+def _polygon_contains(polygons, x, y):
+    for rings in polygons:
+        if _ring_contains(rings[0], x, y) and not any(_ring_contains(hole, x, y) for hole in rings[1:]):
+            return True
+    return False
+
+def _distance_km(polygons, x, y, lng_scale):
+    if _polygon_contains(polygons, x, y):
+        return 0.0
+
+    # Nearest edge, with coordinates projected to km around the point
+    best = math.inf
+    for rings in polygons:
+        for ring in rings:
+            px, py = (ring[-1][0] - x) * lng_scale, ring[-1][1] - y
+            for point in ring:
+                qx, qy = (point[0] - x) * lng_scale, point[1] - y
+                best = min(best, _segment_distance(px, py, qx, qy))
+                px, py = qx, qy
+    return best * KM_PER_DEGREE
+
+def _segment_distance(px, py, qx, qy):
+    """Distance from the origin to segment pq"""
+    dx, dy = qx - px, qy - py
+    length = dx * dx + dy * dy
+    t = 0.0 if length == 0 else max(0.0, min(1.0, -(px * dx + py * dy) / length))
+    return math.hypot(px + t * dx, py + t * dy)
@@ -0,0 +1,78 @@
+# tests/test_risk_zone_index.py
+import math
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.risk_zone_index import RiskZoneIndex, _distance_km, _polygon_contains, _polygons
+
+def random_ring(rng, lng, lat, radius, points=8):
+    angles = sorted(rng.uniform(0, 2 * math.pi) for _ in range(points))
+    ring = [[lng + radius * rng.uniform(0.5, 1) * math.cos(a), lat + radius * rng.uniform(0.5, 1) * math.sin(a)]
+            for a in angles]
+    return ring + [ring[0]]
+
+def random_zone(rng, i):
+    lng, lat = rng.uniform(91.0, 93.0), rng.uniform(25.5, 27.5)
+    radius = rng.choice([0.005, 0.02, 0.1, 0.4])
+    outer = random_ring(rng, lng, lat, radius)
+    if i % 7 == 0:
+        geometry = {'type': 'Polygon', 'coordinates': [outer, random_ring(rng, lng, lat, radius * 0.3)]}
+    elif i % 11 == 0:
+        geometry = {'type': 'MultiPolygon', 'coordinates': [
+            [outer], [random_ring(rng, lng + 2 * radius, lat, radius / 2)]
+        ]}
+    else:
+        geometry = {'type': 'Polygon', 'coordinates': [outer]}
+    return SimpleNamespace(id=f"zone-{i}", coordinates=geometry)
+
+@pytest.fixture(scope='module')
+def zones():
+    rng = random.Random(0)
+    return [random_zone(rng, i) for i in range(1000)]
+
+@pytest.fixture(scope='module')
+def index(zones):
+    index = RiskZoneIndex()
+    for zone in zones:
+        index.upsert(zone)
+    return index
+
+def query_points(n=300):
+    rng = random.Random(1)
+    return [(rng.uniform(25.4, 27.6), rng.uniform(90.9, 93.1)) for _ in range(n)]
+
+def test_containment_matches_brute_force(zones, index):
+    polygons = {zone.id: _polygons(zone.coordinates) for zone in zones}
+    for lat, lng in query_points():
+        expected = {zone_id for zone_id, rings in polygons.items() if _polygon_contains(rings, lng, lat)}
+        assert {zone.id for zone in index.zones_containing(lat, lng)} == expected
+
+@pytest.mark.parametrize('radius_km', [1, 5, 25])
+def test_radius_search_matches_brute_force(zones, index, radius_km):
+    polygons = {zone.id: _polygons(zone.coordinates) for zone in zones}
+    for lat, lng in query_points(100):
+        lng_scale = max(math.cos(math.radians(lat)), 1e-6)
+        expected = {zone_id for zone_id, rings in polygons.items()
+                    if _distance_km(rings, lng, lat, lng_scale) <= radius_km}
+        matches = index.zones_within(lat, lng, radius_km)
+        assert {zone.id for zone, _ in matches} == expected
+        assert [distance for _, distance in matches] == sorted(distance for _, distance in matches)
+
+def test_removed_and_replaced_zones_stop_matching(zones):
+    index = RiskZoneIndex()
+    zone = zones[1]
+    index.upsert(zone)
+    ring = _polygons(zone.coordinates)[0][0]
+    lng, lat = sum(p[0] for p in ring[:-1]) / (len(ring) - 1), sum(p[1] for p in ring[:-1]) / (len(ring) - 1)
+    assert [z.id for z in index.zones_containing(lat, lng)] == [zone.id]
+
+    moved = random_ring(random.Random(2), lng + 1.0, lat, 0.01)
+    index.upsert(SimpleNamespace(id=zone.id, coordinates={'type': 'Polygon', 'coordinates': [moved]}))
+    assert index.zones_containing(lat, lng) == []
+    assert len(index) == 1
+
+    index.remove(zone.id)
+    assert zone.id not in index and index.zone_ids() == []
+    assert index.zones_within(lat, lng + 1.0, 50) == []
@@ -0,0 +1,101 @@
+# iot-simulation/alert_coalescing.py
+import threading
+import time
+from collections import OrderedDict
+
+# Higher rank = more severe; unknown severities rank lowest
+SEVERITY_RANK = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+
+class AlertCoalescer:
+    """Suppresses repeated IoT alerts per (tourist, device, alert type).
+
+    The first alert for a key is sent and opens a `window`-second window in
+    which further alerts of the same or lower severity are only counted. A
+    more severe alert is sent straight away and restarts the window. The
+    next alert sent for a key carries the number of duplicates suppressed
+    since the previous one.
+
+    State is bounded: a key is dropped once it has seen no alert for a whole
+    window, and the least recently seen keys are dropped beyond `max_keys`.
+    Suppressed counts of dropped keys are queued as summaries (see
+    take_summaries) so they aren't lost.
+    """
+
+    def __init__(self, window=300.0, max_keys=100000, clock=time.monotonic):
+        self.window = window
+        self.max_keys = max_keys
+        self.clock = clock
+        # key -> [window_start, severity_rank, severity, suppressed, last_seen], oldest last_seen first
+        self._entries = OrderedDict()
+        self._summaries = []
+        self._lock = threading.Lock()
+        self.stats = {'sent': 0, 'suppressed': 0, 'escalated': 0, 'expired': 0, 'evicted': 0}
+
+    def admit(self, tourist_id, device_id, alert):
+        """Return the duplicates suppressed since the last sent alert if this one
+        should be sent, or None if it is a duplicate"""
+        key = (tourist_id, device_id, alert['type'])
+        rank = SEVERITY_RANK.get(alert['severity'], -1)
+
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = [now, rank, alert['severity'], 0, now]
+                self._evict()
+                self.stats['sent'] += 1
+                return 0
+
+            self._entries.move_to_end(key)
+            entry[4] = now
+
+            if rank <= entry[1] and now - entry[0] < self.window:
+                entry[3] += 1
+                self.stats['suppressed'] += 1
+                return None
+
+            if rank > entry[1] and now - entry[0] < self.window:
+                self.stats['escalated'] += 1
+
+            suppressed = entry[3]
+            entry[0:4] = [now, rank, alert['severity'], 0]
+            self.stats['sent'] += 1
+            return suppressed
+
+    def take_summaries(self, flush=False):
+        """Pop (tourist_id, device_id, alert_type, severity, suppressed) for dropped
+        keys with unreported duplicates; flush=True also drains live keys"""
+        with self._lock:
+            self._expire(self.clock())
+            if flush:
+                for key, entry in self._entries.items():
+                    if entry[3]:
+                        self._summaries.append((*key, entry[2], entry[3]))
+                        entry[3] = 0
+
+            summaries, self._summaries = self._summaries, []
+            return summaries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expire(self, now):
+        # Entries are ordered by last_seen, so stale ones are at the front
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry[4] < self.window:
+                break
+            self._drop(key)
+            self.stats['expired'] += 1
+
+    def _evict(self):
+        while len(self._entries) > self.max_keys:
+            self._drop(next(iter(self._entries)))
+            self.stats['evicted'] += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        if entry[3]:
+            self._summaries.append((*key, entry[2], entry[3]))
@@ -0,0 +1,306 @@
+# iot-simulation/fleet_simulator.py
+import argparse
+import logging
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+logger = logging.getLogger("FleetSimulator")
+
+# Alerts raised by SmartBandSimulator.detect_anomalies, in the same order;
+# bit i of a device's alert mask is set when ALERT_RULES[i] fires
+ALERT_RULES = [
+    ('heart_rate', 'health_anomaly', 'critical'),
+    ('body_temperature', 'health_anomaly', 'high'),
+    ('stress_level', 'stress_alert', 'medium'),
+    ('ambient_temperature', 'environmental_alert', 'high'),
+    ('air_quality', 'environmental_alert', 'medium'),
+    ('battery_level', 'device_alert', 'medium')
+]
+
+# Per-device sensor and location values, as SmartBandSimulator attributes
+READING_FIELDS = [
+    'heart_rate', 'body_temperature', 'activity_level', 'stress_level',
+    'ambient_temperature', 'humidity', 'air_quality',
+    'latitude', 'longitude', 'battery_level'
+]
+
+def as_aware(moment):
+    """moment with its own UTC offset kept; naive datetimes are taken to be in UTC"""
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+def as_utc(moment):
+    """moment as an aware UTC datetime; naive datetimes are taken to be in UTC"""
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+class SmartBandFleet:
+    """Every simulated smart band's state in NumPy arrays, one element per device.
+
+    step() advances all active devices by one reading with the same rules as
+    SmartBandSimulator's simulate_health_data, simulate_environmental_data,
+    simulate_movement and update_battery, drawing random values for the whole
+    fleet at once. Devices whose battery ran out stop reporting but stay in
+    the arrays.
+    """
+
+    def __init__(self, n_devices, seed=None, tourist_prefix='tourist', start=None):
+        self.n_devices = n_devices
+        self.tourist_prefix = tourist_prefix
+        self.rng = np.random.default_rng(seed)
+        rng = self.rng
+
+        self.device_suffix = rng.integers(1000, 10000, n_devices, dtype=np.int16)
+        self.is_active = np.ones(n_devices, dtype=bool)
+        self.battery_level = np.full(n_devices, 100, dtype=np.float32)
+        self.last_heartbeat = np.full(n_devices, as_utc(start or datetime.now(timezone.utc)).timestamp(), dtype=np.float64)
+
+        # Health sensors
+        self.heart_rate = np.full(n_devices, 75, dtype=np.int16)
+        self.body_temperature = np.full(n_devices, 98.6, dtype=np.float32)
+        self.activity_level = np.zeros(n_devices, dtype=np.int8)  # 0-10 scale
+        self.stress_level = np.zeros(n_devices, dtype=np.int8)    # 0-10 scale
+
+        # Environmental sensors
+        self.ambient_temperature = np.full(n_devices, 77, dtype=np.float32)
+        self.humidity = np.full(n_devices, 60, dtype=np.float32)
+        self.air_quality = np.full(n_devices, 50, dtype=np.float32)  # 0-100 scale
+
+        # Location
+        self.latitude = 26.1445 + rng.uniform(-0.1, 0.1, n_devices)
+        self.longitude = 91.7362 + rng.uniform(-0.1, 0.1, n_devices)
+
+    def step(self, now=None):
+        """Advance every active device by one reading; returns the mask of devices that reported"""
+        # Hour-of-day behaviour follows the caller's offset (local time by default)
+        now = as_aware(now or datetime.now().astimezone())
+        reporting = self.is_active.copy()
+
+        self.simulate_health_data(now.hour)
+        self.simulate_environmental_data(now.hour)
+        self.simulate_movement()
+        self.update_battery()
+
+        self.last_heartbeat[reporting] = as_utc(now).timestamp()
+        return reporting
+
+    def simulate_health_data(self, hour):
+        n, rng = self.n_devices, self.rng
+
+        # Heart rate follows the previous reading's activity
+        high = self.activity_level > 7
+        moderate = (self.activity_level > 4) & ~high
+        low = np.where(high, 120, np.where(moderate, 90, 60))
+        span = np.where(high, 41, np.where(moderate, 31, 26))
+        self.heart_rate = (low + _uniform(rng, n) * span).astype(np.int16)
+
+        self.body_temperature = 98.6 + _uniform(rng, n, -0.5, 0.8)
+
+        # Activity level (based on time of day and random factors)
+        if 22 <= hour or hour <= 6:  # Night time
+            self.activity_level = _randint(rng, n, 0, 2)
+        elif 7 <= hour <= 9 or 17 <= hour <= 19:  # Peak activity
+            self.activity_level = _randint(rng, n, 5, 10)
+        else:
+            self.activity_level = _randint(rng, n, 2, 7)
+
+        # Stress level (correlated with activity and 10% random stress events)
+        stressed = (self.activity_level > 8) | (_uniform(rng, n) < 0.1)
+        self.stress_level = np.where(stressed, _randint(rng, n, 6, 10), _randint(rng, n, 0, 4))
+
+    def simulate_environmental_data(self, hour):
+        n, rng = self.n_devices, self.rng
+
+        if 6 <= hour <= 18:  # Daytime
+            self.ambient_temperature = 77 + _uniform(rng, n, 5, 15)
+        else:  # Nighttime
+            self.ambient_temperature = 77 + _uniform(rng, n, -5, 5)
+
+        self.humidity += _uniform(rng, n, -5, 5)
+        np.clip(self.humidity, 30, 95, out=self.humidity)
+
+        self.air_quality += _uniform(rng, n, -3, 3)
+        np.clip(self.air_quality, 0, 100, out=self.air_quality)
+
+    def simulate_movement(self):
+        n, rng = self.n_devices, self.rng
+
+        # Random walk, slower at low activity
+        movement_speed = 0.0001 * (self.activity_level / 10)
+        self.latitude += _uniform(rng, n, -1, 1) * movement_speed
+        self.longitude += _uniform(rng, n, -1, 1) * movement_speed
+
+        # Keep within reasonable bounds (Northeast India)
+        np.clip(self.latitude, 25.0, 28.0, out=self.latitude)
+        np.clip(self.longitude, 90.0, 96.0, out=self.longitude)
+
+    def update_battery(self):
+        # Battery drain per reading, higher during high activity
+        drain = np.where(self.activity_level > 7, np.float32(0.15), np.float32(0.1))
+        drain[~self.is_active] = 0
+        self.battery_level -= drain
+        np.maximum(self.battery_level, 0, out=self.battery_level)
+        self.is_active &= self.battery_level > 0
+
+    def detect_anomalies(self, index=slice(None)):
+        """Alert bitmask per device (bit i set when ALERT_RULES[i] fires)"""
+        return alert_mask(*(getattr(self, field)[index] for field, _, _ in ALERT_RULES))
+
+    def alert_counts(self, alerts, reporting=None):
+        """Number of (reporting) devices raising each alert"""
+        if reporting is not None:
+            alerts = alerts[reporting]
+        return {
+            f"{alert_type}:{field}": int(np.count_nonzero(alerts & (1 << bit)))
+            for bit, (field, alert_type, _) in enumerate(ALERT_RULES)
+        }
+
+    def columns(self, reporting, alerts, now):
+        """Telemetry columns (telemetry_file.TELEMETRY_COLUMNS) of the reporting devices"""
+        devices = np.flatnonzero(reporting)
+        return {
+            'timestamp_ms': np.full(len(devices), int(as_utc(now).timestamp() * 1000), dtype=np.int64),
+            'device': devices,
+            'alerts': alerts[devices],
+            **{name: getattr(self, name)[devices] for name in READING_FIELDS}
+        }
+
+    def tourist_id(self, i):
+        return f"{self.tourist_prefix}_{i:06d}"
+
+    def device_id(self, i):
+        return f"band_{self.tourist_id(i)}_{self.device_suffix[i]}"
+
+    def build_payload(self, i, now=None, alerts=None):
+        """Upload payload for device i, shaped like SmartBandSimulator.build_payload"""
+        timestamp = as_utc(now or datetime.now(timezone.utc)).isoformat()
+        vital_signs = {
+            'heart_rate': int(self.heart_rate[i]),
+            'body_temperature': round(float(self.body_temperature[i]), 1),
+            'activity_level': int(self.activity_level[i]),
+            'stress_level': int(self.stress_level[i]),
+            'timestamp': timestamp
+        }
+        environmental_data = {
+            'ambient_temperature': round(float(self.ambient_temperature[i]), 1),
+            'humidity': float(self.humidity[i]),
+            'air_quality': float(self.air_quality[i]),
+            'timestamp': timestamp
+        }
+        alert_bits = int(self.detect_anomalies(slice(i, i + 1))[0] if alerts is None else alerts[i])
+
+        return {
+            'tourist_id': self.tourist_id(i),
+            'device_id': self.device_id(i),
+            'vital_signs': vital_signs,
+            'environmental_data': environmental_data,
+            'location_data': {
+                'latitude': round(float(self.latitude[i]), 6),
+                'longitude': round(float(self.longitude[i]), 6),
+                'accuracy': float(self.rng.uniform(3, 10)),
+                'timestamp': timestamp
+            },
+            'device_status': {
+                'device_id': self.device_id(i),
+                'battery_level': round(float(self.battery_level[i]), 2),
+                'is_active': bool(self.is_active[i]),
+                'last_heartbeat': datetime.fromtimestamp(self.last_heartbeat[i], tz=timezone.utc).isoformat(),
+                'signal_strength': int(self.rng.integers(1, 6))
+            },
+            'alerts': [
+                self._alert(bit, i, vital_signs, environmental_data)
+                for bit in range(len(ALERT_RULES)) if alert_bits & (1 << bit)
+            ],
+            'timestamp': timestamp
+        }
+
+    def _alert(self, bit, i, vital_signs, environmental_data):
+        """Alert dict for one rule, worded as SmartBandSimulator.detect_anomalies does"""
+        values = {
+            'heart_rate': vital_signs['heart_rate'],
+            'body_temperature': float(self.body_temperature[i]),
+            'stress_level': vital_signs['stress_level'],
+            'ambient_temperature': float(self.ambient_temperature[i]),
+            'air_quality': environmental_data['air_quality'],
+            'battery_level': round(float(self.battery_level[i]), 2)
+        }
+        return build_alert(bit, values, vital_signs, environmental_data)
+
+def build_alert(bit, values, vital_signs, environmental_data):
+    """Alert dict for ALERT_RULES[bit], worded as SmartBandSimulator.detect_anomalies does.
+
+    values maps each ALERT_RULES field to the value shown in the message.
+    """
+    field, alert_type, severity = ALERT_RULES[bit]
+    value = values[field]
+    messages = {
+        'heart_rate': f'Abnormal heart rate detected: {value} bpm',
+        'body_temperature': f'Abnormal body temperature: {value:.1f}°F',
+        'stress_level': f'High stress level detected: {value}/10',
+        'ambient_temperature': f'Extreme temperature: {value:.1f}°F',
+        'air_quality': f'Poor air quality detected: {value}/100',
+        'battery_level': f'Low battery warning: {value}%'
+    }
+
+    alert = {'type': alert_type, 'severity': severity, 'message': messages[field]}
+    if alert_type in ('health_anomaly', 'stress_alert'):
+        alert['vital_signs'] = vital_signs
+    elif alert_type == 'environmental_alert':
+        alert['environmental_data'] = environmental_data
+    return alert
+
+def alert_mask(heart_rate, body_temperature, stress_level, ambient_temperature, air_quality, battery_level):
+    """Alert bitmask for arrays of readings, applying detect_anomalies' thresholds as masks"""
+    masks = [
+        (heart_rate > 180) | (heart_rate < 40),
+        (body_temperature > 101) | (body_temperature < 95),
+        stress_level >= 9,
+        (ambient_temperature > 110) | (ambient_temperature < 32),
+        air_quality < 20,
+        battery_level < 10
+    ]
+
+    alerts = np.zeros(np.shape(heart_rate), dtype=np.uint8)
+    for bit, mask in enumerate(masks):
+        alerts |= np.asarray(mask, dtype=np.uint8) << bit
+    return alerts
+
+def _uniform(rng, n, low=0.0, high=1.0):
+    """float32 uniform draws in [low, high)"""
+    values = rng.random(n, dtype=np.float32)
+    if low != 0.0 or high != 1.0:
+        values *= high - low
+        values += low
+    return values
+
+def _randint(rng, n, low, high):
+    """int8 uniform draws in [low, high], like random.randint"""
+    return rng.integers(low, high + 1, n, dtype=np.int8)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate a whole smart band fleet with array state")
+    parser.add_argument('--devices', type=int, default=1000000)
+    parser.add_argument('--ticks', type=int, default=10, help="readings to simulate per device")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    start = time.perf_counter()
+    fleet = SmartBandFleet(args.devices, seed=args.seed)
+    logger.info(f"Created {args.devices} bands in {time.perf_counter() - start:.2f}s")
+
+    for tick in range(args.ticks):
+        start = time.perf_counter()
+        reporting = fleet.step()
+        alerts = fleet.detect_anomalies()
+        elapsed = time.perf_counter() - start
+
+        counts = {name: count for name, count in fleet.alert_counts(alerts, reporting).items() if count}
+        logger.info(f"Tick {tick}: {np.count_nonzero(reporting)} readings in {elapsed * 1000:.0f}ms "
+                    f"({np.count_nonzero(reporting) / elapsed:,.0f}/s), alerts {counts}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# iot-simulation/health_scoring.py
+import argparse
+import logging
+import random
+import time
+
+import numpy as np
+
+logger = logging.getLogger("HealthScoring")
+
+# Reasons a reading lost health score; bit i of a reading's reason mask is
+# set when HEALTH_REASONS[i] applied (IoTDataProcessor.calculate_health_score)
+HEALTH_REASONS = [
+    'heart_rate_critical',   # > 150 or < 50 bpm: -20
+    'heart_rate_abnormal',   # > 120 or < 60 bpm: -10
+    'body_temperature',      # > 100 or < 97 °F: -15
+    'stress',                # -2 per stress level point
+    'air_quality',           # < 30: -10
+    'ambient_temperature',   # > 100 or < 40 °F: -15
+    'low_battery'            # < 20%: -5
+]
+
+# Value used when a reading doesn't report a field, as in calculate_health_score
+HEALTH_DEFAULTS = {
+    'heart_rate': 75,
+    'body_temperature': 98.6,
+    'stress_level': 0,
+    'air_quality': 50,
+    'ambient_temperature': 77,
+    'battery_level': 100
+}
+
+# Payload section each scored field is read from
+_SECTIONS = {
+    'heart_rate': 'vital_signs',
+    'body_temperature': 'vital_signs',
+    'stress_level': 'vital_signs',
+    'air_quality': 'environmental_data',
+    'ambient_temperature': 'environmental_data',
+    'battery_level': 'device_status'
+}
+
+def health_scores(heart_rate, body_temperature, stress_level, air_quality, ambient_temperature, battery_level):
+    """Health score (0-100) and reason bitmask for arrays of readings.
+
+    Applies IoTDataProcessor.calculate_health_score's thresholds as masks
+    over a whole micro-batch at once. Scores are float64, like
+    calculate_health_score with a fractional stress level, so both always
+    return the same value.
+    """
+    heart_rate = np.asarray(heart_rate, dtype=np.float64)
+    body_temperature = np.asarray(body_temperature, dtype=np.float64)
+    stress_level = np.asarray(stress_level, dtype=np.float64)
+    air_quality = np.asarray(air_quality, dtype=np.float64)
+    ambient_temperature = np.asarray(ambient_temperature, dtype=np.float64)
+    battery_level = np.asarray(battery_level, dtype=np.float64)
+
+    heart_critical = (heart_rate > 150) | (heart_rate < 50)
+    masks = [
+        heart_critical,
+        ~heart_critical & ((heart_rate > 120) | (heart_rate < 60)),
+        (body_temperature > 100) | (body_temperature < 97),
+        stress_level != 0,
+        air_quality < 30,
+        (ambient_temperature > 100) | (ambient_temperature < 40),
+        battery_level < 20
+    ]
+    penalties = [20, 10, 15, None, 10, 15, 5]
+
+    scores = np.full(heart_rate.shape, 100.0)
+    reasons = np.zeros(heart_rate.shape, dtype=np.uint8)
+    # Subtracted in calculate_health_score's order, so fractional scores round the same way
+    for bit, (mask, penalty) in enumerate(zip(masks, penalties)):
+        scores -= stress_level * 2 if penalty is None else mask * penalty
+        reasons |= mask.astype(np.uint8) << bit
+
+    np.clip(scores, 0, 100, out=scores)
+    return scores, reasons
+
+def health_columns(readings):
+    """Columnar arrays of the scored fields from a list of IoT payloads"""
+    columns = {}
+    for field, default in HEALTH_DEFAULTS.items():
+        section = _SECTIONS[field]
+        columns[field] = np.fromiter(
+            ((reading.get(section) or {}).get(field, default) for reading in readings),
+            dtype=np.float64, count=len(readings)
+        )
+    return columns
+
+def score_readings(readings):
+    """Health scores and reason masks for a micro-batch of IoT payloads"""
+    return health_scores(**health_columns(readings))
+
+def describe_reasons(mask):
+    """Names of the reasons set in one reading's mask"""
+    return [reason for bit, reason in enumerate(HEALTH_REASONS) if int(mask) & (1 << bit)]
+
+def _random_reading(rng):
+    """Payload with values around every threshold, sometimes missing fields"""
+    fields = {
+        'heart_rate': rng.choice([rng.randint(30, 200), 49, 50, 59, 60, 120, 121, 150, 151]),
+        'body_temperature': rng.choice([round(rng.uniform(94, 103), 1), 96.9, 97, 100, 100.1]),
+        'stress_level': rng.choice([rng.randint(0, 10), round(rng.uniform(0, 10), 1)]),
+        'air_quality': rng.choice([rng.uniform(0, 100), 29.9, 30]),
+        'ambient_temperature': rng.choice([round(rng.uniform(20, 120), 1), 39.9, 40, 100, 100.1]),
+        'battery_level': rng.choice([round(rng.uniform(0, 100), 2), 19.99, 20])
+    }
+
+    reading = {'vital_signs': {}, 'environmental_data': {}, 'device_status': {}}
+    for field, value in fields.items():
+        if rng.random() > 0.05:
+            reading[_SECTIONS[field]][field] = value
+    return reading
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the vectorised health scorer against the per-reading one")
+    parser.add_argument('--readings', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    # Imported here; the scorer itself doesn't depend on the simulator
+    from smart_band_simulator import IoTDataProcessor
+    processor = IoTDataProcessor()
+    rng = random.Random(args.seed)
+    readings = [_random_reading(rng) for _ in range(args.readings)]
+
+    start = time.perf_counter()
+    expected = [processor.calculate_health_score(reading) for reading in readings]
+    scalar_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores, reasons = score_readings(readings)
+    batch_elapsed = time.perf_counter() - start
+
+    columns = health_columns(readings)
+    start = time.perf_counter()
+    health_scores(**columns)
+    columnar_elapsed = time.perf_counter() - start
+
+    mismatches = np.flatnonzero(scores != np.asarray(expected))
+    if len(mismatches):
+        i = mismatches[0]
+        raise SystemExit(f"{len(mismatches)} of {args.readings} scores differ; first at {i}: "
+                         f"expected {expected[i]}, got {scores[i]} for {readings[i]}")
+
+    counts = {reason: int(np.count_nonzero(reasons & (1 << bit))) for bit, reason in enumerate(HEALTH_REASONS)}
+    logger.info(f"All {args.readings} scores match. Per reading: {scalar_elapsed:.3f}s, "
+                f"batch from payloads: {batch_elapsed:.3f}s, batch from columns: {columnar_elapsed:.4f}s. "
+                f"Reasons: {counts}")
+
+if __name__ == "__main__":
+    main()
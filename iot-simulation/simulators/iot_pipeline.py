@@ -0,0 +1,232 @@
+# iot-simulation/iot_pipeline.py
+import argparse
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from alert_coalescing import AlertCoalescer
+from smart_band_simulator import IoTDataProcessor
+from wire_format import decode_frame
+
+logger = logging.getLogger("IoTDataPipeline")
+
+# Marks the end of a stage's input; one is queued per worker
+_STOP = object()
+
+class _Stage:
+    """A bounded input queue drained by a pool of worker threads"""
+
+    def __init__(self, name, handler, workers, queue_size, batch_size=1, batch_wait=0.0):
+        self.name = name
+        self.handler = handler
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.processed = 0
+        self.batches = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"iot-{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Let the workers finish everything queued, then wait for them"""
+        for _ in self._threads:
+            self.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def _next_batch(self):
+        """Block for one item, then take up to batch_size waiting at most batch_wait"""
+        item = self.queue.get()
+        if item is _STOP:
+            return None
+
+        batch = [item]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Leave the stop marker for this worker's next call
+                self.queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            try:
+                self.handler(batch)
+            except Exception as e:
+                with self._lock:
+                    self.errors += len(batch)
+                logger.error(f"IoT {self.name} stage failed for {len(batch)} readings: {str(e)}")
+
+            with self._lock:
+                self.processed += len(batch)
+                self.batches += 1
+
+    def stats(self):
+        return {
+            'processed': self.processed,
+            'batches': self.batches,
+            'errors': self.errors,
+            'queued': self.queue.qsize(),
+            'workers': len(self._threads)
+        }
+
+class IoTDataPipeline:
+    """Staged, batched version of IoTDataProcessor.process_iot_data.
+
+    submit() puts a reading on the bounded ingest queue. Storage workers take
+    up to store_batch_size readings at a time and store them with one bulk
+    request, then pass each reading's alerts to the alert stage and the
+    reading itself to the scoring stage, which scores micro-batches of the
+    same size at once. Every stage has its own worker pool
+    and bounded queue, so a slow stage fills its queue and blocks the stage
+    feeding it (and eventually submit()) instead of buffering without limit.
+    All workers share one pooled requests.Session. Repeated alerts for the
+    same tourist, device and alert type within alert_window seconds are
+    coalesced (alert_window=None sends every alert).
+    """
+
+    def __init__(self, api_url="http://localhost:5000/api", store_workers=2, alert_workers=4, score_workers=8,
+                 store_batch_size=100, store_batch_wait=0.05, queue_size=10000, alert_window=300.0):
+        pool_size = store_workers + alert_workers + score_workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        coalescer = AlertCoalescer(alert_window) if alert_window else None
+        self.processor = IoTDataProcessor(api_url, session=self.session, coalescer=coalescer)
+        self.rejected = 0
+
+        self.score_stage = _Stage('score', self._score, score_workers, queue_size,
+                                  batch_size=store_batch_size, batch_wait=store_batch_wait)
+        self.alert_stage = _Stage('alert', self._alert, alert_workers, queue_size)
+        self.store_stage = _Stage('store', self._store, store_workers, queue_size,
+                                  batch_size=store_batch_size, batch_wait=store_batch_wait)
+        # Downstream stages first, so their workers are ready when readings arrive
+        self._stages = [self.score_stage, self.alert_stage, self.store_stage]
+
+    def start(self):
+        for stage in self._stages:
+            stage.start()
+        return self
+
+    def submit(self, data, block=True, timeout=None):
+        """Queue one reading; returns False if the ingest queue stayed full"""
+        try:
+            self.store_stage.queue.put(data, block=block, timeout=timeout)
+            return True
+        except queue.Full:
+            self.rejected += 1
+            return False
+
+    def submit_frame(self, frame, block=True, timeout=None):
+        """Queue every reading in a binary frame (wire_format); returns how many were accepted"""
+        return sum(self.submit(data, block=block, timeout=timeout) for data in decode_frame(frame))
+
+    def close(self):
+        """Process everything submitted so far, then stop the workers"""
+        # Upstream first: each stage drains into the next before that one stops
+        for stage in reversed(self._stages):
+            stage.stop()
+        if self.processor.coalescer is not None:
+            self.processor.send_alert_summaries(flush=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self):
+        stats = {
+            'rejected': self.rejected,
+            **{stage.name: stage.stats() for stage in reversed(self._stages)}
+        }
+        if self.processor.coalescer is not None:
+            stats['alert_coalescing'] = dict(self.processor.coalescer.stats)
+        return stats
+
+    def _store(self, readings):
+        self.processor.store_iot_data_batch(readings)
+
+        for data in readings:
+            for alert in data.get('alerts', []):
+                self.alert_stage.queue.put((data.get('tourist_id'), data.get('device_id'), alert))
+            self.score_stage.queue.put(data)
+
+    def _alert(self, alerts):
+        for tourist_id, device_id, alert in alerts:
+            self.processor.handle_iot_alert(tourist_id, device_id, alert)
+
+    def _score(self, readings):
+        # Scored as one NumPy batch; the updates are still sent per tourist
+        self.processor.update_safety_scores_with_iot(readings)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Push simulated smart band readings through the IoT data pipeline")
+    parser.add_argument('--api-url', default="http://localhost:5000/api")
+    parser.add_argument('--readings', type=int, default=10000)
+    parser.add_argument('--store-workers', type=int, default=2)
+    parser.add_argument('--alert-workers', type=int, default=4)
+    parser.add_argument('--score-workers', type=int, default=8)
+    parser.add_argument('--store-batch-size', type=int, default=100)
+    parser.add_argument('--queue-size', type=int, default=10000)
+    parser.add_argument('--alert-window', type=float, default=300.0,
+                        help="seconds to coalesce repeated alerts per band and type (0 sends every alert)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    # Imported here; only the demo needs simulated readings
+    from fleet_simulator import SmartBandFleet
+    fleet = SmartBandFleet(min(args.readings, 100000), seed=args.seed)
+    now = datetime.now().astimezone()
+    fleet.step(now)
+    alerts = fleet.detect_anomalies()
+
+    pipeline = IoTDataPipeline(
+        api_url=args.api_url,
+        store_workers=args.store_workers,
+        alert_workers=args.alert_workers,
+        score_workers=args.score_workers,
+        store_batch_size=args.store_batch_size,
+        queue_size=args.queue_size,
+        alert_window=args.alert_window
+    )
+
+    start = time.perf_counter()
+    with pipeline:
+        for i in range(args.readings):
+            pipeline.submit(fleet.build_payload(i % fleet.n_devices, now, alerts))
+    elapsed = time.perf_counter() - start
+
+    logger.info(f"Processed {args.readings} readings in {elapsed:.2f}s ({args.readings / elapsed:.0f}/s): "
+                f"{pipeline.stats()}")
+
+if __name__ == "__main__":
+    main()
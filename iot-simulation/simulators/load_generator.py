@@ -0,0 +1,223 @@
+# iot-simulation/load_generator.py
+import argparse
+import asyncio
+import json
+import logging
+import time
+from array import array
+from collections import Counter
+
+import aiohttp
+import numpy as np
+
+from smart_band_simulator import SmartBandSimulator
+from fleet_simulator import SmartBandFleet
+
+logger = logging.getLogger("LoadGenerator")
+
+class LoadStats:
+    """Outcome and latency of every upload sent by the load generator"""
+
+    def __init__(self):
+        self.latencies = array('d')
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.sent = 0
+        self.max_lag = 0.0
+
+    def record(self, status, latency):
+        self.statuses[status] += 1
+        self.latencies.append(latency)
+
+    def record_error(self, error):
+        self.errors[type(error).__name__] += 1
+
+    @property
+    def completed(self):
+        return sum(self.statuses.values()) + sum(self.errors.values())
+
+    def summary(self, elapsed):
+        latencies_ms = np.frombuffer(self.latencies, dtype=np.float64) * 1000
+        percentiles = (np.percentile(latencies_ms, [50, 90, 99]) if len(latencies_ms) else [None] * 3)
+
+        return {
+            'sent': self.sent,
+            'succeeded': self.statuses.get(200, 0),
+            'failed': self.completed - self.statuses.get(200, 0),
+            'status_counts': {str(status): count for status, count in sorted(self.statuses.items())},
+            'errors': dict(self.errors),
+            'elapsed_seconds': round(elapsed, 2),
+            'achieved_rate': round(self.completed / elapsed, 1) if elapsed else 0.0,
+            'latency_ms': {
+                'p50': _rounded(percentiles[0]),
+                'p90': _rounded(percentiles[1]),
+                'p99': _rounded(percentiles[2]),
+                'max': _rounded(latencies_ms.max() if len(latencies_ms) else None)
+            },
+            # How far dispatch fell behind schedule; large values mean the
+            # generator itself (not the server) is the bottleneck
+            'max_schedule_lag_ms': round(self.max_lag * 1000, 1)
+        }
+
+class LoadGenerator:
+    """Drives a fleet of simulated smart bands against the IoT ingest endpoint.
+
+    Every device reports once per interval, staggered evenly across it, so the
+    target rate is devices / interval uploads per second. Uploads share one
+    pooled aiohttp session; at most `concurrency` are in flight, and once
+    that limit is reached dispatch waits instead of queueing without bound.
+    With fleet=True device state lives in one SmartBandFleet, advanced for
+    every band at once at the start of each interval, instead of in one
+    SmartBandSimulator per band.
+    """
+
+    def __init__(self, api_url="http://localhost:5000/api", devices=1000, interval=30.0,
+                 duration=60.0, concurrency=500, connections=100, timeout=5.0, fleet=False):
+        self.api_url = api_url
+        self.n_devices = devices
+        self.interval = interval
+        self.duration = duration
+        self.concurrency = concurrency
+        self.connections = connections
+        self.timeout = timeout
+        if fleet:
+            self.fleet = SmartBandFleet(devices)
+            self.devices = None
+        else:
+            self.fleet = None
+            self.devices = [SmartBandSimulator(f"tourist_{i:06d}", api_url=api_url) for i in range(devices)]
+        self.stats = LoadStats()
+        self._fleet_alerts = None
+
+    @property
+    def target_rate(self):
+        return self.n_devices / self.interval
+
+    async def run(self, progress_interval=10.0):
+        """Run for `duration` seconds and return the summary report"""
+        connector = aiohttp.TCPConnector(limit=self.connections)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            in_flight = set()
+            loop = asyncio.get_running_loop()
+            spacing = 1.0 / self.target_rate
+            total = int(self.duration * self.target_rate)
+
+            start = loop.time()
+            next_progress = start + progress_interval
+            dispatched = 0
+
+            while dispatched < total:
+                now = loop.time()
+                due = min(total, int((now - start) / spacing) + 1)
+
+                # Send every upload whose slot has passed, then sleep to the next slot
+                while dispatched < due:
+                    await semaphore.acquire()
+                    self.stats.max_lag = max(self.stats.max_lag, loop.time() - (start + dispatched * spacing))
+                    task = asyncio.create_task(self._send(session, dispatched % self.n_devices, semaphore))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+                    dispatched += 1
+
+                if loop.time() >= next_progress:
+                    self._log_progress(loop.time() - start, len(in_flight))
+                    next_progress += progress_interval
+
+                await asyncio.sleep(max(0.0, start + dispatched * spacing - loop.time()))
+
+            if in_flight:
+                await asyncio.gather(*in_flight)
+
+            elapsed = loop.time() - start
+
+        report = {
+            'devices': self.n_devices,
+            'fleet': self.fleet is not None,
+            'interval_seconds': self.interval,
+            'target_rate': round(self.target_rate, 1),
+            'concurrency': self.concurrency,
+            'connections': self.connections,
+            **self.stats.summary(elapsed)
+        }
+        logger.info(f"Load test finished: {json.dumps(report)}")
+        return report
+
+    def _next_payload(self, index):
+        """Advance device `index` by one reading and build its upload"""
+        if self.fleet is not None:
+            if index == 0:
+                self.fleet.step()
+                self._fleet_alerts = self.fleet.detect_anomalies()
+            return self.fleet.build_payload(index, alerts=self._fleet_alerts)
+
+        device = self.devices[index]
+        device.step()
+        return device.build_payload()
+
+    async def _send(self, session, index, semaphore):
+        """Advance one device and upload its reading"""
+        try:
+            payload = self._next_payload(index)
+
+            self.stats.sent += 1
+            start = time.perf_counter()
+            async with session.post(f"{self.api_url}/iot/data", json=payload) as response:
+                await response.read()
+            self.stats.record(response.status, time.perf_counter() - start)
+
+        except Exception as e:
+            self.stats.record_error(e)
+
+        finally:
+            semaphore.release()
+
+    def _log_progress(self, elapsed, in_flight):
+        logger.info(f"{elapsed:.0f}s: {self.stats.completed} completed "
+                    f"({self.stats.completed / elapsed:.0f}/s of {self.target_rate:.0f}/s target), "
+                    f"{in_flight} in flight, {sum(self.stats.errors.values())} errors")
+
+def _rounded(value):
+    return None if value is None else round(float(value), 2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the IoT ingest path with simulated smart bands")
+    parser.add_argument('--api-url', default="http://localhost:5000/api")
+    parser.add_argument('--devices', type=int, default=1000, help="simulated bands")
+    parser.add_argument('--interval', type=float, default=30.0, help="seconds between readings per band")
+    parser.add_argument('--duration', type=float, default=60.0, help="test length in seconds")
+    parser.add_argument('--concurrency', type=int, default=500, help="maximum uploads in flight")
+    parser.add_argument('--connections', type=int, default=100, help="pooled HTTP connections")
+    parser.add_argument('--timeout', type=float, default=5.0, help="per-request timeout in seconds")
+    parser.add_argument('--fleet', action='store_true', help="keep band state in NumPy arrays (for very large fleets)")
+    parser.add_argument('--report', help="write the summary to this JSON file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    logger.setLevel(logging.INFO)
+
+    generator = LoadGenerator(
+        api_url=args.api_url,
+        devices=args.devices,
+        interval=args.interval,
+        duration=args.duration,
+        concurrency=args.concurrency,
+        connections=args.connections,
+        timeout=args.timeout,
+        fleet=args.fleet
+    )
+
+    # Per-band loggers would log every upload; only the summary matters here
+    logging.getLogger().setLevel(logging.WARNING)
+
+    logger.info(f"Simulating {args.devices} bands at {generator.target_rate:.0f} uploads/s for {args.duration:.0f}s")
+    report = asyncio.run(generator.run())
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# iot-simulation/replay.py
+import argparse
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+
+import aiohttp
+import numpy as np
+
+from smart_band_simulator import SmartBandSimulator, SimulatedClock, READING_INTERVAL, REQUEST_TIMEOUT
+from fleet_simulator import SmartBandFleet, as_aware
+from load_generator import LoadStats
+from telemetry_file import ColumnarTelemetryWriter
+
+logger = logging.getLogger("Replay")
+
+# Simulated start used unless --start is given, so seeded runs are reproducible
+DEFAULT_START = '2024-01-01T00:00:00+00:00'
+
+def device_seeds(seed, n_devices):
+    """Independent, reproducible RNG seed for each device"""
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(n_devices)]
+
+async def replay_devices(n_devices, start, duration_minutes, speed, seed, sink=None, api_url=None,
+                         connections=100):
+    """Run one SmartBandSimulator per device on its own simulated clock.
+
+    Devices start staggered evenly across the first reading interval. With a
+    sink, readings are recorded instead of posted.
+    """
+    devices = [
+        SmartBandSimulator(f"tourist_{i:06d}", api_url=api_url, clock=SimulatedClock(start, speed), seed=device_seed)
+        for i, device_seed in enumerate(device_seeds(seed, n_devices))
+    ]
+
+    async def run(i, device, session):
+        await device.clock.sleep(READING_INTERVAL * i / n_devices)
+        await device.run_simulation(duration_minutes, session=session, sink=sink)
+
+    if sink is not None:
+        await asyncio.gather(*(run(i, device, None) for i, device in enumerate(devices)))
+        return
+
+    connector = aiohttp.TCPConnector(limit=connections)
+    async with aiohttp.ClientSession(connector=connector, timeout=REQUEST_TIMEOUT) as session:
+        await asyncio.gather(*(run(i, device, session) for i, device in enumerate(devices)))
+
+async def replay_fleet(n_devices, start, duration_minutes, speed, seed, writer=None, api_url=None,
+                       connections=100, concurrency=500):
+    """Advance a SmartBandFleet one reading interval at a time on a simulated clock.
+
+    Every band reports at the start of each interval. Readings are appended
+    to the writer, or posted with at most `concurrency` requests in flight.
+    """
+    fleet = SmartBandFleet(n_devices, seed=seed, start=start)
+    n_readings = int(duration_minutes * 60 // READING_INTERVAL)
+    stats = LoadStats()
+    real_start = time.perf_counter()
+
+    if writer is not None:
+        writer.set_device_ids(fleet.device_id(i) for i in range(n_devices))
+
+    connector = aiohttp.TCPConnector(limit=connections)
+    async with aiohttp.ClientSession(connector=connector, timeout=REQUEST_TIMEOUT) as session:
+        semaphore = asyncio.Semaphore(concurrency)
+        in_flight = set()
+
+        for reading in range(n_readings):
+            simulated = reading * READING_INTERVAL
+            if speed:
+                await asyncio.sleep(max(0.0, real_start + simulated / speed - time.perf_counter()))
+
+            now = start + timedelta(seconds=simulated)
+            reporting = fleet.step(now)
+            alerts = fleet.detect_anomalies()
+
+            if writer is not None:
+                writer.append(fleet.columns(reporting, alerts, now))
+                continue
+
+            for i in np.flatnonzero(reporting):
+                await semaphore.acquire()
+                task = asyncio.create_task(_post(session, f"{api_url}/iot/data",
+                                                 fleet.build_payload(i, now, alerts), stats, semaphore))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+        if in_flight:
+            await asyncio.gather(*in_flight)
+
+    return stats
+
+async def _post(session, url, payload, stats, semaphore):
+    try:
+        stats.sent += 1
+        start = time.perf_counter()
+        async with session.post(url, json=payload) as response:
+            await response.read()
+        stats.record(response.status, time.perf_counter() - start)
+    except Exception as e:
+        stats.record_error(e)
+    finally:
+        semaphore.release()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay simulated smart band traffic on an accelerated, seeded clock")
+    parser.add_argument('--devices', type=int, default=1000)
+    parser.add_argument('--duration-minutes', type=float, default=24 * 60, help="simulated time to cover")
+    parser.add_argument('--start', default=DEFAULT_START, help="simulated start time (ISO format, UTC unless an offset is given)")
+    parser.add_argument('--speed', type=float, default=0,
+                        help="simulated seconds per real second (0 runs as fast as possible)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--fleet', action='store_true', help="keep band state in NumPy arrays (for large fleets)")
+    parser.add_argument('--output', help="write readings to this columnar file instead of posting them")
+    parser.add_argument('--compresslevel', type=int, default=1, help="deflate level for --output (1 fastest, 9 smallest)")
+    parser.add_argument('--api-url', default="http://localhost:5000/api")
+    parser.add_argument('--connections', type=int, default=100, help="pooled HTTP connections")
+    parser.add_argument('--concurrency', type=int, default=500, help="uploads in flight (fleet mode)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    logger.setLevel(logging.INFO)
+    # Per-band loggers would log every reading
+    logging.getLogger().setLevel(logging.WARNING)
+
+    start = as_aware(datetime.fromisoformat(args.start))
+    speed = args.speed or None
+    writer = ColumnarTelemetryWriter(args.output, compresslevel=args.compresslevel) if args.output else None
+    mode = f"{args.speed:g}x" if speed else "as fast as possible"
+    logger.info(f"Replaying {args.duration_minutes:g} simulated minutes of {args.devices} bands {mode}")
+
+    real_start = time.perf_counter()
+    stats = None
+    try:
+        if args.fleet:
+            stats = asyncio.run(replay_fleet(args.devices, start, args.duration_minutes, speed, args.seed,
+                                             writer=writer, api_url=args.api_url,
+                                             connections=args.connections, concurrency=args.concurrency))
+        else:
+            asyncio.run(replay_devices(args.devices, start, args.duration_minutes, speed, args.seed,
+                                       sink=writer, api_url=args.api_url, connections=args.connections))
+    finally:
+        if writer is not None:
+            writer.close()
+    elapsed = time.perf_counter() - real_start
+
+    if writer is not None:
+        logger.info(f"Wrote {writer.rows_written} readings to {args.output} in {elapsed:.1f}s")
+    elif stats is not None:
+        logger.info(f"Replay finished: {json.dumps(stats.summary(elapsed))}")
+    else:
+        logger.info(f"Replay finished in {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
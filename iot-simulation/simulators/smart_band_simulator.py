@@ -5,17 +5,67 @@ import random
 import requests
 import time
 from datetime import datetime, timedelta
+import aiohttp
 import websockets
 import logging
 
+from fleet_simulator import as_aware, as_utc
+from health_scoring import score_readings
+from wire_format import WIRE_CONTENT_TYPE, encode_frame, decode_frame
+
+# Per-request timeout for device uploads
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=5)
+
+# Seconds between readings
+READING_INTERVAL = 30
+
+class WallClock:
+    """Real time: readings are taken every READING_INTERVAL real seconds"""
+
+    def now(self):
+        # Local time with its offset, so hour-of-day behaviour follows the host's clock
+        return datetime.now().astimezone()
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+class SimulatedClock:
+    """Simulated time for one device, starting at `start` (naive means UTC).
+
+    The start's UTC offset is kept, so hour-of-day behaviour follows it.
+
+    sleep() advances simulated time by exactly the requested amount, waiting
+    seconds / speed real seconds (speed=None doesn't wait at all), so
+    timestamps and hour-of-day behaviour are reproducible at any speed.
+    """
+
+    def __init__(self, start, speed=None):
+        self.current = as_aware(start)
+        self.speed = speed
+
+    def now(self):
+        return self.current
+
+    async def sleep(self, seconds):
+        # Yield to other devices even when running as fast as possible
+        await asyncio.sleep(seconds / self.speed if self.speed else 0)
+        self.current += timedelta(seconds=seconds)
+
 class SmartBandSimulator:
-    def __init__(self, tourist_id, api_url="http://localhost:5000/api"):
+    def __init__(self, tourist_id, api_url="http://localhost:5000/api", clock=None, seed=None, frame_readings=None):
         self.tourist_id = tourist_id
         self.api_url = api_url
-        self.device_id = f"band_{tourist_id}_{random.randint(1000, 9999)}"
+        # With frame_readings, readings are buffered and sent as one compact
+        # binary frame (wire_format) per frame_readings readings instead of as JSON
+        self.frame_readings = frame_readings
+        self.pending_readings = []
+        # Per-device RNG and clock; a seed and a SimulatedClock make runs reproducible
+        self.random = random.Random(seed)
+        self.clock = clock or WallClock()
+        self.device_id = f"band_{tourist_id}_{self.random.randint(1000, 9999)}"
         self.is_active = True
         self.battery_level = 100
-        self.last_heartbeat = datetime.now()
+        self.last_heartbeat = self.clock.now()
 
         # Health sensors
         self.heart_rate = 75
@@ -29,8 +79,8 @@ class SmartBandSimulator:
         self.air_quality = 50  # 0-100 scale
 
         # Location (will be updated)
-        self.latitude = 26.1445 + random.uniform(-0.1, 0.1)
-        self.longitude = 91.7362 + random.uniform(-0.1, 0.1)
+        self.latitude = 26.1445 + self.random.uniform(-0.1, 0.1)
+        self.longitude = 91.7362 + self.random.uniform(-0.1, 0.1)
 
         self.logger = logging.getLogger(f"SmartBand_{self.device_id}")
         logging.basicConfig(level=logging.INFO)
@@ -40,54 +90,54 @@ class SmartBandSimulator:
         # Heart rate varies based on activity
         base_hr = 75
         if self.activity_level > 7:  # High activity
-            self.heart_rate = random.randint(120, 160)
+            self.heart_rate = self.random.randint(120, 160)
         elif self.activity_level > 4:  # Moderate activity
-            self.heart_rate = random.randint(90, 120)
+            self.heart_rate = self.random.randint(90, 120)
         else:  # Resting
-            self.heart_rate = random.randint(60, 85)
+            self.heart_rate = self.random.randint(60, 85)
 
         # Body temperature (slight variations)
-        self.body_temperature = 98.6 + random.uniform(-0.5, 0.8)
+        self.body_temperature = 98.6 + self.random.uniform(-0.5, 0.8)
 
         # Activity level (based on time of day and random factors)
-        current_hour = datetime.now().hour
+        current_hour = self.clock.now().hour
         if 22 <= current_hour or current_hour <= 6:  # Night time
-            self.activity_level = random.randint(0, 2)
+            self.activity_level = self.random.randint(0, 2)
         elif 7 <= current_hour <= 9 or 17 <= current_hour <= 19:  # Peak activity
-            self.activity_level = random.randint(5, 10)
+            self.activity_level = self.random.randint(5, 10)
         else:
-            self.activity_level = random.randint(2, 7)
+            self.activity_level = self.random.randint(2, 7)
 
         # Stress level (correlated with activity and random events)
-        if self.activity_level > 8 or random.random() < 0.1:  # 10% chance of stress event
-            self.stress_level = random.randint(6, 10)
+        if self.activity_level > 8 or self.random.random() < 0.1:  # 10% chance of stress event
+            self.stress_level = self.random.randint(6, 10)
         else:
-            self.stress_level = random.randint(0, 4)
+            self.stress_level = self.random.randint(0, 4)
 
     def simulate_environmental_data(self):
         """Simulate environmental sensor data"""
         # Temperature varies by time and season
-        current_hour = datetime.now().hour
+        current_hour = self.clock.now().hour
         base_temp = 77
 
         if 6 <= current_hour <= 18:  # Daytime
-            self.ambient_temperature = base_temp + random.uniform(5, 15)
+            self.ambient_temperature = base_temp + self.random.uniform(5, 15)
         else:  # Nighttime
-            self.ambient_temperature = base_temp + random.uniform(-5, 5)
+            self.ambient_temperature = base_temp + self.random.uniform(-5, 5)
 
         # Humidity (varies with weather patterns)
-        self.humidity = max(30, min(95, self.humidity + random.uniform(-5, 5)))
+        self.humidity = max(30, min(95, self.humidity + self.random.uniform(-5, 5)))
 
         # Air quality (varies by location type)
-        self.air_quality = max(0, min(100, self.air_quality + random.uniform(-3, 3)))
+        self.air_quality = max(0, min(100, self.air_quality + self.random.uniform(-3, 3)))
 
     def simulate_movement(self):
         """Simulate GPS movement"""
         # Random walk with bias towards interesting locations
         movement_speed = 0.0001 * (self.activity_level / 10)  # Slower movement at night
 
-        self.latitude += random.uniform(-movement_speed, movement_speed)
-        self.longitude += random.uniform(-movement_speed, movement_speed)
+        self.latitude += self.random.uniform(-movement_speed, movement_speed)
+        self.longitude += self.random.uniform(-movement_speed, movement_speed)
 
         # Keep within reasonable bounds (Northeast India)
         self.latitude = max(25.0, min(28.0, self.latitude))
@@ -156,7 +206,7 @@ class SmartBandSimulator:
             'body_temperature': round(self.body_temperature, 1),
             'activity_level': self.activity_level,
             'stress_level': self.stress_level,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': self.utc_timestamp()
         }
 
     def get_environmental_data(self):
@@ -165,7 +215,7 @@ class SmartBandSimulator:
             'ambient_temperature': round(self.ambient_temperature, 1),
             'humidity': self.humidity,
             'air_quality': self.air_quality,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': self.utc_timestamp()
         }
 
     def get_location_data(self):
@@ -173,8 +223,8 @@ class SmartBandSimulator:
         return {
             'latitude': round(self.latitude, 6),
             'longitude': round(self.longitude, 6),
-            'accuracy': random.uniform(3, 10),
-            'timestamp': datetime.now().isoformat()
+            'accuracy': self.random.uniform(3, 10),
+            'timestamp': self.utc_timestamp()
         }
 
     def get_device_status(self):
@@ -183,38 +233,66 @@ class SmartBandSimulator:
             'device_id': self.device_id,
             'battery_level': self.battery_level,
             'is_active': self.is_active,
-            'last_heartbeat': self.last_heartbeat.isoformat(),
-            'signal_strength': random.randint(1, 5)
+            'last_heartbeat': as_utc(self.last_heartbeat).isoformat(),
+            'signal_strength': self.random.randint(1, 5)
         }
 
-    async def send_data_to_server(self):
-        """Send all sensor data to server"""
-        try:
-            data_payload = {
-                'tourist_id': self.tourist_id,
-                'device_id': self.device_id,
-                'vital_signs': self.get_vital_signs(),
-                'environmental_data': self.get_environmental_data(),
-                'location_data': self.get_location_data(),
-                'device_status': self.get_device_status(),
-                'alerts': self.detect_anomalies(),
-                'timestamp': datetime.now().isoformat()
-            }
+    def utc_timestamp(self):
+        """Current clock time as an ISO timestamp in UTC"""
+        return as_utc(self.clock.now()).isoformat()
 
-            # Send to IoT data endpoint
-            response = requests.post(
-                f"{self.api_url}/iot/data",
-                json=data_payload,
-                timeout=5
-            )
+    def build_payload(self):
+        """Build the upload payload from the current sensor state"""
+        return {
+            'tourist_id': self.tourist_id,
+            'device_id': self.device_id,
+            'vital_signs': self.get_vital_signs(),
+            'environmental_data': self.get_environmental_data(),
+            'location_data': self.get_location_data(),
+            'device_status': self.get_device_status(),
+            'alerts': self.detect_anomalies(),
+            'timestamp': self.utc_timestamp()
+        }
 
-            if response.status_code == 200:
-                self.logger.info(f"Data sent successfully for {self.device_id}")
-            else:
-                self.logger.error(f"Failed to send data: {response.status_code}")
+    async def send_data_to_server(self, session=None):
+        """Send all sensor data to server; returns the HTTP status, or None on error
+        or while the reading is buffered for a binary frame"""
+        if session is None:
+            async with aiohttp.ClientSession(timeout=REQUEST_TIMEOUT) as own_session:
+                return await self.send_data_to_server(own_session)
+
+        if self.frame_readings:
+            self.pending_readings.append(self.build_payload())
+            if len(self.pending_readings) < self.frame_readings:
+                return None
+            return await self.flush_readings(session)
+
+        return await self._post(session, json=self.build_payload())
+
+    async def flush_readings(self, session):
+        """Send buffered readings as one binary frame; returns the HTTP status, or None on error"""
+        if not self.pending_readings:
+            return None
+
+        frame = encode_frame(self.pending_readings)
+        self.pending_readings = []
+        return await self._post(session, data=frame, headers={'Content-Type': WIRE_CONTENT_TYPE})
+
+    async def _post(self, session, **kwargs):
+        try:
+            # Send to IoT data endpoint without blocking the event loop
+            async with session.post(f"{self.api_url}/iot/data", **kwargs) as response:
+                await response.read()
+
+                if response.status == 200:
+                    self.logger.info(f"Data sent successfully for {self.device_id}")
+                else:
+                    self.logger.error(f"Failed to send data: {response.status}")
+                return response.status
 
         except Exception as e:
             self.logger.error(f"Error sending data: {str(e)}")
+            return None
 
     def update_battery(self):
         """Update battery level based on usage"""
@@ -229,35 +307,58 @@ class SmartBandSimulator:
         if self.battery_level <= 0:
             self.is_active = False
 
-    async def run_simulation(self, duration_minutes=60):
-        """Run the IoT device simulation"""
+    def step(self):
+        """Take one reading: update all sensor values"""
+        self.simulate_health_data()
+        self.simulate_environmental_data()
+        self.simulate_movement()
+        self.update_battery()
+
+    async def run_simulation(self, duration_minutes=60, session=None, sink=None):
+        """Run the IoT device simulation.
+
+        Readings are posted to the server (pass a shared session when running
+        many bands), or handed to sink.record(self) instead when a sink is given.
+        """
+        if session is None and sink is None:
+            async with aiohttp.ClientSession(timeout=REQUEST_TIMEOUT) as own_session:
+                return await self.run_simulation(duration_minutes, own_session)
+
         self.logger.info(f"Starting IoT simulation for tourist {self.tourist_id}")
 
-        start_time = datetime.now()
+        start_time = self.clock.now()
         end_time = start_time + timedelta(minutes=duration_minutes)
 
-        while datetime.now() < end_time and self.is_active:
+        while self.clock.now() < end_time and self.is_active:
             # Update all sensor data
-            self.simulate_health_data()
-            self.simulate_environmental_data()
-            self.simulate_movement()
-            self.update_battery()
+            self.step()
 
             # Send data to server
-            await self.send_data_to_server()
+            if sink is not None:
+                sink.record(self)
+            else:
+                await self.send_data_to_server(session)
 
             # Update heartbeat
-            self.last_heartbeat = datetime.now()
+            self.last_heartbeat = self.clock.now()
 
-            # Wait before next reading (simulate 30-second intervals)
-            await asyncio.sleep(30)
+            # Wait before next reading
+            await self.clock.sleep(READING_INTERVAL)
+
+        # Send whatever is left of a partly filled binary frame
+        if sink is None:
+            await self.flush_readings(session)
 
         self.logger.info(f"IoT simulation completed for {self.device_id}")
 
 # IoT Data Processing Service
 class IoTDataProcessor:
-    def __init__(self, api_url="http://localhost:5000/api"):
+    def __init__(self, api_url="http://localhost:5000/api", session=None, coalescer=None):
         self.api_url = api_url
+        # A shared requests.Session pools connections across calls and threads
+        self.session = session or requests
+        # Optional alert_coalescing.AlertCoalescer; without one every alert is sent
+        self.coalescer = coalescer
         self.logger = logging.getLogger("IoTDataProcessor")
 
     def process_iot_data(self, data):
@@ -276,10 +377,15 @@ class IoTDataProcessor:
         # Update tourist safety score based on IoT data
         self.update_safety_score_with_iot(tourist_id, data)
 
+    def process_iot_frame(self, frame):
+        """Process a binary frame of readings (wire_format) from one band"""
+        for data in decode_frame(frame):
+            self.process_iot_data(data)
+
     def store_iot_data(self, data):
         """Store IoT data in database"""
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/iot/store",
                 json=data,
                 timeout=5
@@ -291,8 +397,33 @@ class IoTDataProcessor:
         except Exception as e:
             self.logger.error(f"Error storing IoT data: {str(e)}")
 
+    def store_iot_data_batch(self, readings):
+        """Store many IoT readings with one bulk request; returns whether it succeeded"""
+        try:
+            response = self.session.post(
+                f"{self.api_url}/iot/store/batch",
+                json={'readings': readings},
+                timeout=5
+            )
+
+            if response.status_code != 200:
+                self.logger.error(f"Failed to store {len(readings)} IoT readings: {response.status_code}")
+                return False
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Error storing IoT data batch: {str(e)}")
+            return False
+
     def handle_iot_alert(self, tourist_id, device_id, alert):
         """Handle IoT-generated alerts"""
+        suppressed = 0
+        if self.coalescer is not None:
+            self.send_alert_summaries()
+            suppressed = self.coalescer.admit(tourist_id, device_id, alert)
+            if suppressed is None:
+                return
+
         self.logger.warning(f"IoT Alert for {tourist_id}: {alert['message']}")
 
         # Send alert to emergency response system
@@ -306,9 +437,29 @@ class IoTDataProcessor:
             'data': alert.get('vital_signs') or alert.get('environmental_data'),
             'timestamp': datetime.now().isoformat()
         }
+        if suppressed:
+            alert_payload['suppressed_duplicates'] = suppressed
+
+        self._post_alert(alert_payload)
+
+    def send_alert_summaries(self, flush=False):
+        """Report duplicates the coalescer suppressed for keys it has since dropped
+        (or, with flush=True, for every key)"""
+        for tourist_id, device_id, alert_type, severity, suppressed in self.coalescer.take_summaries(flush):
+            self._post_alert({
+                'tourist_id': tourist_id,
+                'device_id': device_id,
+                'type': 'iot_alert_summary',
+                'subtype': alert_type,
+                'severity': severity,
+                'message': f'{suppressed} repeated {alert_type} alerts suppressed',
+                'suppressed_duplicates': suppressed,
+                'timestamp': datetime.now().isoformat()
+            })
 
+    def _post_alert(self, alert_payload):
         try:
-            requests.post(
+            self.session.post(
                 f"{self.api_url}/emergency/iot-alert",
                 json=alert_payload,
                 timeout=5
@@ -318,6 +469,17 @@ class IoTDataProcessor:
 
     def update_safety_score_with_iot(self, tourist_id, iot_data):
         """Update tourist safety score based on IoT data"""
+        self.send_safety_score(tourist_id, self.calculate_health_score(iot_data), iot_data)
+
+    def update_safety_scores_with_iot(self, readings):
+        """Update safety scores for a micro-batch of IoT readings, scored together"""
+        scores, reasons = score_readings(readings)
+        for data, health_score in zip(readings, scores.tolist()):
+            self.send_safety_score(data.get('tourist_id'), health_score, data)
+        return scores, reasons
+
+    def calculate_health_score(self, iot_data):
+        """Health score (0-100) for one IoT reading; health_scoring.health_scores is the batch version"""
         vital_signs = iot_data.get('vital_signs', {})
         environmental = iot_data.get('environmental_data', {})
         device_status = iot_data.get('device_status', {})
@@ -352,11 +514,12 @@ class IoTDataProcessor:
         if battery < 20:
             health_score -= 5
 
-        health_score = max(0, min(100, health_score))
+        return max(0, min(100, health_score))
 
-        # Send updated score to main system
+    def send_safety_score(self, tourist_id, health_score, iot_data):
+        """Send an updated health score to the main system"""
         try:
-            requests.post(
+            self.session.post(
                 f"{self.api_url}/tourists/{tourist_id}/iot-safety-update",
                 json={'health_score': health_score, 'iot_data': iot_data},
                 timeout=5
@@ -376,13 +539,14 @@ async def main():
         simulator = SmartBandSimulator(tourist_id)
         simulators.append(simulator)
 
-    # Run all simulations concurrently
-    tasks = []
-    for simulator in simulators:
-        task = asyncio.create_task(simulator.run_simulation(duration_minutes=30))
-        tasks.append(task)
+    # Run all simulations concurrently over one pooled HTTP session
+    async with aiohttp.ClientSession(timeout=REQUEST_TIMEOUT) as session:
+        tasks = []
+        for simulator in simulators:
+            task = asyncio.create_task(simulator.run_simulation(duration_minutes=30, session=session))
+            tasks.append(task)
 
-    await asyncio.gather(*tasks)
+        await asyncio.gather(*tasks)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
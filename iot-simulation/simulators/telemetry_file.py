@@ -0,0 +1,141 @@
+# iot-simulation/telemetry_file.py
+import io
+import json
+import zipfile
+
+import numpy as np
+
+from fleet_simulator import READING_FIELDS, alert_mask, as_utc
+
+# Column name -> dtype of each telemetry reading
+TELEMETRY_COLUMNS = {
+    'timestamp_ms': np.int64,
+    'device': np.int32,
+    'heart_rate': np.int16,
+    'body_temperature': np.float32,
+    'activity_level': np.int8,
+    'stress_level': np.int8,
+    'ambient_temperature': np.float32,
+    'humidity': np.float32,
+    'air_quality': np.float32,
+    'latitude': np.float64,
+    'longitude': np.float64,
+    'battery_level': np.float32,
+    'alerts': np.uint8
+}
+
+SCHEMA_VERSION = 1
+
+class ColumnarTelemetryWriter:
+    """Writes simulated readings to a compressed columnar file instead of posting them.
+
+    The file is a zip archive: every chunk_rows readings are flushed as one
+    deflate-compressed .npy member per column (chunk000000/heart_rate.npy,
+    ...), so a day of fleet traffic is written incrementally and each column
+    can be loaded on its own. meta.json lists the columns, chunks and device
+    ids (a reading's 'device' column indexes the device id list).
+    """
+
+    def __init__(self, path, chunk_rows=1000000, compresslevel=1):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.compresslevel = compresslevel
+        self.rows_written = 0
+        self.device_ids = []
+        self._device_index = {}
+        self._zip = zipfile.ZipFile(path, 'w')
+        self._chunks = 0
+        self._buffers = {name: [] for name in TELEMETRY_COLUMNS}
+        self._buffered = 0
+        self._rows = []
+
+    def set_device_ids(self, device_ids):
+        """Device ids for readings appended by index (SmartBandFleet)"""
+        self.device_ids = list(device_ids)
+        self._device_index = {device_id: i for i, device_id in enumerate(self.device_ids)}
+
+    def record(self, device):
+        """Sink for SmartBandSimulator.run_simulation: buffer one reading"""
+        index = self._device_index.get(device.device_id)
+        if index is None:
+            index = self._device_index[device.device_id] = len(self.device_ids)
+            self.device_ids.append(device.device_id)
+
+        self._rows.append((int(as_utc(device.clock.now()).timestamp() * 1000), index,
+                           *(getattr(device, field) for field in READING_FIELDS)))
+        if len(self._rows) >= 65536:
+            self._flush_rows()
+
+    def append(self, columns):
+        """Append a batch of readings given as arrays (alerts computed if missing)"""
+        columns = dict(columns)
+        if 'alerts' not in columns:
+            columns['alerts'] = alert_mask(*(np.asarray(columns[field]) for field in (
+                'heart_rate', 'body_temperature', 'stress_level', 'ambient_temperature',
+                'air_quality', 'battery_level')))
+
+        for name, dtype in TELEMETRY_COLUMNS.items():
+            self._buffers[name].append(np.asarray(columns[name], dtype=dtype))
+        self._buffered += len(columns['device'])
+
+        if self._buffered >= self.chunk_rows:
+            self._write_chunk()
+
+    def close(self):
+        self._flush_rows()
+        self._write_chunk()
+        meta = {
+            'schema': SCHEMA_VERSION,
+            'columns': {name: np.dtype(dtype).str for name, dtype in TELEMETRY_COLUMNS.items()},
+            'chunks': self._chunks,
+            'rows': self.rows_written,
+            'device_ids': self.device_ids
+        }
+        self._write_member('meta.json', json.dumps(meta).encode('utf-8'))
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _flush_rows(self):
+        if self._rows:
+            rows, self._rows = self._rows, []
+            columns = zip(*rows)
+            self.append(dict(zip(['timestamp_ms', 'device'] + READING_FIELDS, columns)))
+
+    def _write_chunk(self):
+        if not self._buffered:
+            return
+
+        for name, parts in self._buffers.items():
+            buffer = io.BytesIO()
+            np.save(buffer, np.concatenate(parts))
+            self._write_member(f"chunk{self._chunks:06d}/{name}.npy", buffer.getvalue())
+            parts.clear()
+
+        self._chunks += 1
+        self.rows_written += self._buffered
+        self._buffered = 0
+
+    def _write_member(self, name, data):
+        # Fixed member timestamps keep seeded runs byte-for-byte identical
+        info = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+        self._zip.writestr(info, data, compress_type=zipfile.ZIP_DEFLATED, compresslevel=self.compresslevel)
+
+def read_telemetry(path, columns=None):
+    """Return (meta, {column: array}) for a file written by ColumnarTelemetryWriter"""
+    with zipfile.ZipFile(path) as archive:
+        meta = json.loads(archive.read('meta.json'))
+        if meta['schema'] != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported telemetry file schema {meta['schema']} (expected {SCHEMA_VERSION})")
+
+        data = {}
+        for name in columns or meta['columns']:
+            parts = [np.load(io.BytesIO(archive.read(f"chunk{chunk:06d}/{name}.npy")))
+                     for chunk in range(meta['chunks'])]
+            data[name] = np.concatenate(parts) if parts else np.empty(0, dtype=meta['columns'][name])
+
+    return meta, data
@@ -0,0 +1,224 @@
+# iot-simulation/wire_format.py
+import argparse
+import json
+import logging
+import struct
+from datetime import datetime, timedelta, timezone
+
+from fleet_simulator import ALERT_RULES, as_utc, build_alert
+
+logger = logging.getLogger("WireFormat")
+
+WIRE_VERSION = 1
+WIRE_CONTENT_TYPE = 'application/vnd.smartband.v1'
+
+# Frame header: magic, version, flags (reserved), reading count; followed by
+# the tourist id and device id (each a length byte + UTF-8) and `count`
+# fixed-width readings, all little-endian
+_MAGIC = b'SB'
+_HEADER = struct.Struct('<2sBBH')
+
+# One reading (32 bytes):
+#   timestamp        u32  epoch seconds (UTC; naive timestamps are taken as UTC)
+#   heartbeat_age    u16  seconds since the previous heartbeat
+#   heart_rate       u8   bpm
+#   body_temperature u16  0.01 °F
+#   activity_level   u8
+#   stress_level     u8
+#   ambient_temp     i16  0.1 °F
+#   humidity         u16  0.01 %
+#   air_quality      u16  0.01
+#   latitude         i32  1e-6 degrees
+#   longitude        i32  1e-6 degrees
+#   accuracy         u16  cm
+#   battery_level    u16  0.01 %
+#   signal           u8   signal strength, top bit set when the band is active
+#   alerts           u8   bit i set when ALERT_RULES[i] fired
+#   reserved         u8
+_READING = struct.Struct('<IHBHBBhHHiiHHBBx')
+
+# (type, severity) of each alert rule, to map alert dicts to mask bits
+_ALERT_BITS = {(alert_type, severity): bit for bit, (_, alert_type, severity) in enumerate(ALERT_RULES)}
+
+class WireFormatError(ValueError):
+    """Raised for frames that are truncated, corrupt or of another version, and for readings it can't encode"""
+
+def encode_frame(payloads):
+    """Encode IoT payloads from one band (shaped like SmartBandSimulator.build_payload) as one frame.
+
+    Values are stored as fixed-point integers at the resolutions listed
+    above, so decoding returns them rounded to that precision.
+    """
+    if not payloads:
+        raise WireFormatError("A frame needs at least one reading")
+    if len(payloads) > 0xFFFF:
+        raise WireFormatError(f"Too many readings for one frame: {len(payloads)}")
+
+    tourist_id = payloads[0]['tourist_id']
+    device_id = payloads[0]['device_id']
+    parts = [_HEADER.pack(_MAGIC, WIRE_VERSION, 0, len(payloads)), _pack_id(tourist_id), _pack_id(device_id)]
+
+    for payload in payloads:
+        if payload['tourist_id'] != tourist_id or payload['device_id'] != device_id:
+            raise WireFormatError("All readings in a frame must come from the same band")
+        parts.append(_pack_reading(payload))
+
+    return b''.join(parts)
+
+def decode_frame(frame):
+    """Decode a frame back into payloads shaped like SmartBandSimulator.build_payload"""
+    try:
+        magic, version, _, count = _HEADER.unpack_from(frame, 0)
+    except struct.error:
+        raise WireFormatError("Truncated frame header")
+    if magic != _MAGIC:
+        raise WireFormatError("Not a smart band frame")
+    if version != WIRE_VERSION:
+        raise WireFormatError(f"Unsupported wire format version {version} (expected {WIRE_VERSION})")
+
+    offset = _HEADER.size
+    tourist_id, offset = _unpack_id(frame, offset)
+    device_id, offset = _unpack_id(frame, offset)
+
+    if len(frame) != offset + count * _READING.size:
+        raise WireFormatError(f"Frame length {len(frame)} doesn't match {count} readings")
+
+    return [
+        _unpack_reading(tourist_id, device_id, values)
+        for values in _READING.iter_unpack(memoryview(frame)[offset:])
+    ]
+
+def _pack_id(value):
+    data = value.encode('utf-8')
+    if len(data) > 255:
+        raise WireFormatError(f"Id too long for a frame: {value!r}")
+    return bytes([len(data)]) + data
+
+def _unpack_id(frame, offset):
+    if offset >= len(frame) or offset + 1 + frame[offset] > len(frame):
+        raise WireFormatError("Truncated frame ids")
+    end = offset + 1 + frame[offset]
+    return bytes(frame[offset + 1:end]).decode('utf-8'), end
+
+def _fixed(value, scale, low, high):
+    """value as a fixed-point integer, clamped to the field's range"""
+    return max(low, min(high, round(value * scale)))
+
+def _pack_reading(payload):
+    vital_signs = payload.get('vital_signs', {})
+    environmental = payload.get('environmental_data', {})
+    location = payload.get('location_data', {})
+    device_status = payload.get('device_status', {})
+
+    timestamp = as_utc(datetime.fromisoformat(payload['timestamp']))
+    last_heartbeat = device_status.get('last_heartbeat')
+    heartbeat_age = (timestamp - as_utc(datetime.fromisoformat(last_heartbeat))).total_seconds() if last_heartbeat else 0
+
+    alerts = 0
+    for alert in payload.get('alerts', []):
+        bit = _ALERT_BITS.get((alert.get('type'), alert.get('severity')))
+        if bit is None:
+            raise WireFormatError(f"Alert {alert.get('type')!r} with severity {alert.get('severity')!r} "
+                                  "has no wire format code")
+        alerts |= 1 << bit
+
+    signal = _fixed(device_status.get('signal_strength', 0), 1, 0, 0x7F)
+    if device_status.get('is_active', True):
+        signal |= 0x80
+
+    return _READING.pack(
+        _fixed(timestamp.timestamp(), 1, 0, 0xFFFFFFFF),
+        _fixed(heartbeat_age, 1, 0, 0xFFFF),
+        _fixed(vital_signs.get('heart_rate', 0), 1, 0, 0xFF),
+        _fixed(vital_signs.get('body_temperature', 0), 100, 0, 0xFFFF),
+        _fixed(vital_signs.get('activity_level', 0), 1, 0, 0xFF),
+        _fixed(vital_signs.get('stress_level', 0), 1, 0, 0xFF),
+        _fixed(environmental.get('ambient_temperature', 0), 10, -0x8000, 0x7FFF),
+        _fixed(environmental.get('humidity', 0), 100, 0, 0xFFFF),
+        _fixed(environmental.get('air_quality', 0), 100, 0, 0xFFFF),
+        _fixed(location.get('latitude', 0), 1000000, -0x80000000, 0x7FFFFFFF),
+        _fixed(location.get('longitude', 0), 1000000, -0x80000000, 0x7FFFFFFF),
+        _fixed(location.get('accuracy', 0), 100, 0, 0xFFFF),
+        _fixed(device_status.get('battery_level', 0), 100, 0, 0xFFFF),
+        signal,
+        alerts
+    )
+
+def _unpack_reading(tourist_id, device_id, values):
+    (epoch, heartbeat_age, heart_rate, body_temperature, activity_level, stress_level, ambient_temperature,
+     humidity, air_quality, latitude, longitude, accuracy, battery_level, signal, alerts) = values
+
+    timestamp = datetime.fromtimestamp(epoch, tz=timezone.utc)
+    iso = timestamp.isoformat()
+    vital_signs = {
+        'heart_rate': heart_rate,
+        'body_temperature': round(body_temperature / 100, 2),
+        'activity_level': activity_level,
+        'stress_level': stress_level,
+        'timestamp': iso
+    }
+    environmental_data = {
+        'ambient_temperature': round(ambient_temperature / 10, 1),
+        'humidity': round(humidity / 100, 2),
+        'air_quality': round(air_quality / 100, 2),
+        'timestamp': iso
+    }
+    battery = round(battery_level / 100, 2)
+
+    alert_values = {**vital_signs, **environmental_data, 'battery_level': battery}
+    return {
+        'tourist_id': tourist_id,
+        'device_id': device_id,
+        'vital_signs': vital_signs,
+        'environmental_data': environmental_data,
+        'location_data': {
+            'latitude': latitude / 1000000,
+            'longitude': longitude / 1000000,
+            'accuracy': accuracy / 100,
+            'timestamp': iso
+        },
+        'device_status': {
+            'device_id': device_id,
+            'battery_level': battery,
+            'is_active': bool(signal & 0x80),
+            'last_heartbeat': (timestamp - timedelta(seconds=heartbeat_age)).isoformat(),
+            'signal_strength': signal & 0x7F
+        },
+        'alerts': [
+            build_alert(bit, alert_values, vital_signs, environmental_data)
+            for bit in range(len(ALERT_RULES)) if alerts & (1 << bit)
+        ],
+        'timestamp': iso
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare JSON and binary frame sizes for simulated readings")
+    parser.add_argument('--devices', type=int, default=1000)
+    parser.add_argument('--frame-readings', type=int, default=10, help="readings per binary frame")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    # Imported here; the codec itself only needs the alert rules
+    from fleet_simulator import SmartBandFleet
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    fleet = SmartBandFleet(args.devices, seed=args.seed, start=start)
+    readings = [[] for _ in range(args.devices)]
+    for tick in range(args.frame_readings):
+        now = start + timedelta(seconds=30 * tick)
+        fleet.step(now)
+        alerts = fleet.detect_anomalies()
+        for i in range(args.devices):
+            readings[i].append(fleet.build_payload(i, now, alerts))
+
+    json_bytes = sum(len(json.dumps(payload).encode('utf-8')) for band in readings for payload in band)
+    single_bytes = sum(len(encode_frame([payload])) for band in readings for payload in band)
+    frame_bytes = sum(len(encode_frame(band)) for band in readings)
+    count = args.devices * args.frame_readings
+
+    logger.info(f"Bytes per reading: JSON {json_bytes / count:.0f}, binary {single_bytes / count:.0f} "
+                f"(one per frame), {frame_bytes / count:.1f} ({args.frame_readings} per frame)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+SIMULATORS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'simulators')
+sys.path.insert(0, SIMULATORS_DIR)
@@ -0,0 +1,40 @@
+# tests/test_clock_hours.py
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from fleet_simulator import SmartBandFleet
+from smart_band_simulator import SimulatedClock, SmartBandSimulator, WallClock
+
+# 08:00 in India is 02:30 UTC: peak activity locally, night time in UTC
+IST_MORNING = datetime.fromisoformat('2024-01-01T08:00:00+05:30')
+
+def test_fleet_reads_the_hour_in_the_callers_offset(monkeypatch):
+    fleet = SmartBandFleet(100, seed=0, start=IST_MORNING)
+    hours = []
+    monkeypatch.setattr(fleet, 'simulate_health_data', hours.append)
+
+    fleet.step(IST_MORNING)
+    assert hours == [8]
+    # Epoch values are still absolute
+    columns = fleet.columns(np.ones(100, dtype=bool), np.zeros(100, dtype=np.uint8), IST_MORNING)
+    assert columns['timestamp_ms'][0] == int(IST_MORNING.timestamp() * 1000)
+
+def test_simulated_band_keeps_the_start_offset():
+    band = SmartBandSimulator('tourist_000001', clock=SimulatedClock(IST_MORNING), seed=0)
+    assert band.clock.now().hour == 8
+
+    for _ in range(20):
+        band.simulate_health_data()
+        assert 5 <= band.activity_level <= 10
+
+    payload = band.build_payload()
+    assert payload['timestamp'] == '2024-01-01T02:30:00+00:00'
+
+@pytest.mark.parametrize('start', ['2024-01-01T08:00:00', '2024-01-01T08:00:00+00:00'])
+def test_naive_start_means_utc(start):
+    assert SimulatedClock(datetime.fromisoformat(start)).now().utcoffset().total_seconds() == 0
+
+def test_wall_clock_is_local_time():
+    assert WallClock().now().utcoffset() == datetime.now().astimezone().utcoffset()
@@ -0,0 +1,41 @@
+# tests/test_health_scoring.py
+import random
+
+import numpy as np
+import pytest
+
+from health_scoring import HEALTH_REASONS, _random_reading, describe_reasons, score_readings
+from smart_band_simulator import IoTDataProcessor
+
+@pytest.fixture(scope='module')
+def processor():
+    return IoTDataProcessor()
+
+def test_batch_scores_match_per_reading_scores(processor):
+    rng = random.Random(0)
+    readings = [_random_reading(rng) for _ in range(20000)]
+
+    scores, _ = score_readings(readings)
+    expected = np.array([processor.calculate_health_score(reading) for reading in readings], dtype=np.float64)
+    mismatches = np.flatnonzero(scores != expected)
+    assert not len(mismatches), f"{len(mismatches)} scores differ, first for {readings[mismatches[0]]}"
+
+def test_fractional_stress_keeps_the_same_score(processor):
+    reading = {
+        'vital_signs': {'heart_rate': 139, 'stress_level': 6.3},
+        'environmental_data': {'air_quality': 30, 'ambient_temperature': 28.7},
+        'device_status': {'battery_level': 19.8}
+    }
+    scores, _ = score_readings([reading])
+    assert scores[0] == processor.calculate_health_score(reading)
+
+def test_reasons_name_every_penalty():
+    reading = {
+        'vital_signs': {'heart_rate': 160, 'body_temperature': 101, 'stress_level': 3},
+        'environmental_data': {'air_quality': 10, 'ambient_temperature': 105},
+        'device_status': {'battery_level': 5}
+    }
+    scores, reasons = score_readings([reading, {}])
+    assert describe_reasons(reasons[0]) == [reason for reason in HEALTH_REASONS if reason != 'heart_rate_abnormal']
+    assert scores[0] == 100 - 20 - 15 - 6 - 10 - 15 - 5
+    assert describe_reasons(reasons[1]) == [] and scores[1] == 100
@@ -0,0 +1,53 @@
+# tests/test_wire_format.py
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from fleet_simulator import SmartBandFleet
+from wire_format import WireFormatError, decode_frame, encode_frame
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+def fleet_readings(n_devices=50, ticks=5):
+    fleet = SmartBandFleet(n_devices, seed=0, start=START)
+    readings = [[] for _ in range(n_devices)]
+    for tick in range(ticks):
+        now = START + timedelta(seconds=30 * tick)
+        fleet.step(now)
+        alerts = fleet.detect_anomalies()
+        for i in range(n_devices):
+            readings[i].append(fleet.build_payload(i, now, alerts))
+    return readings
+
+@pytest.fixture(params=['UTC', 'Asia/Kolkata', 'America/New_York'])
+def local_timezone(request, monkeypatch):
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+def test_round_trip_keeps_timestamps_and_alerts(local_timezone):
+    for band in fleet_readings():
+        for sent, received in zip(band, decode_frame(encode_frame(band))):
+            assert datetime.fromisoformat(received['timestamp']) == datetime.fromisoformat(sent['timestamp'])
+            assert received['device_status']['last_heartbeat'] == sent['device_status']['last_heartbeat']
+            assert [(a['type'], a['severity']) for a in received['alerts']] == \
+                   [(a['type'], a['severity']) for a in sent['alerts']]
+            assert received['vital_signs']['heart_rate'] == sent['vital_signs']['heart_rate']
+
+def test_naive_timestamps_are_utc(local_timezone):
+    payload = fleet_readings(1, 1)[0][0]
+    payload['timestamp'] = '2024-01-01T00:00:00'
+    payload['device_status']['last_heartbeat'] = '2024-01-01T00:00:00'
+
+    decoded, = decode_frame(encode_frame([payload]))
+    assert decoded['timestamp'] == '2024-01-01T00:00:00+00:00'
+
+def test_unknown_alert_is_a_clear_error():
+    payload = fleet_readings(1, 1)[0][0]
+    payload['alerts'] = [{'type': 'fall_detected', 'severity': 'critical'}]
+
+    with pytest.raises(WireFormatError, match="fall_detected"):
+        encode_frame([payload])
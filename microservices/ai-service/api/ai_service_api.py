@@ -1,198 +1,471 @@
 # api/ai_service_api.py
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response
 from flask_cors import CORS
 import joblib
 import numpy as np
 import pandas as pd
 from datetime import datetime
 import logging
+import math
 import os
+import time
 
 # Import our ML models
 import sys
-sys.path.append('../training')
-from anomaly_detection import TouristAnomalyDetector
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(SERVICE_DIR, 'training'))
+from anomaly_detection import TouristAnomalyDetector, RAW_FEATURE_COLUMNS
 from risk_assessment import TouristRiskAssessment
+from risk_cache import CachedRiskAssessment, parse_quantization
+from safety_score import SafetyScoreEngine, ANOMALY_DEFAULTS, RISK_DEFAULTS as SAFETY_RISK_DEFAULTS
+from model_registry import ModelRegistry, model_file
+from metrics import MetricsRegistry, add_stage_time
+from structured_logging import configure_logging, dropped_records, PredictionLogSampler
+from telemetry_store import TelemetryRecorder
 
 app = Flask(__name__)
 CORS(app)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging. LOG_FORMAT=json writes compact JSON lines from a
+# background thread; LOG_SAMPLE_RATE samples successful predictions, while
+# anomalies, high risk and errors are always logged
+LOG_STRUCTURED = os.environ.get('LOG_FORMAT', 'text') == 'json'
+prediction_log_sampler = PredictionLogSampler(float(os.environ.get('LOG_SAMPLE_RATE', 1.0)))
+
+def setup_logging():
+    """(Re)configure logging for this process (call again after forking)"""
+    configure_logging(structured=LOG_STRUCTURED)
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
-# Global model instances
-anomaly_detector = None
-risk_assessor = None
+# Versioned models; endpoints read registry.active once per request
+registry = None
+
+# Request metrics, exposed on /metrics. With PROMETHEUS_MULTIPROC_DIR set
+# (gunicorn.conf.py sets it), every worker writes its values there and
+# /metrics reports the sum over all workers; otherwise they're per process
+metrics = MetricsRegistry(multiprocess_dir=os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1))
+REQUEST_COUNT = metrics.counter(
+    'ai_service_requests_total', 'HTTP requests handled', ('endpoint', 'method', 'status'))
+REQUESTS_IN_FLIGHT = metrics.gauge(
+    'ai_service_requests_in_flight', 'HTTP requests currently being handled', ('endpoint',))
+REQUEST_LATENCY = metrics.histogram(
+    'ai_service_request_duration_seconds', 'End-to-end request latency', ('endpoint',))
+STAGE_LATENCY = metrics.histogram(
+    'ai_service_stage_duration_seconds',
+    "Time per request stage; anomaly_*, risk_* and safety_* stages are parts of 'model'",
+    ('endpoint', 'stage'))
+
+# Required input fields
+ANOMALY_REQUIRED_FIELDS = [
+    'hour', 'speed_kmh', 'distance_from_entry_km', 'battery_level',
+    'gps_accuracy_m', 'risk_zone_distance_km', 'days_since_entry'
+]
+
+RISK_REQUIRED_FIELDS = [
+    'weather_risk', 'terrain_type', 'time_of_day', 'season',
+    'tourist_experience', 'group_size', 'has_guide', 'emergency_equipment'
+]
+
+# Defaults for optional risk fields
+RISK_DEFAULTS = {
+    'elevation': 100,
+    'temperature': 25,
+    'humidity': 70
+}
+
+# Model artifacts, either directly in MODEL_PATH or in versioned subdirectories
+MODEL_PATH = os.environ.get('MODEL_PATH', os.path.join(SERVICE_DIR, 'models'))
+MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 30))
+
+# Record validated anomaly readings to this ring store for online retraining
+# (training/online_training.py); unset disables recording
+TELEMETRY_STORE = os.environ.get('TELEMETRY_STORE')
+TELEMETRY_CAPACITY = int(os.environ.get('TELEMETRY_CAPACITY', 1000000))
+telemetry_recorder = TelemetryRecorder(TELEMETRY_STORE, capacity=TELEMETRY_CAPACITY) if TELEMETRY_STORE else None
+
+# Risk levels whose predictions are always logged
+HIGH_RISK_LEVELS = ('high', 'critical')
+
+# Upper bound on readings accepted by a single batch request
+MAX_BATCH_SIZE = 10000
 
 def load_models():
-    """Load pre-trained models"""
-    global anomaly_detector, risk_assessor
+    """Load the newest model version from MODEL_PATH"""
+    global registry
 
     try:
-        # Load anomaly detection model
-        anomaly_detector = TouristAnomalyDetector()
-        anomaly_detector.load_model('../models/tourist_anomaly_detector.pkl')
-        logger.info("Anomaly detection model loaded successfully")
-
-        # Load risk assessment model
-        risk_assessor = TouristRiskAssessment()
-        risk_assessor.load_model('../models/tourist_risk_assessment.pkl')
-        logger.info("Risk assessment model loaded successfully")
+        registry = ModelRegistry(
+            MODEL_PATH,
+            build_models,
+            warmup=warm_up_models,
+            poll_interval=MODEL_RELOAD_INTERVAL
+        )
+        registry.refresh()
+        logger.info(f"Model version {registry.active.version} loaded successfully")
 
     except Exception as e:
         logger.error(f"Failed to load models: {str(e)}")
         raise e
 
+def start_model_watcher(on_reload=None):
+    """Hot-reload new model versions in the background; on_reload(bundle) runs after each swap"""
+    if registry is not None:
+        registry.on_reload = on_reload
+        registry.start_watching()
+
+def start_metrics_writer():
+    """Write this process's metrics to PROMETHEUS_MULTIPROC_DIR in the background (call after forking)"""
+    metrics.start_flushing(METRICS_FLUSH_INTERVAL)
+
+def start_telemetry_recorder():
+    """Start writing recorded readings to the telemetry store (call after forking)"""
+    if telemetry_recorder is not None:
+        telemetry_recorder.start()
+
+def record_telemetry(readings):
+    """Queue scored readings for the telemetry store"""
+    if telemetry_recorder is not None:
+        telemetry_recorder.record([[float(reading[col]) for col in RAW_FEATURE_COLUMNS] for reading in readings])
+
+def build_models(directory):
+    """Load one model version from a directory"""
+    # MODEL_MMAP=1 memory-maps the numpy arrays in the artifacts read-only, so
+    # worker processes share those pages instead of each holding a copy.
+    # Compact .tsm artifacts are used instead of the pickles when present
+    mmap_mode = 'r' if os.environ.get('MODEL_MMAP', '0') == '1' else None
+
+    # Load anomaly detection model
+    anomaly_detector = TouristAnomalyDetector()
+    anomaly_detector.load_model(model_file(directory, 'anomaly'), mmap_mode=mmap_mode)
+    logger.info("Anomaly detection model loaded successfully")
+
+    # Load risk assessment model
+    risk_assessor = TouristRiskAssessment()
+    risk_assessor.load_model(model_file(directory, 'risk'), mmap_mode=mmap_mode)
+    logger.info("Risk assessment model loaded successfully")
+
+    # Memoize repeated risk requests (RISK_CACHE_SIZE=0 disables; keys are exact
+    # unless RISK_CACHE_QUANTIZATION opts into snapping, e.g. "elevation=10")
+    cache_size = int(os.environ.get('RISK_CACHE_SIZE', 4096))
+    if cache_size > 0:
+        risk_assessor = CachedRiskAssessment(
+            risk_assessor,
+            max_size=cache_size,
+            quantization=parse_quantization(os.environ.get('RISK_CACHE_QUANTIZATION'))
+        )
+        logger.info(f"Risk prediction cache enabled: {risk_assessor.stats()}")
+
+    # Fused safety score pipeline (SAFETY_SCORE_WORKERS > 1 runs both models concurrently)
+    safety_engine = SafetyScoreEngine(
+        anomaly_detector,
+        risk_assessor,
+        max_workers=int(os.environ.get('SAFETY_SCORE_WORKERS', 0))
+    )
+
+    return anomaly_detector, risk_assessor, safety_engine
+
+def warm_up_models(models):
+    """Run a few dummy predictions through freshly loaded models"""
+    for _ in range(3):
+        models.anomaly_detector.predict(dict(ANOMALY_DEFAULTS))
+        models.risk_assessor.predict_risk(dict(SAFETY_RISK_DEFAULTS))
+        models.safety_engine.score({})
+
+    # Don't let warm-up requests show up in the cache counters
+    if isinstance(models.risk_assessor, CachedRiskAssessment):
+        models.risk_assessor.clear()
+
+def active_models():
+    """The model bundle currently serving requests, or None"""
+    return registry.active if registry is not None else None
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = g.stage_mark = time.perf_counter()
+    g.stage_timings = {}
+    g.metrics_endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUESTS_IN_FLIGHT.child(g.metrics_endpoint).inc()
+
+@app.after_request
+def record_request_metrics(response):
+    # Whatever ran since the last stage mark is building the response
+    mark_stage('respond')
+
+    endpoint = g.metrics_endpoint
+    REQUEST_COUNT.child(endpoint, request.method, str(response.status_code)).inc()
+    REQUEST_LATENCY.child(endpoint).observe(time.perf_counter() - g.request_start)
+    for stage, seconds in g.stage_timings.items():
+        STAGE_LATENCY.child(endpoint, stage).observe(seconds)
+
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    if 'metrics_endpoint' in g:
+        REQUESTS_IN_FLIGHT.child(g.metrics_endpoint).dec()
+
+def mark_stage(stage):
+    """Attribute the time since the previous mark to a request stage"""
+    now = time.perf_counter()
+    add_stage_time(g.stage_timings, stage, now - g.stage_mark)
+    g.stage_mark = now
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    health = {
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'models_loaded': anomaly_detector is not None and risk_assessor is not None
-    })
+        'models_loaded': models_loaded()
+    }
+
+    if registry is not None:
+        health['model'] = registry.status()
+
+    if LOG_STRUCTURED:
+        health['log_records_dropped'] = dropped_records()
+
+    if telemetry_recorder is not None:
+        health['telemetry_dropped'] = telemetry_recorder.dropped
+
+    models = active_models()
+    if models is not None and isinstance(models.risk_assessor, CachedRiskAssessment):
+        health['risk_cache'] = models.risk_assessor.stats()
+
+    return jsonify(health)
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: only route traffic here once the models are loaded"""
+    ready = models_loaded()
+    return jsonify({
+        'ready': ready,
+        'models_loaded': ready,
+        'pid': os.getpid()
+    }), 200 if ready else 503
+
+def models_loaded():
+    """Whether both models are loaded and the service can serve predictions"""
+    return active_models() is not None
 
 @app.route('/predict/anomaly', methods=['POST'])
 def predict_anomaly():
     """Detect anomalous tourist behavior"""
     try:
+        models = active_models()
+        if models is None:
+            return jsonify({'error': 'Models not loaded'}), 503
+
         data = request.get_json()
 
         # Validate input
-        required_fields = [
-            'hour', 'speed_kmh', 'distance_from_entry_km', 'battery_level',
-            'gps_accuracy_m', 'risk_zone_distance_km', 'days_since_entry'
-        ]
-
-        for field in required_fields:
+        for field in ANOMALY_REQUIRED_FIELDS:
             if field not in data:
                 return jsonify({'error': f'Missing field: {field}'}), 400
 
+        mark_stage('parse')
+
         # Predict anomaly
-        result = anomaly_detector.predict(data)
+        result = models.anomaly_detector.predict(data, stage_timings=g.stage_timings)
+        record_telemetry([data])
+        mark_stage('model')
 
         # Add interpretation
         interpretation = interpret_anomaly_result(result, data)
         result['interpretation'] = interpretation
+        mark_stage('postprocess')
 
-        logger.info(f"Anomaly prediction: {result}")
+        log_prediction("Anomaly prediction", result, flagged=result['is_anomaly'])
         return jsonify(result)
 
     except Exception as e:
         logger.error(f"Anomaly prediction error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/predict/anomaly/batch', methods=['POST'])
+def predict_anomaly_batch():
+    """Detect anomalous tourist behavior for a batch of readings"""
+    try:
+        models = active_models()
+        if models is None:
+            return jsonify({'error': 'Models not loaded'}), 503
+
+        data = request.get_json()
+        readings = data.get('readings') if isinstance(data, dict) else data
+
+        if not isinstance(readings, list):
+            return jsonify({'error': 'Expected a list of readings'}), 400
+
+        if len(readings) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Batch too large: max {MAX_BATCH_SIZE} readings'}), 400
+
+        # Validate each reading; invalid rows get an error instead of failing the batch
+        results = [None] * len(readings)
+        valid_indices = []
+        valid_readings = []
+
+        for i, reading in enumerate(readings):
+            error = validate_anomaly_reading(reading, models.anomaly_detector)
+            if error:
+                results[i] = {'error': error}
+            else:
+                valid_indices.append(i)
+                valid_readings.append({field: float(reading[field]) for field in ANOMALY_REQUIRED_FIELDS})
+
+        mark_stage('parse')
+
+        # Predict anomalies for all valid rows at once
+        predictions = models.anomaly_detector.predict_batch(valid_readings, stage_timings=g.stage_timings)
+        record_telemetry(valid_readings)
+        mark_stage('model')
+
+        for i, reading, result in zip(valid_indices, valid_readings, predictions):
+            result['interpretation'] = interpret_anomaly_result(result, reading)
+            results[i] = result
+        mark_stage('postprocess')
+
+        anomaly_count = sum(1 for result in predictions if result['is_anomaly'])
+        log_prediction("Anomaly batch prediction", {
+            'scored': len(valid_readings),
+            'total': len(readings),
+            'anomalies': anomaly_count
+        }, flagged=anomaly_count > 0 or len(valid_readings) < len(readings))
+
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'errors': len(readings) - len(valid_readings)
+        })
+
+    except Exception as e:
+        logger.error(f"Anomaly batch prediction error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/predict/risk', methods=['POST'])
 def predict_risk():
     """Assess risk level for tourist conditions"""
     try:
+        models = active_models()
+        if models is None:
+            return jsonify({'error': 'Models not loaded'}), 503
+
         data = request.get_json()
 
         # Validate input
-        required_fields = [
-            'weather_risk', 'terrain_type', 'time_of_day', 'season',
-            'tourist_experience', 'group_size', 'has_guide', 'emergency_equipment'
-        ]
-
-        for field in required_fields:
+        for field in RISK_REQUIRED_FIELDS:
             if field not in data:
                 return jsonify({'error': f'Missing field: {field}'}), 400
 
         # Set defaults for optional fields
-        data.setdefault('elevation', 100)
-        data.setdefault('temperature', 25)
-        data.setdefault('humidity', 70)
+        for field, default in RISK_DEFAULTS.items():
+            data.setdefault(field, default)
+
+        error = validate_risk_conditions(data, models.risk_assessor)
+        if error:
+            return jsonify({'error': error}), 400
+
+        mark_stage('parse')
 
         # Predict risk
-        result = risk_assessor.predict_risk(data)
+        result = models.risk_assessor.predict_risk(data, stage_timings=g.stage_timings)
+        mark_stage('model')
 
         # Add recommendations
         recommendations = generate_risk_recommendations(result, data)
         result['recommendations'] = recommendations
+        mark_stage('postprocess')
 
-        logger.info(f"Risk prediction: {result}")
+        log_prediction("Risk prediction", result, flagged=result['risk_level'] in HIGH_RISK_LEVELS)
         return jsonify(result)
 
     except Exception as e:
         logger.error(f"Risk prediction error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/predict/risk/batch', methods=['POST'])
+def predict_risk_batch():
+    """Assess risk levels for a batch of tourist conditions"""
+    try:
+        models = active_models()
+        if models is None:
+            return jsonify({'error': 'Models not loaded'}), 503
+
+        data = request.get_json()
+        conditions_list = data.get('conditions') if isinstance(data, dict) else data
+
+        if not isinstance(conditions_list, list):
+            return jsonify({'error': 'Expected a list of conditions'}), 400
+
+        if len(conditions_list) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Batch too large: max {MAX_BATCH_SIZE} conditions'}), 400
+
+        # Validate each entry; invalid rows get an error instead of failing the batch
+        results = [None] * len(conditions_list)
+        valid_indices = []
+        valid_conditions = []
+
+        for i, conditions in enumerate(conditions_list):
+            error = validate_risk_conditions(conditions, models.risk_assessor)
+            if error:
+                results[i] = {'error': error}
+            else:
+                valid_indices.append(i)
+                valid_conditions.append({**RISK_DEFAULTS, **conditions})
+
+        mark_stage('parse')
+
+        # Predict risk for all valid rows at once
+        predictions = models.risk_assessor.predict_risk_batch(valid_conditions, stage_timings=g.stage_timings)
+        mark_stage('model')
+
+        for i, conditions, result in zip(valid_indices, valid_conditions, predictions):
+            result['recommendations'] = generate_risk_recommendations(result, conditions)
+            results[i] = result
+        mark_stage('postprocess')
+
+        high_risk_count = sum(1 for result in predictions if result['risk_level'] in HIGH_RISK_LEVELS)
+        log_prediction("Risk batch prediction", {
+            'scored': len(valid_conditions),
+            'total': len(conditions_list),
+            'high_risk': high_risk_count
+        }, flagged=high_risk_count > 0 or len(valid_conditions) < len(conditions_list))
+
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'errors': len(conditions_list) - len(valid_conditions)
+        })
+
+    except Exception as e:
+        logger.error(f"Risk batch prediction error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/analyze/safety-score', methods=['POST'])
 def calculate_safety_score():
     """Calculate comprehensive safety score"""
     try:
+        models = active_models()
+        if models is None:
+            return jsonify({'error': 'Models not loaded'}), 503
+
         data = request.get_json()
 
-        # Get anomaly prediction
-        anomaly_data = {
-            'hour': data.get('hour', 12),
-            'speed_kmh': data.get('speed_kmh', 3),
-            'distance_from_entry_km': data.get('distance_from_entry_km', 5),
-            'battery_level': data.get('battery_level', 80),
-            'gps_accuracy_m': data.get('gps_accuracy_m', 10),
-            'risk_zone_distance_km': data.get('risk_zone_distance_km', 5),
-            'days_since_entry': data.get('days_since_entry', 1)
-        }
-
-        anomaly_result = anomaly_detector.predict(anomaly_data)
-
-        # Get risk assessment
-        risk_data = {
-            'weather_risk': data.get('weather_risk', 'clear'),
-            'terrain_type': data.get('terrain_type', 'urban'),
-            'time_of_day': data.get('time_of_day', 'afternoon'),
-            'season': data.get('season', 'spring'),
-            'tourist_experience': data.get('tourist_experience', 'intermediate'),
-            'group_size': data.get('group_size', 2),
-            'has_guide': data.get('has_guide', 0),
-            'emergency_equipment': data.get('emergency_equipment', 0),
-            'elevation': data.get('elevation', 100),
-            'temperature': data.get('temperature', 25),
-            'humidity': data.get('humidity', 70)
-        }
-
-        risk_result = risk_assessor.predict_risk(risk_data)
-
-        # Calculate composite safety score (0-100)
-        base_score = 100
-
-        # Deduct for anomalous behavior
-        if anomaly_result['is_anomaly']:
-            base_score -= 30 * anomaly_result['confidence']
-
-        # Deduct for risk level
-        risk_penalties = {'low': 0, 'medium': 15, 'high': 35, 'critical': 60}
-        base_score -= risk_penalties.get(risk_result['risk_level'], 0)
-
-        # Additional factors
-        if data.get('battery_level', 100) < 20:
-            base_score -= 10
-
-        if data.get('gps_accuracy_m', 10) > 50:
-            base_score -= 5
-
-        if data.get('risk_zone_distance_km', 5) < 1:
-            base_score -= 15
-
-        safety_score = max(0, min(100, base_score))
-
-        result = {
-            'safety_score': int(safety_score),
-            'risk_level': risk_result['risk_level'],
-            'anomaly_detected': anomaly_result['is_anomaly'],
-            'anomaly_confidence': anomaly_result['confidence'],
-            'risk_probabilities': risk_result['probabilities'],
-            'factors': {
-                'behavior_anomaly': anomaly_result['is_anomaly'],
-                'environmental_risk': risk_result['risk_level'],
-                'technical_issues': {
-                    'low_battery': data.get('battery_level', 100) < 20,
-                    'poor_gps': data.get('gps_accuracy_m', 10) > 50,
-                    'near_risk_zone': data.get('risk_zone_distance_km', 5) < 1
-                }
-            }
-        }
+        error = validate_safety_request(data, models)
+        if error:
+            return jsonify({'error': error}), 400
+
+        mark_stage('parse')
+
+        result = models.safety_engine.score(data, stage_timings=g.stage_timings)
+        mark_stage('model')
 
         return jsonify(result)
 
@@ -200,6 +473,135 @@ def calculate_safety_score():
         logger.error(f"Safety score calculation error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/analyze/safety-score/batch', methods=['POST'])
+def calculate_safety_score_batch():
+    """Calculate comprehensive safety scores for a batch of tourists"""
+    try:
+        models = active_models()
+        if models is None:
+            return jsonify({'error': 'Models not loaded'}), 503
+
+        data = request.get_json()
+        requests_list = data.get('tourists') if isinstance(data, dict) else data
+
+        if not isinstance(requests_list, list):
+            return jsonify({'error': 'Expected a list of tourists'}), 400
+
+        if len(requests_list) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Batch too large: max {MAX_BATCH_SIZE} tourists'}), 400
+
+        # Validate each entry with defaults applied; invalid rows get an error
+        results = [None] * len(requests_list)
+        valid_indices = []
+        valid_requests = []
+
+        for i, entry in enumerate(requests_list):
+            error = validate_safety_request(entry, models)
+            if error:
+                results[i] = {'error': error}
+            else:
+                valid_indices.append(i)
+                valid_requests.append(entry)
+
+        mark_stage('parse')
+
+        scored = models.safety_engine.score_batch(valid_requests, stage_timings=g.stage_timings)
+        mark_stage('model')
+
+        for i, result in zip(valid_indices, scored):
+            if 'tourist_id' in requests_list[i]:
+                result['tourist_id'] = requests_list[i]['tourist_id']
+            results[i] = result
+        mark_stage('postprocess')
+
+        anomaly_count = sum(1 for result in scored if result['anomaly_detected'])
+        log_prediction("Safety score batch", {
+            'scored': len(valid_requests),
+            'total': len(requests_list),
+            'anomalies': anomaly_count
+        }, flagged=anomaly_count > 0 or len(valid_requests) < len(requests_list))
+
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'errors': len(requests_list) - len(valid_requests)
+        })
+
+    except Exception as e:
+        logger.error(f"Safety score batch calculation error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def log_prediction(event, fields, flagged=False):
+    """Log a prediction if sampled in; flagged results are always logged"""
+    if prediction_log_sampler.should_log(flagged):
+        # Lazy %-formatting: in JSON mode the listener thread serialises fields
+        logger.info("%s: %s", event, fields, extra={'event': event, 'fields': fields})
+
+def validate_safety_request(entry, models):
+    """Return an error message for an invalid safety score request, or None"""
+    if not isinstance(entry, dict):
+        return 'Request must be an object'
+
+    return (validate_anomaly_reading({**ANOMALY_DEFAULTS, **entry}, models.anomaly_detector)
+            or validate_risk_conditions({**SAFETY_RISK_DEFAULTS, **entry}, models.risk_assessor))
+
+def validate_anomaly_reading(reading, anomaly_detector=None):
+    """Return an error message for an invalid anomaly reading, or None"""
+    if not isinstance(reading, dict):
+        return 'Reading must be an object'
+
+    # Values the model would scale past float32 fail inside the trees like infinities
+    limits = anomaly_detector.raw_value_limits() if anomaly_detector is not None else {}
+
+    for field in ANOMALY_REQUIRED_FIELDS:
+        if field not in reading:
+            return f'Missing field: {field}'
+
+        value = reading[field]
+        if isinstance(value, bool) or not is_finite_number(value):
+            return f'Invalid value for field: {field}'
+
+        if field in limits and not limits[field][0] < value < limits[field][1]:
+            return f'Value out of range for field: {field}'
+
+    return None
+
+def validate_risk_conditions(conditions, risk_assessor):
+    """Return an error message for an invalid set of risk conditions, or None"""
+    if not isinstance(conditions, dict):
+        return 'Conditions must be an object'
+
+    for field in RISK_REQUIRED_FIELDS:
+        if field not in conditions:
+            return f'Missing field: {field}'
+
+    for field, codes in risk_assessor.category_codes.items():
+        value = conditions[field]
+        if not isinstance(value, str) or value not in codes:
+            return f'Unknown value for field {field}: {value}'
+
+    limits = risk_assessor.raw_value_limits()
+    for field in ['group_size', 'has_guide', 'emergency_equipment', *RISK_DEFAULTS]:
+        value = conditions.get(field, RISK_DEFAULTS.get(field, 0))
+        if not is_finite_number(value):
+            return f'Invalid value for field: {field}'
+
+        # Values the model would scale past float32 fail inside the trees like infinities
+        if not limits[field][0] < value < limits[field][1]:
+            return f'Value out of range for field: {field}'
+
+    return None
+
+def is_finite_number(value):
+    """Whether value is an int or float that converts to a finite float"""
+    if not isinstance(value, (int, float)):
+        return False
+    try:
+        # JSON allows Infinity, and ints too large for a float overflow here
+        return math.isfinite(value)
+    except OverflowError:
+        return False
+
 def interpret_anomaly_result(result, data):
     """Provide human-readable interpretation of anomaly detection"""
     if not result['is_anomaly']:
@@ -264,6 +666,8 @@ def generate_risk_recommendations(risk_result, conditions):
 if __name__ == '__main__':
     # Load models on startup
     load_models()
+    start_model_watcher()
+    start_telemetry_recorder()
 
     # Start Flask app
     app.run(host='0.0.0.0', port=5001, debug=False)
\ No newline at end of file
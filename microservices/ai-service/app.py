@@ -1,8 +1,10 @@
-from api.ai_service_api import app, load_models
+from api.ai_service_api import app, load_models, start_model_watcher, start_telemetry_recorder
 
 if __name__ == '__main__':
     # Load models on startup
     load_models()
+    start_model_watcher()
+    start_telemetry_recorder()
     
     # Start Flask app
     app.run(host='0.0.0.0', port=5001, debug=False)
@@ -0,0 +1,316 @@
+# benchmark.py
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(SERVICE_DIR, 'training'))
+from anomaly_detection import TouristAnomalyDetector, RAW_FEATURE_COLUMNS
+from risk_assessment import TouristRiskAssessment
+from model_registry import ModelRegistry, model_file
+
+MODEL_KINDS = ['anomaly', 'risk']
+
+# Metrics compared by --compare, and whether a larger value is better
+COMPARED_METRICS = {
+    'load_seconds': False,
+    'single_p50_us': False,
+    'single_p99_us': False,
+    'batch_p50_us': False,
+    'batch_p99_us': False,
+    'rows_per_cpu_second': True,
+    'peak_rss_mb': False,
+    'request_p50_us': False,
+    'request_p99_us': False,
+    'requests_per_second': True
+}
+
+# Settings that change what is measured; --compare refuses reports that differ in any
+WORKLOAD_SETTINGS = ['rows', 'batch_size', 'batch_repeats', 'mmap', 'requests', 'endpoint_batch_size', 'seed']
+
+def synthetic_inputs(kind, n_rows, seed):
+    """Request payloads for a model, drawn from its synthetic training data generator"""
+    if kind == 'anomaly':
+        df = TouristAnomalyDetector().create_synthetic_training_data(n_samples=n_rows, seed=seed)
+        records = df[RAW_FEATURE_COLUMNS].to_dict('records')
+    else:
+        df = TouristRiskAssessment().create_risk_training_data(n_samples=n_rows, seed=seed)
+        records = df.drop(columns='risk_level').to_dict('records')
+
+    # Native Python values, as a parsed JSON request body would hold
+    return json.loads(json.dumps(records, default=lambda value: value.item()))[:n_rows]
+
+def latency_summary(seconds, prefix):
+    """p50/p99/mean in microseconds for a list of durations in seconds"""
+    us = np.asarray(seconds) * 1e6
+    return {
+        f'{prefix}_p50_us': round(float(np.percentile(us, 50)), 1),
+        f'{prefix}_p99_us': round(float(np.percentile(us, 99)), 1),
+        f'{prefix}_mean_us': round(float(us.mean()), 1)
+    }
+
+def newest_version(model_path):
+    """(version, directory) the service would serve from model_path"""
+    versions = ModelRegistry(model_path, loader=None).available_versions()
+    if not versions:
+        raise FileNotFoundError(f"No model artifacts found in {model_path}")
+    return versions[-1]
+
+def load_model(kind, directory, mmap_mode):
+    model = TouristAnomalyDetector() if kind == 'anomaly' else TouristRiskAssessment()
+    return model.load_model(model_file(directory, kind), mmap_mode=mmap_mode)
+
+def benchmark_model(kind, directory, args):
+    """Load time, single-row and batch latency, throughput and peak memory of one model"""
+    rss_before_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    load_seconds = []
+    for _ in range(args.load_repeats):
+        start = time.perf_counter()
+        model = load_model(kind, directory, 'r' if args.mmap else None)
+        load_seconds.append(time.perf_counter() - start)
+
+    rows = synthetic_inputs(kind, args.rows, args.seed)
+    if kind == 'anomaly':
+        predict_one, predict_batch = model.predict, model.predict_batch
+    else:
+        predict_one, predict_batch = model.predict_risk, model.predict_risk_batch
+
+    # Warm up lazily initialised state before timing
+    for row in rows[:10]:
+        predict_one(row)
+
+    single = []
+    for row in rows:
+        start = time.perf_counter()
+        predict_one(row)
+        single.append(time.perf_counter() - start)
+
+    batches = [rows[i:i + args.batch_size] for i in range(0, len(rows), args.batch_size)]
+    batch = []
+    batch_rows = 0
+    cpu_start = time.process_time()
+    for _ in range(args.batch_repeats):
+        for rows_batch in batches:
+            start = time.perf_counter()
+            predict_batch(rows_batch)
+            batch.append(time.perf_counter() - start)
+            batch_rows += len(rows_batch)
+    cpu_seconds = time.process_time() - cpu_start
+
+    return {
+        'file': os.path.basename(model_file(directory, kind)),
+        'load_seconds': round(min(load_seconds), 6),
+        **latency_summary(single, 'single'),
+        'batch_size': args.batch_size,
+        **latency_summary(batch, 'batch'),
+        'batch_us_per_row': round(sum(batch) / batch_rows * 1e6, 2),
+        # CPU time covers every thread, so this is throughput per core
+        'rows_per_cpu_second': round(batch_rows / cpu_seconds, 1),
+        # ru_maxrss is in KB on Linux
+        'rss_before_load_mb': round(rss_before_mb, 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+def _run_model_task(task):
+    kind, directory, args = task
+    return kind, benchmark_model(kind, directory, args)
+
+def benchmark_models(kinds, directory, args):
+    """Benchmark each model in its own fresh process so peak memory is its own"""
+    results = {}
+    with multiprocessing.Pool(processes=1, maxtasksperchild=1) as pool:
+        for kind, result in pool.imap(_run_model_task, [(kind, directory, args) for kind in kinds]):
+            print(format_model_result(kind, result))
+            results[kind] = result
+    return results
+
+def endpoint_payloads(args):
+    """Request bodies for each endpoint, cycled through by the load threads"""
+    anomaly = synthetic_inputs('anomaly', args.rows, args.seed)
+    risk = synthetic_inputs('risk', args.rows, args.seed)
+    size = args.endpoint_batch_size
+
+    return {
+        '/predict/anomaly': anomaly,
+        '/predict/anomaly/batch': [{'readings': anomaly[i:i + size]} for i in range(0, len(anomaly), size)],
+        '/predict/risk': risk,
+        '/predict/risk/batch': [{'conditions': risk[i:i + size]} for i in range(0, len(risk), size)],
+        '/analyze/safety-score': [{**a, **r} for a, r in zip(anomaly, risk)]
+    }
+
+def drive_endpoint(app, endpoint, payloads, concurrency, n_requests):
+    """Send n_requests POSTs from concurrency threads, each with its own test client"""
+    counter = itertools.count()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        client = app.test_client()
+        local_latencies, local_errors = [], 0
+        while True:
+            i = next(counter)
+            if i >= n_requests:
+                break
+            start = time.perf_counter()
+            response = client.post(endpoint, json=payloads[i % len(payloads)])
+            local_latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        'requests': n_requests,
+        'errors': sum(errors),
+        **latency_summary(latencies, 'request'),
+        'requests_per_second': round(n_requests / elapsed, 1)
+    }
+
+def benchmark_endpoints(model_path, args):
+    """Drive the Flask endpoints in-process at each concurrency level"""
+    # The service reads its configuration at import time
+    os.environ['MODEL_PATH'] = model_path
+    # Repeated benchmark payloads would otherwise time cache hits, not the model
+    os.environ['RISK_CACHE_SIZE'] = '0'
+    from api.ai_service_api import app, load_models
+    load_models()
+
+    payloads = endpoint_payloads(args)
+    results = []
+    for endpoint in args.endpoints:
+        # One untimed pass so first-request setup isn't counted
+        drive_endpoint(app, endpoint, payloads[endpoint], 1, 5)
+        for concurrency in args.concurrency:
+            result = drive_endpoint(app, endpoint, payloads[endpoint], concurrency, args.requests)
+            print(format_endpoint_result(result))
+            results.append(result)
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVICE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment():
+    import sklearn
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+def compare(baseline, current, tolerance=0.05):
+    """Print the relative change of each compared metric against a baseline report"""
+    before_config, after_config = baseline.get('config', {}), current.get('config', {})
+    differences = [f"{name} {before_config.get(name)} -> {after_config.get(name)}"
+                   for name in WORKLOAD_SETTINGS if before_config.get(name) != after_config.get(name)]
+    if differences:
+        print(f"\nNot comparing against {baseline['environment'].get('commit')}: "
+              f"the workload differs ({', '.join(differences)})")
+        return False
+
+    print(f"\nChange against {baseline['environment'].get('commit')} "
+          f"(! marks regressions beyond {tolerance:.0%}):")
+    pairs = [(f"[{kind}]", baseline['models'][kind], result)
+             for kind, result in current['models'].items() if kind in baseline.get('models', {})]
+    baseline_endpoints = {(r['endpoint'], r['concurrency']): r for r in baseline.get('endpoints', [])}
+    pairs += [(f"{r['endpoint']} x{r['concurrency']}", baseline_endpoints[(r['endpoint'], r['concurrency'])], r)
+              for r in current['endpoints'] if (r['endpoint'], r['concurrency']) in baseline_endpoints]
+
+    for name, before, after in pairs:
+        changes = []
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if before.get(metric) and metric in after:
+                change = (after[metric] - before[metric]) / before[metric]
+                regressed = -change > tolerance if higher_is_better else change > tolerance
+                changes.append(f"{metric} {change:+.1%}{' !' if regressed else ''}")
+        print(f"{name}: {', '.join(changes)}")
+    return True
+
+def format_model_result(kind, result):
+    return (f"[{kind}] load {result['load_seconds']:.3f}s, "
+            f"single p50 {result['single_p50_us']:.0f}us p99 {result['single_p99_us']:.0f}us, "
+            f"batch of {result['batch_size']} p50 {result['batch_p50_us'] / 1000:.1f}ms "
+            f"p99 {result['batch_p99_us'] / 1000:.1f}ms ({result['rows_per_cpu_second']:.0f} rows/cpu-s), "
+            f"peak {result['peak_rss_mb']:.0f}MB")
+
+def format_endpoint_result(result):
+    return (f"{result['endpoint']} x{result['concurrency']}: "
+            f"p50 {result['request_p50_us'] / 1000:.2f}ms p99 {result['request_p99_us'] / 1000:.2f}ms, "
+            f"{result['requests_per_second']:.0f} req/s, {result['errors']} errors")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the AI service models and endpoints on synthetic data")
+    parser.add_argument('--model-path', default=os.environ.get('MODEL_PATH', os.path.join(SERVICE_DIR, 'models')),
+                        help="model directory, flat or versioned like MODEL_PATH")
+    parser.add_argument('--models', default=','.join(MODEL_KINDS), help="comma-separated of anomaly, risk")
+    parser.add_argument('--rows', type=int, default=2000, help="synthetic rows scored one at a time and in batches")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--batch-repeats', type=int, default=10)
+    parser.add_argument('--load-repeats', type=int, default=3, help="loads timed per model (fastest is reported)")
+    parser.add_argument('--mmap', action='store_true', help="load models memory-mapped, as MODEL_MMAP=1 does")
+    parser.add_argument('--endpoints', default='/predict/anomaly,/predict/anomaly/batch,/predict/risk,'
+                                               '/predict/risk/batch,/analyze/safety-score',
+                        help="comma-separated endpoints to drive ('none' skips them)")
+    parser.add_argument('--concurrency', default='1,4,16', help="comma-separated client thread counts")
+    parser.add_argument('--requests', type=int, default=500, help="requests per endpoint and concurrency level")
+    parser.add_argument('--endpoint-batch-size', type=int, default=100, help="rows per batch endpoint request")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark.json', help="JSON report path")
+    parser.add_argument('--compare', help="earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    args.endpoints = [] if args.endpoints == 'none' else args.endpoints.split(',')
+    args.concurrency = [int(value) for value in args.concurrency.split(',')]
+    kinds = [kind for kind in args.models.split(',') if kind]
+
+    version, directory = newest_version(args.model_path)
+    print(f"Benchmarking model version {version} from {directory}")
+
+    report = {
+        'environment': environment(),
+        'config': {**vars(args), 'version': version},
+        'models': benchmark_models(kinds, directory, args),
+        'endpoints': benchmark_endpoints(args.model_path, args) if args.endpoints else []
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == '__main__':
+    main()
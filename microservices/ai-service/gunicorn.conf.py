@@ -0,0 +1,71 @@
+# gunicorn.conf.py
+# Production serving: gunicorn -c gunicorn.conf.py wsgi:app
+import gc
+import multiprocessing
+import os
+import signal
+import tempfile
+
+bind = os.environ.get('AI_SERVICE_BIND', '0.0.0.0:5001')
+workers = int(os.environ.get('AI_SERVICE_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('AI_SERVICE_THREADS', 1))
+timeout = int(os.environ.get('AI_SERVICE_TIMEOUT', 60))
+
+# Import wsgi (and load the models) in the master before forking workers
+preload_app = True
+
+# Workers write their metrics here so /metrics reports every worker, not just
+# the one that answered the scrape. Set before the app is imported; this file
+# is re-read on reload, but the environment keeps the first directory
+if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='ai-service-metrics-')
+
+def on_starting(server):
+    # Files left by an earlier run would be counted again
+    from api.ai_service_api import metrics
+    metrics.clear_files()
+
+def when_ready(server):
+    # Models are loaded by now. Freeze them out of the garbage collector so
+    # collections in the workers don't touch their pages and break sharing
+    gc.freeze()
+    server.log.info(f"Models preloaded; starting {workers} workers")
+
+    # Only the master watches for new model versions, so a new version is
+    # loaded once and then shared by fresh workers instead of being loaded
+    # separately into every worker
+    from api.ai_service_api import start_model_watcher
+    start_model_watcher(on_reload=lambda bundle: replace_workers(server, bundle))
+
+def replace_workers(server, bundle):
+    # Runs on the master's watcher thread once the new version is active.
+    # With preload_app a HUP keeps the master's app (and models) and forks new
+    # workers from it, then gracefully stops the old ones.
+    # The previous bundle was frozen with the rest of the preloaded app and is
+    # unreachable now; unfreeze so it can be collected, then freeze the new one
+    gc.unfreeze()
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Model version {bundle.version} loaded; replacing workers")
+    os.kill(os.getpid(), signal.SIGHUP)
+
+def post_fork(server, worker):
+    # Threads don't survive fork, so each worker runs its own log listener,
+    # metrics writer and telemetry writer
+    from api.ai_service_api import setup_logging, start_metrics_writer, start_telemetry_recorder
+    setup_logging()
+    start_metrics_writer()
+    start_telemetry_recorder()
+    server.log.info(f"Worker {worker.pid} ready with shared models")
+
+def worker_exit(server, worker):
+    # Runs in the worker: write its final values before it goes
+    from api.ai_service_api import metrics
+    if metrics.multiprocess_dir:
+        metrics.stop_flushing()
+
+def child_exit(server, worker):
+    # Runs in the master: keep the worker's counts, drop its gauges
+    from api.ai_service_api import metrics
+    if metrics.multiprocess_dir:
+        metrics.mark_process_dead(worker.pid)
@@ -0,0 +1,27 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.join(SERVICE_DIR, 'training'))
+
+from anomaly_detection import TouristAnomalyDetector
+from risk_assessment import TouristRiskAssessment
+
+@pytest.fixture(scope='session')
+def anomaly_training_data():
+    return TouristAnomalyDetector().create_synthetic_training_data(3000, seed=0)
+
+@pytest.fixture(scope='session')
+def anomaly_detector(anomaly_training_data):
+    """Small anomaly model, trained once per test session"""
+    return TouristAnomalyDetector(n_estimators=20).train(anomaly_training_data, verbose=False)
+
+@pytest.fixture(scope='session')
+def risk_assessor():
+    """Small risk model, trained once per test session"""
+    assessor = TouristRiskAssessment(n_estimators=20)
+    return assessor.train(assessor.create_risk_training_data(3000), verbose=False)
@@ -0,0 +1,42 @@
+# tests/test_anomaly_features.py
+import numpy as np
+import pandas as pd
+
+from anomaly_detection import RAW_FEATURE_COLUMNS
+
+def pandas_features(detector, df):
+    """Feature matrix built the way training builds it"""
+    df_features = detector.engineer_features(df)
+    for col, encoder in detector.label_encoders.items():
+        if f'{col}_encoded' in detector.feature_names:
+            df_features[f'{col}_encoded'] = encoder.transform(df_features[col].astype(str))
+    return df_features[detector.feature_names].to_numpy(dtype=np.float64)
+
+def assert_same_features(detector, df):
+    expected = pandas_features(detector, df)
+    actual = detector.engineer_features_array(df[RAW_FEATURE_COLUMNS].to_numpy(dtype=np.float64))
+
+    mismatched = ~((expected == actual) | (np.isnan(expected) & np.isnan(actual)))
+    columns = sorted({detector.feature_names[j] for j in np.nonzero(mismatched)[1]})
+    assert not columns, f"Fast feature path drifted from engineer_features: {columns}"
+
+def test_fast_path_matches_training_features(anomaly_detector, anomaly_training_data):
+    assert_same_features(anomaly_detector, anomaly_training_data)
+
+def test_fast_path_matches_at_hour_and_speed_boundaries(anomaly_detector, anomaly_training_data):
+    # Speed bucket edges (right-closed like pd.cut) and the night/peak hour edges
+    boundaries = pd.DataFrame({
+        'hour': [5, 6, 9, 17, 22, 23, 23.5, 24],
+        'speed_kmh': [1, 5, 15, 15.000001, 1.000001, 4, 3, 16],
+    })
+    for col in RAW_FEATURE_COLUMNS[2:]:
+        boundaries[col] = anomaly_training_data[col].iloc[0]
+
+    assert_same_features(anomaly_detector, boundaries)
+
+def test_fast_path_matches_on_excessive_distance_edge(anomaly_detector, anomaly_training_data):
+    df = anomaly_training_data.head(4).copy()
+    df['days_since_entry'] = [1, 2, 3, 0]
+    df['distance_from_entry_km'] = [10, 20.000001, 29.999999, 0]
+
+    assert_same_features(anomaly_detector, df)
@@ -0,0 +1,90 @@
+# tests/test_metrics.py
+import threading
+
+from metrics import MetricsRegistry
+
+def worker_registry(directory, pid):
+    """A registry as one gunicorn worker would build it"""
+    registry = MetricsRegistry(multiprocess_dir=str(directory))
+    registry._pid = pid
+    requests = registry.counter('requests_total', 'Requests', ('endpoint',))
+    in_flight = registry.gauge('in_flight', 'Requests in flight')
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    return registry, requests, in_flight, latency
+
+def samples(text):
+    return dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+
+def test_render_adds_up_every_worker(tmp_path):
+    first, requests_a, in_flight_a, latency_a = worker_registry(tmp_path, 1)
+    second, requests_b, in_flight_b, latency_b = worker_registry(tmp_path, 2)
+    requests_a.child('/a').inc(3)
+    requests_b.child('/a').inc(2)
+    requests_b.child('/b').inc()
+    in_flight_a.child().inc()
+    in_flight_b.child().inc(2)
+    latency_a.child().observe(0.05)
+    latency_b.child().observe(0.5)
+    second.flush()
+
+    rendered = samples(first.render())
+    assert rendered['requests_total{endpoint="/a"}'] == '5'
+    assert rendered['requests_total{endpoint="/b"}'] == '1'
+    assert rendered['in_flight'] == '3'
+    assert rendered['latency_seconds_bucket{le="0.1"}'] == '1'
+    assert rendered['latency_seconds_bucket{le="1.0"}'] == '2'
+    assert rendered['latency_seconds_count'] == '2'
+
+def test_dead_workers_keep_counts_but_not_gauges(tmp_path):
+    live, requests_a, in_flight_a, _ = worker_registry(tmp_path, 1)
+    for pid in (2, 3):
+        dead, requests, in_flight, _ = worker_registry(tmp_path, pid)
+        requests.child('/a').inc(10)
+        in_flight.child().inc()
+        dead.flush()
+        live.mark_process_dead(pid)
+    requests_a.child('/a').inc()
+
+    rendered = samples(live.render())
+    assert rendered['requests_total{endpoint="/a"}'] == '21'
+    assert 'in_flight' not in rendered
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['metrics_1.json', 'metrics_dead.json']
+
+    live.clear_files()
+    assert list(tmp_path.iterdir()) == []
+
+def test_concurrent_flushes_and_renders_stay_readable(tmp_path):
+    registry, requests, _, latency = worker_registry(tmp_path, 1)
+    stop = threading.Event()
+    errors = []
+
+    def hammer():
+        while not stop.is_set():
+            try:
+                requests.child('/a').inc()
+                latency.child().observe(0.01)
+                registry.flush()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=hammer) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(200):
+            rendered = samples(registry.render())
+            assert int(rendered['requests_total{endpoint="/a"}']) > 0
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    assert errors == []
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['metrics_1.json']
+
+def test_unreadable_snapshots_are_skipped(tmp_path):
+    registry, requests, _, _ = worker_registry(tmp_path, 1)
+    requests.child('/a').inc()
+    (tmp_path / 'metrics_2.json').write_text('{"requests_total": [[["/a"], 4')
+
+    assert samples(registry.render())['requests_total{endpoint="/a"}'] == '1'
@@ -0,0 +1,46 @@
+# tests/test_model_artifacts.py
+import numpy as np
+import pytest
+
+from anomaly_detection import RAW_FEATURE_COLUMNS, TouristAnomalyDetector
+from risk_assessment import TouristRiskAssessment
+
+@pytest.mark.parametrize('mmap', [False, True])
+def test_anomaly_artifact_round_trip(anomaly_detector, tmp_path, mmap):
+    path = tmp_path / 'anomaly.tsm'
+    anomaly_detector.export_artifact(str(path))
+    loaded = TouristAnomalyDetector().load_artifact(str(path), mmap=mmap)
+
+    assert loaded.feature_names == anomaly_detector.feature_names
+    raw = anomaly_detector.create_synthetic_training_data(2000, seed=1)[RAW_FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    for name, expected, actual in zip(['is_anomaly', 'confidence', 'anomaly_score'],
+                                      anomaly_detector.score_raw(raw), loaded.score_raw(raw)):
+        assert np.array_equal(expected, actual), f"Artifact changed {name}"
+
+@pytest.mark.parametrize('mmap', [False, True])
+def test_risk_artifact_round_trip(risk_assessor, tmp_path, mmap):
+    path = tmp_path / 'risk.tsm'
+    risk_assessor.export_artifact(str(path))
+    loaded = TouristRiskAssessment().load_artifact(str(path), mmap=mmap)
+
+    conditions = risk_assessor.create_risk_training_data(2000, seed=1)
+    expected = risk_assessor.predict_risk_batch(conditions)
+    actual = loaded.predict_risk_batch(conditions)
+    assert [e['risk_level'] for e in expected] == [a['risk_level'] for a in actual]
+    assert [e['probabilities'] for e in expected] == [a['probabilities'] for a in actual]
+
+def test_raw_value_limits_follow_a_reload(anomaly_detector, anomaly_training_data, tmp_path):
+    other = TouristAnomalyDetector(n_estimators=5).train(anomaly_training_data.sample(frac=0.5, random_state=1),
+                                                          verbose=False)
+    path = tmp_path / 'other.tsm'
+    other.export_artifact(str(path))
+
+    detector = TouristAnomalyDetector()
+    assert detector._raw_value_limits is None
+    detector.load_artifact(str(path), mmap=False)
+    stale = detector.raw_value_limits()
+
+    anomaly_detector.export_artifact(str(tmp_path / 'first.tsm'))
+    detector.load_artifact(str(tmp_path / 'first.tsm'), mmap=False)
+    assert detector.raw_value_limits() == anomaly_detector.raw_value_limits()
+    assert detector.raw_value_limits() != stale
@@ -0,0 +1,52 @@
+# tests/test_online_training.py
+import os
+
+import numpy as np
+import pytest
+
+import online_training
+from anomaly_detection import RAW_FEATURE_COLUMNS
+from model_registry import ANOMALY_ARTIFACT_FILE, ANOMALY_MODEL_FILE, RISK_ARTIFACT_FILE
+from online_training import OnlineAnomalyTrainer
+from telemetry_store import TelemetryRingStore
+
+@pytest.fixture
+def store(tmp_path, anomaly_training_data):
+    store = TelemetryRingStore(str(tmp_path / 'telemetry.bin'), capacity=5000)
+    store.append(anomaly_training_data[RAW_FEATURE_COLUMNS].to_numpy(dtype=np.float32))
+    yield store
+    store.close()
+
+def publish_base(model_path, anomaly_detector, risk_assessor, pickle=True):
+    directory = model_path / 'v1'
+    directory.mkdir(parents=True)
+    if pickle:
+        anomaly_detector.save_model(str(directory / ANOMALY_MODEL_FILE))
+    anomaly_detector.export_artifact(str(directory / ANOMALY_ARTIFACT_FILE))
+    risk_assessor.export_artifact(str(directory / RISK_ARTIFACT_FILE))
+
+def test_skips_versions_without_a_pickle(tmp_path, store, anomaly_detector, risk_assessor):
+    publish_base(tmp_path / 'models', anomaly_detector, risk_assessor, pickle=False)
+    trainer = OnlineAnomalyTrainer(store, str(tmp_path / 'models'), min_rows=0)
+
+    assert trainer.run_once(force=True) is None
+    assert sorted(os.listdir(tmp_path / 'models')) == ['v1']
+
+def test_failed_publish_keeps_readings_for_the_next_round(tmp_path, store, anomaly_detector, risk_assessor,
+                                                          monkeypatch):
+    publish_base(tmp_path / 'models', anomaly_detector, risk_assessor)
+    trainer = OnlineAnomalyTrainer(store, str(tmp_path / 'models'), min_rows=1000)
+    trainer.last_seen = 0
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(online_training, 'publish_version', fail)
+        with pytest.raises(OSError):
+            trainer.run_once()
+    assert trainer.last_seen == 0
+
+    assert trainer.run_once() == 'v2'
+    assert trainer.last_seen == store.total_written
+    assert os.path.isfile(tmp_path / 'models' / 'v2' / ANOMALY_ARTIFACT_FILE)
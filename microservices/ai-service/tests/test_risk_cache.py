@@ -0,0 +1,25 @@
+# tests/test_risk_cache.py
+from risk_cache import CachedRiskAssessment, parse_quantization
+
+def test_default_cache_returns_the_model_prediction(risk_assessor):
+    conditions = risk_assessor.create_risk_training_data(500, seed=2).to_dict('records')
+    cache = CachedRiskAssessment(risk_assessor)
+
+    expected = risk_assessor.predict_risk_batch(conditions)
+    # Second pass is served from the cache
+    for _ in range(2):
+        actual = cache.predict_risk_batch(conditions)
+        assert [a['probabilities'] for a in actual] == [e['probabilities'] for e in expected]
+    assert cache.stats()['hits'] >= len(conditions)
+
+def test_nearby_inputs_only_share_entries_when_snapping_is_enabled(risk_assessor):
+    conditions = risk_assessor.create_risk_training_data(1, seed=3).to_dict('records')[0]
+    nearby = dict(conditions, elevation=conditions['elevation'] + 1.0)
+
+    exact = CachedRiskAssessment(risk_assessor)
+    exact.predict_risk_batch([conditions, nearby])
+    assert exact.stats()['size'] == 2
+
+    snapped = CachedRiskAssessment(risk_assessor, quantization=parse_quantization('elevation=1000'))
+    snapped.predict_risk_batch([dict(conditions, elevation=100.0), dict(conditions, elevation=101.0)])
+    assert snapped.stats()['size'] == 1
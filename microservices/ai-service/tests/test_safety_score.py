@@ -0,0 +1,22 @@
+# tests/test_safety_score.py
+from model_registry import ModelRegistry
+from safety_score import SafetyScoreEngine
+
+REQUEST = {'hour': 23, 'speed_kmh': 40, 'battery_level': 10, 'weather_risk': 'storm', 'terrain_type': 'mountain'}
+
+def test_reload_shuts_down_the_old_engine(tmp_path, anomaly_detector, risk_assessor):
+    for version in ('v1', 'v2'):
+        (tmp_path / version).mkdir()
+    registry = ModelRegistry(
+        str(tmp_path), lambda directory: (anomaly_detector, risk_assessor,
+                                          SafetyScoreEngine(anomaly_detector, risk_assessor, max_workers=2)))
+
+    old = registry.load_version('v1', str(tmp_path / 'v1'))
+    expected = old.safety_engine.score(REQUEST)
+    new = registry.load_version('v2', str(tmp_path / 'v2'))
+
+    assert old.safety_engine.executor._shutdown
+    assert not new.safety_engine.executor._shutdown
+    # A request still holding the old bundle is scored without the pool
+    assert old.safety_engine.score(REQUEST) == expected
+    new.close()
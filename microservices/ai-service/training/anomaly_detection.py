@@ -9,100 +9,64 @@ import joblib
 import pickle
 from datetime import datetime, timedelta
 import logging
+import time
+
+from compiled_forest import CompiledIsolationForest
+from model_artifact import write_artifact, read_artifact, is_artifact
+from metrics import add_stage_time
+
+# Raw reading fields, in the column order used by the NumPy fast path
+RAW_FEATURE_COLUMNS = [
+    'hour', 'speed_kmh', 'distance_from_entry_km', 'battery_level',
+    'gps_accuracy_m', 'risk_zone_distance_km', 'days_since_entry'
+]
+
+# Speed buckets (km/h), right-closed like pd.cut
+SPEED_BINS = [0, 1, 5, 15, float('inf')]
+SPEED_LABELS = ['stationary', 'walking', 'fast', 'vehicle']
 
 class TouristAnomalyDetector:
-    def __init__(self):
+    def __init__(self, n_estimators=100, contamination=0.1, max_samples='auto', n_jobs=None):
+        self.n_estimators = n_estimators
+        self.contamination = contamination
+        self.max_samples = max_samples
+        self.n_jobs = n_jobs
+        self.evaluation = {}
         self.isolation_forest = None
         self.scaler = StandardScaler()
         self.label_encoders = {}
         self.feature_names = []
+        self.compiled_forest = None
+        # Cached by raw_value_limits(); cleared whenever the scaler or model changes
+        self._raw_value_limits = None
 
-    def create_synthetic_training_data(self, n_samples=10000):
+    def create_synthetic_training_data(self, n_samples=10000, seed=42):
         """Create synthetic tourist behavior data for training"""
-        np.random.seed(42)
-
-        # Normal behavior patterns
-        normal_data = []
-
-        for i in range(int(n_samples * 0.9)):  # 90% normal behavior
-            # Simulate normal tourist movement patterns
-            hour = np.random.normal(12, 4)  # Peak activity around noon
-            hour = max(0, min(23, hour))
-
-            # Speed patterns (km/h)
-            if 6 <= hour <= 22:  # Daytime
-                speed = np.random.normal(3, 1)  # Walking speed
-            else:  # Nighttime
-                speed = np.random.normal(1, 0.5)  # Slower movement
-            speed = max(0, speed)
-
-            # Distance from entry point (gradually increases)
-            days_since_entry = np.random.randint(1, 8)
-            distance_from_entry = np.random.exponential(days_since_entry * 2)
-
-            # Battery level (decreases over time)
-            battery_level = max(10, 100 - np.random.exponential(20))
-
-            # Location accuracy
-            accuracy = np.random.normal(10, 3)  # GPS accuracy in meters
-            accuracy = max(1, accuracy)
-
-            # Risk zone proximity
-            risk_zone_distance = np.random.exponential(5)  # km from risk zones
-
-            normal_data.append([
-                hour, speed, distance_from_entry, battery_level,
-                accuracy, risk_zone_distance, days_since_entry, 0  # 0 = normal
-            ])
-
-        # Anomalous behavior patterns
-        anomaly_data = []
-
-        for i in range(int(n_samples * 0.1)):  # 10% anomalous behavior
-            # Unusual patterns that might indicate distress
-            hour = np.random.choice([2, 3, 23, 24])  # Unusual hours
-            speed = np.random.choice([
-                np.random.normal(0, 0.1),      # No movement (lost/stuck)
-                np.random.normal(15, 3),       # Running (panic)
-                np.random.normal(50, 10)       # Vehicle speed (kidnapping)
-            ])
-            speed = max(0, speed)
-
-            days_since_entry = np.random.randint(1, 8)
-            distance_from_entry = np.random.choice([
-                np.random.normal(0.5, 0.2),    # Stuck near entry
-                np.random.normal(50, 10)       # Too far from planned route
-            ])
-
-            battery_level = np.random.choice([
-                np.random.normal(5, 2),         # Critical battery
-                100                             # Always full (suspicious)
-            ])
-            battery_level = max(0, min(100, battery_level))
-
-            accuracy = np.random.choice([
-                np.random.normal(100, 20),      # Poor GPS signal
-                np.random.normal(1, 0.1)        # Too accurate (spoofed)
-            ])
-            accuracy = max(1, accuracy)
-
-            risk_zone_distance = np.random.exponential(0.5)  # Near risk zones
-
-            anomaly_data.append([
-                hour, speed, distance_from_entry, battery_level,
-                accuracy, risk_zone_distance, days_since_entry, 1  # 1 = anomaly
-            ])
-
-        # Combine data
-        all_data = normal_data + anomaly_data
-        np.random.shuffle(all_data)
-
-        df = pd.DataFrame(all_data, columns=[
-            'hour', 'speed_kmh', 'distance_from_entry_km', 'battery_level',
-            'gps_accuracy_m', 'risk_zone_distance_km', 'days_since_entry', 'is_anomaly'
-        ])
-
-        return df
+        rng = np.random.default_rng(seed)
+        n_normal = int(n_samples * 0.9)  # 90% normal behavior
+        n_anomaly = int(n_samples * 0.1)  # 10% anomalous behavior
+        return _synthetic_frame(rng, n_normal, n_anomaly)
+
+    def iter_synthetic_training_data(self, n_samples, chunk_size=100000, seed=42, as_arrays=False):
+        """Yield synthetic training data in chunks of chunk_size rows.
+
+        Anomalies are spread evenly across chunks (10% overall, same as
+        create_synthetic_training_data). With as_arrays=True each chunk is an
+        (X, y) pair with X in RAW_FEATURE_COLUMNS order.
+        """
+        rng = np.random.default_rng(seed)
+        n_anomaly = int(n_samples * 0.1)
+        total = int(n_samples * 0.9) + n_anomaly
+
+        for start in range(0, total, chunk_size):
+            end = min(start + chunk_size, total)
+            chunk_anomalies = n_anomaly * end // total - n_anomaly * start // total
+            df = _synthetic_frame(rng, end - start - chunk_anomalies, chunk_anomalies)
+
+            if as_arrays:
+                yield df[RAW_FEATURE_COLUMNS].to_numpy(dtype=np.float64), df['is_anomaly'].to_numpy()
+            else:
+                yield df
 
     def engineer_features(self, df):
         """Create advanced features from raw data"""
@@ -113,9 +77,7 @@ class TouristAnomalyDetector:
         df['is_peak_hours'] = ((df['hour'] >= 9) & (df['hour'] <= 17)).astype(int)
 
         # Movement patterns
-        df['speed_category'] = pd.cut(df['speed_kmh'], 
-                                    bins=[0, 1, 5, 15, float('inf')], 
-                                    labels=['stationary', 'walking', 'fast', 'vehicle'])
+        df['speed_category'] = pd.cut(df['speed_kmh'], bins=SPEED_BINS, labels=SPEED_LABELS)
 
         # Risk indicators
         df['low_battery'] = (df['battery_level'] < 20).astype(int)
@@ -133,7 +95,7 @@ class TouristAnomalyDetector:
 
         return df
 
-    def train(self, df):
+    def train(self, df, verbose=True):
         """Train the anomaly detection model"""
         # Engineer features
         df_features = self.engineer_features(df)
@@ -162,61 +124,212 @@ class TouristAnomalyDetector:
 
         # Scale features
         X_scaled = self.scaler.fit_transform(X)
+        self._raw_value_limits = None
 
         # Train Isolation Forest (unsupervised approach)
         self.isolation_forest = IsolationForest(
-            contamination=0.1,  # Expected proportion of anomalies
+            contamination=self.contamination,  # Expected proportion of anomalies
             random_state=42,
-            n_estimators=100
+            n_estimators=self.n_estimators,
+            max_samples=self.max_samples,
+            n_jobs=self.n_jobs
         )
 
         # Use only normal data for training (unsupervised)
         X_normal = X_scaled[y == 0]
         self.isolation_forest.fit(X_normal)
+        self.compile_forest()
 
         # Evaluate on full dataset
         y_pred = self.isolation_forest.predict(X_scaled)
         y_pred = (y_pred == -1).astype(int)  # Convert to binary
 
-        print("Training completed!")
-        print(f"Accuracy: {(y_pred == y).mean():.3f}")
-        print("\nClassification Report:")
-        print(classification_report(y, y_pred))
+        self.evaluation = {'accuracy': float((y_pred == y).mean())}
+
+        if verbose:
+            print("Training completed!")
+            print(f"Accuracy: {self.evaluation['accuracy']:.3f}")
+            print("\nClassification Report:")
+            print(classification_report(y, y_pred))
 
         return self
 
-    def predict(self, data_point):
+    def engineer_features_array(self, raw, out=None):
+        """Inference-only NumPy version of engineer_features.
+
+        Takes an (n, 7) array of raw readings in RAW_FEATURE_COLUMNS order and
+        fills a float64 matrix laid out in self.feature_names order.
+        """
+        raw = np.asarray(raw, dtype=np.float64)
+        if out is None:
+            out = np.empty((raw.shape[0], len(self.feature_names)), dtype=np.float64)
+
+        hour, speed, distance, battery, accuracy, risk_distance, days = raw.T
+
+        columns = {
+            'hour': hour,
+            'speed_kmh': speed,
+            'distance_from_entry_km': distance,
+            'battery_level': battery,
+            'gps_accuracy_m': accuracy,
+            'risk_zone_distance_km': risk_distance,
+            'days_since_entry': days,
+            'is_night': (hour < 6) | (hour > 22),
+            'is_peak_hours': (hour >= 9) & (hour <= 17),
+            'low_battery': battery < 20,
+            'poor_gps': accuracy > 50,
+            'near_risk_zone': risk_distance < 1,
+            'unusual_hour_activity': ((hour < 6) | (hour > 23)) & (speed > 3),
+            'excessive_distance': distance > (days * 10),
+        }
+
+        for j, name in enumerate(self.feature_names):
+            if name == 'speed_category_encoded':
+                out[:, j] = self._encode_speed_category(speed)
+            else:
+                out[:, j] = columns[name]
+
+        return out
+
+    def raw_value_limits(self):
+        """{raw field: (low, high)} outside which a value overflows float32 once scaled"""
+        if self._raw_value_limits is None:
+            largest = float(np.finfo(np.float32).max)
+            limits = {}
+            for col in RAW_FEATURE_COLUMNS:
+                j = self.feature_names.index(col)
+                mean, scale = float(self.scaler.mean_[j]), float(self.scaler.scale_[j])
+                limits[col] = (mean - scale * largest, mean + scale * largest)
+            self._raw_value_limits = limits
+        return self._raw_value_limits
+
+    def _encode_speed_category(self, speed):
+        """Bin speeds like pd.cut and map bins straight to LabelEncoder codes"""
+        # Bin index 0-3 for the labelled buckets; speeds outside (0, inf] and NaN
+        # fall out of pd.cut as NaN, which training encoded as the string 'nan'
+        bins = np.searchsorted(SPEED_BINS, speed, side='left') - 1
+        bins[(bins < 0) | np.isnan(speed)] = len(SPEED_LABELS)
+
+        classes = {str(label): code for code, label in enumerate(self.label_encoders['speed_category'].classes_)}
+        lookup = np.array([classes.get(label, -1) for label in SPEED_LABELS + ['nan']])
+
+        codes = lookup[bins]
+        if (codes < 0).any():
+            unseen = sorted({(SPEED_LABELS + ['nan'])[b] for b in bins[codes < 0]})
+            raise ValueError(f"y contains previously unseen labels: {unseen}")
+
+        return codes
+
+    def predict(self, data_point, stage_timings=None):
         """Predict if a data point is anomalous"""
         if isinstance(data_point, dict):
-            df = pd.DataFrame([data_point])
-        else:
-            df = pd.DataFrame(data_point)
+            data_point = [data_point]
 
-        # Engineer features
-        df_features = self.engineer_features(df)
+        return self.predict_batch(data_point, stage_timings=stage_timings)[0]
 
-        # Apply same preprocessing as training
-        X = df_features[self.feature_names]
-
-        # Handle categorical encoding
-        for col, encoder in self.label_encoders.items():
-            if f'{col}_encoded' in self.feature_names:
-                X[f'{col}_encoded'] = encoder.transform(df_features[col].astype(str))
-
-        X_scaled = self.scaler.transform(X)
+    def predict_batch(self, data_points, stage_timings=None):
+        """Predict anomalies for many data points in a single model pass"""
+        start = time.perf_counter()
+        if isinstance(data_points, pd.DataFrame):
+            raw = data_points[RAW_FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+        else:
+            raw = np.array([[point[col] for col in RAW_FEATURE_COLUMNS] for point in data_points],
+                           dtype=np.float64).reshape(-1, len(RAW_FEATURE_COLUMNS))
+
+        if len(raw) == 0:
+            return []
+
+        add_stage_time(stage_timings, 'anomaly_features', time.perf_counter() - start)
+        is_anomaly, confidence, anomaly_scores = self.score_raw(raw, stage_timings=stage_timings)
+
+        return [
+            {
+                'is_anomaly': bool(flag),
+                'confidence': float(conf),
+                'anomaly_score': float(score)
+            }
+            for flag, conf, score in zip(is_anomaly, confidence, anomaly_scores)
+        ]
 
-        # Predict
-        prediction = self.isolation_forest.predict(X_scaled)
-        anomaly_score = self.isolation_forest.score_samples(X_scaled)
+    def score_raw(self, raw, stage_timings=None):
+        """Score an (n, 7) raw reading matrix; returns (is_anomaly, confidence, anomaly_score) arrays"""
+        start = time.perf_counter()
 
-        is_anomaly = (prediction == -1).astype(int)
-        confidence = 1 / (1 + np.exp(anomaly_score))  # Convert to probability
+        # Build the feature matrix without going through pandas
+        X = self.engineer_features_array(raw)
+        features_done = time.perf_counter()
 
-        return {
-            'is_anomaly': bool(is_anomaly[0]),
-            'confidence': float(confidence[0]),
-            'anomaly_score': float(anomaly_score[0])
-        }
+        if self.compiled_forest is not None:
+            X_scaled = self.compiled_forest.transform(X)
+            scaling_done = time.perf_counter()
+            is_anomaly, anomaly_scores = self.compiled_forest.predict(X_scaled)
+        else:
+            # Same arithmetic as StandardScaler.transform, done in place
+            X -= self.scaler.mean_
+            X /= self.scaler.scale_
+            X_scaled = X
+            scaling_done = time.perf_counter()
+
+            # Score once; predict() is score_samples shifted by offset_, so derive
+            # the labels from the same scores instead of walking the trees twice
+            anomaly_scores = self.isolation_forest.score_samples(X_scaled)
+            is_anomaly = (anomaly_scores - self.isolation_forest.offset_) < 0
+
+        confidence = 1 / (1 + np.exp(anomaly_scores))  # Convert to probability
+
+        add_stage_time(stage_timings, 'anomaly_features', features_done - start)
+        add_stage_time(stage_timings, 'anomaly_scaling', scaling_done - features_done)
+        add_stage_time(stage_timings, 'anomaly_inference', time.perf_counter() - scaling_done)
+
+        return is_anomaly, confidence, anomaly_scores
+
+    def refresh_trees(self, raw, replace_fraction=0.25, random_state=None):
+        """Refit the oldest share of the trees on recent raw readings.
+
+        The scaler and the remaining trees are kept, so the fresh trees see
+        features scaled exactly as before; the anomaly threshold is then
+        recomputed on the same window, as IsolationForest.fit does.
+        """
+        forest = self.isolation_forest
+        if forest is None:
+            raise ValueError("Refreshing trees needs the joblib model, not a compact artifact")
+        if len(raw) < forest.max_samples_:
+            raise ValueError(f"Need at least {forest.max_samples_} readings to refresh trees, got {len(raw)}")
+
+        X = self.engineer_features_array(raw)
+        X -= self.scaler.mean_
+        X /= self.scaler.scale_
+
+        n_replace = min(len(forest.estimators_), max(1, int(round(len(forest.estimators_) * replace_fraction))))
+        fresh = IsolationForest(
+            n_estimators=n_replace,
+            max_samples=forest.max_samples_,
+            contamination=forest.contamination,
+            random_state=random_state,
+            n_jobs=self.n_jobs
+        ).fit(X)
+
+        # Oldest trees come first; drop them and append the fresh ones
+        forest.estimators_ = forest.estimators_[n_replace:] + fresh.estimators_
+        forest.estimators_features_ = forest.estimators_features_[n_replace:] + fresh.estimators_features_
+        # Per-tree caches kept by newer scikit-learn versions
+        for name in ('_average_path_length_per_tree', '_decision_path_lengths'):
+            if hasattr(forest, name):
+                setattr(forest, name, tuple(getattr(forest, name)[n_replace:]) + tuple(getattr(fresh, name)))
+        if hasattr(forest, '_seeds'):
+            forest._seeds = np.concatenate([forest._seeds[n_replace:], fresh._seeds])
+
+        if forest.contamination != 'auto':
+            forest.offset_ = np.percentile(forest.score_samples(X), 100.0 * forest.contamination)
+
+        self._raw_value_limits = None
+        self.compile_forest()
+        return n_replace
+
+    def compile_forest(self):
+        """Flatten the fitted forest and scaler into the array-based scorer"""
+        self.compiled_forest = CompiledIsolationForest.from_detector(self)
+        return self.compiled_forest
 
     def save_model(self, filepath):
         """Save trained model"""
@@ -229,12 +342,119 @@ class TouristAnomalyDetector:
         joblib.dump(model_data, filepath)
         print(f"Model saved to {filepath}")
 
-    def load_model(self, filepath):
+    def export_artifact(self, filepath):
+        """Save the compiled model as a compact artifact (see model_artifact.py)"""
+        forest_meta, arrays = self.compiled_forest.to_artifact()
+        meta = {
+            'feature_names': self.feature_names,
+            'speed_categories': [str(label) for label in self.label_encoders['speed_category'].classes_],
+            'forest': forest_meta
+        }
+        write_artifact(filepath, 'anomaly', meta, arrays)
+        print(f"Model artifact saved to {filepath}")
+
+    def load_artifact(self, filepath, mmap=True):
+        """Load a compact artifact; arrays are memory-mapped unless mmap=False"""
+        meta, arrays = read_artifact(filepath, kind='anomaly', mmap=mmap)
+        self.feature_names = meta['feature_names']
+
+        speed_encoder = LabelEncoder()
+        speed_encoder.classes_ = np.array(meta['speed_categories'], dtype=object)
+        self.label_encoders = {'speed_category': speed_encoder}
+
+        self.compiled_forest = CompiledIsolationForest.from_artifact(meta['forest'], arrays)
+        self.scaler = StandardScaler()
+        self.scaler.mean_ = self.compiled_forest.scaler_mean
+        self.scaler.scale_ = self.compiled_forest.scaler_scale
+        self._raw_value_limits = None
+
+        # Scoring only; retraining and refresh_trees need the joblib model
+        self.isolation_forest = None
+        return self
+
+    def load_model(self, filepath, mmap_mode=None):
         """Load trained model"""
-        model_data = joblib.load(filepath)
+        if is_artifact(filepath):
+            self.load_artifact(filepath, mmap=mmap_mode is not None)
+            print(f"Model loaded from {filepath}")
+            return self
+
+        model_data = joblib.load(filepath, mmap_mode=mmap_mode)
         self.isolation_forest = model_data['isolation_forest']
         self.scaler = model_data['scaler']
         self.label_encoders = model_data['label_encoders']
         self.feature_names = model_data['feature_names']
+        self._raw_value_limits = None
+        self.compile_forest()
         print(f"Model loaded from {filepath}")
-        return self
\ No newline at end of file
+        return self
+
+def _synthetic_frame(rng, n_normal, n_anomaly):
+    """Draw n_normal normal and n_anomaly anomalous readings, shuffled"""
+    n = n_normal + n_anomaly
+    normal = slice(0, n_normal)
+    anomaly = slice(n_normal, n)
+
+    hour = np.empty(n)
+    speed = np.empty(n)
+    distance = np.empty(n)
+    battery = np.empty(n)
+    accuracy = np.empty(n)
+    risk_zone_distance = np.empty(n)
+    days_since_entry = rng.integers(1, 8, size=n)
+
+    # Normal tourist movement patterns
+    hour[normal] = np.clip(rng.normal(12, 4, n_normal), 0, 23)  # Peak activity around noon
+    daytime = (hour[normal] >= 6) & (hour[normal] <= 22)
+    # Walking speed by day, slower movement at night (km/h)
+    speed[normal] = rng.normal(np.where(daytime, 3, 1), np.where(daytime, 1, 0.5))
+    # Distance from entry point gradually increases
+    distance[normal] = rng.exponential(days_since_entry[normal] * 2)
+    battery[normal] = np.maximum(10, 100 - rng.exponential(20, n_normal))
+    accuracy[normal] = np.maximum(1, rng.normal(10, 3, n_normal))  # GPS accuracy in meters
+    risk_zone_distance[normal] = rng.exponential(5, n_normal)  # km from risk zones
+
+    # Unusual patterns that might indicate distress
+    hour[anomaly] = rng.choice([2, 3, 23, 24], n_anomaly)
+    speed[anomaly] = _draw_mixture(rng, n_anomaly, [
+        (0, 0.1),    # No movement (lost/stuck)
+        (15, 3),     # Running (panic)
+        (50, 10)     # Vehicle speed (kidnapping)
+    ])
+    distance[anomaly] = _draw_mixture(rng, n_anomaly, [
+        (0.5, 0.2),  # Stuck near entry
+        (50, 10)     # Too far from planned route
+    ])
+    battery[anomaly] = np.clip(_draw_mixture(rng, n_anomaly, [
+        (5, 2),      # Critical battery
+        (100, 0)     # Always full (suspicious)
+    ]), 0, 100)
+    accuracy[anomaly] = np.maximum(1, _draw_mixture(rng, n_anomaly, [
+        (100, 20),   # Poor GPS signal
+        (1, 0.1)     # Too accurate (spoofed)
+    ]))
+    risk_zone_distance[anomaly] = rng.exponential(0.5, n_anomaly)  # Near risk zones
+
+    np.maximum(speed, 0, out=speed)
+
+    is_anomaly = np.zeros(n, dtype=np.int64)
+    is_anomaly[anomaly] = 1
+
+    order = rng.permutation(n)
+    return pd.DataFrame({
+        'hour': hour[order],
+        'speed_kmh': speed[order],
+        'distance_from_entry_km': distance[order],
+        'battery_level': battery[order],
+        'gps_accuracy_m': accuracy[order],
+        'risk_zone_distance_km': risk_zone_distance[order],
+        'days_since_entry': days_since_entry[order],
+        'is_anomaly': is_anomaly[order]
+    })
+
+def _draw_mixture(rng, n, components):
+    """Pick one (mean, std) component uniformly per row and sample from it"""
+    choice = rng.integers(0, len(components), size=n)
+    mean = np.array([component[0] for component in components], dtype=np.float64)[choice]
+    std = np.array([component[1] for component in components], dtype=np.float64)[choice]
+    return rng.normal(mean, std)
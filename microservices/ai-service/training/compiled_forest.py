@@ -0,0 +1,310 @@
+# training/compiled_forest.py
+import numpy as np
+from sklearn.ensemble._iforest import _average_path_length
+
+# Rows scored per vectorized tree walk; bounds the (rows x trees) node matrix
+SCORE_CHUNK_SIZE = 4096
+
+class _CompiledTrees:
+    """Trees of a fitted ensemble flattened into one shared node table.
+
+    Leaves point back at themselves with an infinite threshold, so a batch
+    can be walked through every tree at once for a fixed number of steps
+    without per-tree Python loops. Arrays already in the runtime dtypes are
+    used as given, so they can be memory-mapped straight from an artifact.
+    """
+
+    def __init__(self, feature, threshold, children, roots, max_depth, split_offsets=None, split_values=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        # float64, float32 (rounded down, exact for float32 inputs) or uint16
+        # ranks into the per-feature sorted split values
+        self.threshold = np.ascontiguousarray(threshold)
+        # Interleaved (left, right) pairs so one gather picks the next node
+        self.children = np.ascontiguousarray(children, dtype=np.intp)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.split_offsets = None if split_offsets is None else np.ascontiguousarray(split_offsets, dtype=np.intp)
+        self.split_values = None if split_values is None else np.ascontiguousarray(split_values, dtype=np.float32)
+
+    @property
+    def node_count(self):
+        return len(self.threshold)
+
+    def _leaves(self, X32):
+        """Leaf reached by every row in every tree, shape (rows, trees)"""
+        n_rows, n_features = X32.shape
+
+        # Gather from the flattened matrix with per-row offsets instead of
+        # 2-D fancy indexing
+        values = self._encode_inputs(X32).ravel()
+        row_offsets = (np.arange(n_rows) * n_features)[:, None]
+        nodes = np.repeat(self.roots[None, :], n_rows, axis=0)
+
+        for _ in range(self.max_depth):
+            go_right = values.take(row_offsets + self.feature.take(nodes)) > self.threshold.take(nodes)
+            nodes = self.children.take(2 * nodes + go_right)
+
+        return nodes
+
+    def _encode_inputs(self, X32):
+        """Inputs in the representation the thresholds are stored in"""
+        if self.split_values is not None:
+            # Rank of each value among the feature's split values: x <= split k
+            # exactly when fewer than k + 1 split values are below x
+            codes = np.empty(X32.shape, dtype=np.uint16)
+            for f in range(X32.shape[1]):
+                splits = self.split_values[self.split_offsets[f]:self.split_offsets[f + 1]]
+                codes[:, f] = np.searchsorted(splits, X32[:, f], side='left')
+            return codes
+        if self.threshold.dtype == np.float32:
+            return X32
+        # float32 widens to float64 exactly
+        return X32.astype(np.float64)
+
+    def _chunks(self, X):
+        """Validated float32 input split into SCORE_CHUNK_SIZE row slices"""
+        # Trees split on float32 inputs against float64 thresholds
+        X32 = np.asarray(X, dtype=np.float32)
+        if not np.isfinite(X32).all():
+            raise ValueError("Input contains NaN or infinity")
+
+        for start in range(0, X32.shape[0], SCORE_CHUNK_SIZE):
+            yield start, X32[start:start + SCORE_CHUNK_SIZE]
+
+    def tree_arrays(self):
+        """Node table arrays, keyed as the constructor expects"""
+        arrays = {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'children': self.children,
+            'roots': self.roots
+        }
+        if self.split_values is not None:
+            arrays['split_offsets'] = self.split_offsets
+            arrays['split_values'] = self.split_values
+        return arrays
+
+def _tree_table(tree, estimator_features=None):
+    """Node arrays of one fitted sklearn tree (children are -1 at leaves)"""
+    t = tree.tree_
+    is_leaf = t.children_left == -1
+
+    feature = np.where(is_leaf, 0, t.feature)
+    if estimator_features is not None:
+        # Tree features index into the estimator's feature subset
+        feature = np.asarray(estimator_features)[feature]
+
+    return {
+        'nodes': np.arange(t.node_count),
+        'feature': feature,
+        'threshold': np.where(is_leaf, np.inf, t.threshold),
+        'children_left': t.children_left,
+        'children_right': t.children_right,
+        'max_depth': t.max_depth
+    }
+
+def _flatten_trees(tables):
+    """Concatenate per-tree node tables into one; returns (arrays, max_depth)"""
+    features, thresholds, children, roots = [], [], [], []
+    node_offset = 0
+    max_depth = 0
+
+    for table in tables:
+        node_index = np.arange(len(table['feature']))
+        is_leaf = table['children_left'] == -1
+
+        features.append(table['feature'])
+        thresholds.append(table['threshold'])
+        children.append(np.stack([
+            np.where(is_leaf, node_index, table['children_left']) + node_offset,
+            np.where(is_leaf, node_index, table['children_right']) + node_offset
+        ], axis=1).ravel())
+
+        roots.append(node_offset)
+        node_offset += len(node_index)
+        max_depth = max(max_depth, table['max_depth'])
+
+    arrays = {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'children': np.concatenate(children),
+        'roots': np.array(roots)
+    }
+    return arrays, max_depth
+
+class CompiledIsolationForest(_CompiledTrees):
+    """Fitted IsolationForest and StandardScaler flattened into contiguous arrays"""
+
+    def __init__(self, feature, threshold, children, leaf_value, roots, max_depth,
+                 denominator, offset, scaler_mean, scaler_scale):
+        super().__init__(feature, threshold, children, roots, max_depth)
+        self.leaf_value = np.ascontiguousarray(leaf_value, dtype=np.float64)
+        self.denominator = np.asarray(denominator, dtype=np.float64)
+        self.offset = float(offset)
+        self.scaler_mean = np.ascontiguousarray(scaler_mean, dtype=np.float64)
+        self.scaler_scale = np.ascontiguousarray(scaler_scale, dtype=np.float64)
+
+    @classmethod
+    def from_detector(cls, detector):
+        """Export the fitted models of a TouristAnomalyDetector"""
+        return cls.from_estimators(detector.isolation_forest, detector.scaler)
+
+    @classmethod
+    def from_estimators(cls, isolation_forest, scaler):
+        """Export a fitted IsolationForest and the StandardScaler feeding it"""
+        arrays, max_depth = _flatten_trees([
+            _tree_table(tree, features)
+            for tree, features in zip(isolation_forest.estimators_, isolation_forest.estimators_features_)
+        ])
+
+        # Same per-node path length IsolationForest adds up at its leaves
+        leaf_value = np.concatenate([
+            _node_depths(tree.tree_.children_left, tree.tree_.children_right)
+            + _average_path_length(tree.tree_.n_node_samples)
+            - 1.0
+            for tree in isolation_forest.estimators_
+        ])
+
+        denominator = len(isolation_forest.estimators_) * _average_path_length([isolation_forest._max_samples])
+
+        return cls(
+            leaf_value=leaf_value,
+            max_depth=max_depth,
+            denominator=denominator,
+            offset=isolation_forest.offset_,
+            scaler_mean=scaler.mean_,
+            scaler_scale=scaler.scale_,
+            **arrays
+        )
+
+    def transform(self, X):
+        """Scale raw feature rows in place, as StandardScaler.transform does"""
+        X -= self.scaler_mean
+        X /= self.scaler_scale
+        return X
+
+    def score_samples(self, X_scaled):
+        """Equivalent of IsolationForest.score_samples on already-scaled rows"""
+        depths = np.empty(len(X_scaled), dtype=np.float64)
+        for start, chunk in self._chunks(X_scaled):
+            # cumsum adds trees strictly in order, matching the forest's running
+            # total bit for bit (a plain sum would use pairwise summation)
+            depths[start:start + len(chunk)] = np.cumsum(self.leaf_value.take(self._leaves(chunk)), axis=1)[:, -1]
+
+        scores = 2 ** (-np.divide(depths, self.denominator, out=np.ones_like(depths),
+                                  where=self.denominator != 0))
+        return -scores
+
+    def predict(self, X_scaled):
+        """Return (is_anomaly, anomaly_score) arrays for already-scaled rows"""
+        anomaly_scores = self.score_samples(X_scaled)
+        return (anomaly_scores - self.offset) < 0, anomaly_scores
+
+    def to_artifact(self):
+        """(metadata, arrays) for model_artifact.write_artifact"""
+        meta = {'max_depth': self.max_depth, 'denominator': self.denominator.item(), 'offset': self.offset}
+        arrays = dict(self.tree_arrays(), leaf_value=self.leaf_value,
+                      scaler_mean=self.scaler_mean, scaler_scale=self.scaler_scale)
+        return meta, arrays
+
+    @classmethod
+    def from_artifact(cls, meta, arrays):
+        return cls(
+            max_depth=meta['max_depth'],
+            denominator=meta['denominator'],
+            offset=meta['offset'],
+            **{name: arrays[name] for name in (
+                'feature', 'threshold', 'children', 'roots', 'leaf_value', 'scaler_mean', 'scaler_scale'
+            )}
+        )
+
+class CompiledRandomForest(_CompiledTrees):
+    """Fitted RandomForestClassifier flattened into contiguous arrays.
+
+    Every node carries the class probabilities its tree would predict if it
+    were the leaf, so predict_proba is one walk plus one gather.
+    """
+
+    def __init__(self, feature, threshold, children, leaf_proba, roots, max_depth, classes,
+                 split_offsets=None, split_values=None):
+        super().__init__(feature, threshold, children, roots, max_depth, split_offsets, split_values)
+        # float64 reproduces predict_proba exactly; compressed models may store less
+        self.leaf_proba = np.ascontiguousarray(leaf_proba)
+        self.classes_ = np.asarray(classes, dtype=object)
+
+    @classmethod
+    def from_estimator(cls, forest):
+        return cls.from_trees(forest.estimators_, [_tree_table(tree) for tree in forest.estimators_], forest.classes_)
+
+    @classmethod
+    def from_trees(cls, trees, tables, classes):
+        """Compile trees from their (possibly pruned) node tables"""
+        arrays, max_depth = _flatten_trees(tables)
+        return cls(
+            leaf_proba=np.concatenate([
+                _tree_probabilities(tree)[table['nodes']] for tree, table in zip(trees, tables)
+            ]),
+            max_depth=max_depth,
+            classes=classes,
+            **arrays
+        )
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.tree_arrays().values()) + self.leaf_proba.nbytes
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def predict_proba(self, X):
+        """Equivalent of RandomForestClassifier.predict_proba"""
+        probabilities = np.empty((len(X), len(self.classes_)), dtype=np.float64)
+        for start, chunk in self._chunks(X):
+            # Trees are added in order like the forest's sequential accumulation
+            probabilities[start:start + len(chunk)] = np.cumsum(
+                self.leaf_proba[self._leaves(chunk)], axis=1, dtype=np.float64
+            )[:, -1]
+
+        probabilities /= self.n_trees
+        return probabilities
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def to_artifact(self):
+        """(metadata, arrays) for model_artifact.write_artifact"""
+        meta = {'max_depth': self.max_depth, 'classes': [str(label) for label in self.classes_]}
+        return meta, dict(self.tree_arrays(), leaf_proba=self.leaf_proba)
+
+    @classmethod
+    def from_artifact(cls, meta, arrays):
+        return cls(
+            max_depth=meta['max_depth'],
+            classes=meta['classes'],
+            **{name: arrays[name] for name in (
+                'feature', 'threshold', 'children', 'roots', 'leaf_proba', 'split_offsets', 'split_values'
+            ) if name in arrays}
+        )
+
+def _tree_probabilities(tree):
+    """Per-node class probabilities, normalised exactly as DecisionTreeClassifier.predict_proba"""
+    proba = tree.tree_.value[:, 0, :tree.n_classes_].copy()
+    normalizer = proba.sum(axis=1)[:, np.newaxis]
+    normalizer[normalizer == 0.0] = 1.0
+    proba /= normalizer
+    return proba
+
+def _node_depths(children_left, children_right):
+    """Depth of every node with the root at depth 1, as sklearn counts it"""
+    depths = np.zeros(len(children_left), dtype=np.float64)
+    depths[0] = 1.0
+    frontier = np.array([0])
+
+    while frontier.size:
+        parents = frontier[children_left[frontier] != -1]
+        children = np.concatenate([children_left[parents], children_right[parents]])
+        depths[children] = np.concatenate([depths[parents], depths[parents]]) + 1.0
+        frontier = children
+
+    return depths
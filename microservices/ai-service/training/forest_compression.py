@@ -0,0 +1,250 @@
+# training/forest_compression.py
+import argparse
+import heapq
+import os
+import time
+
+import numpy as np
+
+from compiled_forest import CompiledRandomForest, _tree_table, _node_depths
+from risk_assessment import TouristRiskAssessment
+from model_registry import ANOMALY_MODEL_FILE, ANOMALY_ARTIFACT_FILE, RISK_MODEL_FILE, RISK_ARTIFACT_FILE, link_artifact
+from train import parse_values, expand_grid
+
+THRESHOLD_DTYPES = ('float64', 'float32', 'uint16')
+PROBA_DTYPES = ('float64', 'float32', 'float16')
+
+# Grid compared when no options are given
+DEFAULT_GRID = {
+    'max_depth': [None, 16, 12, 8],
+    'max_leaves': [None],
+    'n_trees': [None, 50, 25],
+    'thresholds': ['uint16'],
+    'proba': ['float16']
+}
+
+# Rows timed per single-row latency measurement
+SINGLE_ROW_REPEATS = 50
+
+def compress_forest(forest, max_depth=None, max_leaves=None, n_trees=None,
+                    thresholds='float64', proba='float64', X_select=None, y_select=None):
+    """Compile a fitted RandomForestClassifier into a smaller CompiledRandomForest.
+
+    Trees are cut back to max_depth and/or max_leaves leaves, only the n_trees
+    most accurate trees on (X_select, y_select) are kept, and thresholds and
+    leaf probabilities are stored in the requested dtypes. 'float32' and
+    'uint16' thresholds give the same splits as float64 for the float32
+    inputs the trees compare against; only pruning, dropping trees and
+    narrower probabilities change predictions.
+    """
+    if thresholds not in THRESHOLD_DTYPES:
+        raise ValueError(f"thresholds must be one of {THRESHOLD_DTYPES}")
+    if proba not in PROBA_DTYPES:
+        raise ValueError(f"proba must be one of {PROBA_DTYPES}")
+
+    trees = select_trees(forest, n_trees, X_select, y_select)
+    tables = [prune_tree(tree, max_depth, max_leaves) for tree in trees]
+    compiled = CompiledRandomForest.from_trees(trees, tables, forest.classes_)
+
+    threshold = compiled.threshold
+    split_offsets = split_values = None
+    if thresholds != 'float64':
+        threshold = _round_down_float32(threshold)
+    if thresholds == 'uint16':
+        threshold, split_offsets, split_values = _split_ranks(compiled.feature, threshold, forest.n_features_in_)
+
+    return CompiledRandomForest(
+        feature=compiled.feature,
+        threshold=threshold,
+        children=compiled.children,
+        leaf_proba=compiled.leaf_proba.astype(proba),
+        roots=compiled.roots,
+        max_depth=compiled.max_depth,
+        classes=compiled.classes_,
+        split_offsets=split_offsets,
+        split_values=split_values
+    )
+
+def select_trees(forest, n_trees, X_select=None, y_select=None):
+    """The n_trees individually most accurate trees, in their original order"""
+    trees = list(forest.estimators_)
+    if n_trees is None or n_trees >= len(trees):
+        return trees
+    if X_select is None:
+        return trees[:n_trees]
+
+    # Trees predict class indices into forest.classes_
+    X32 = np.asarray(X_select, dtype=np.float32)
+    y_index = np.searchsorted(forest.classes_, y_select)
+    accuracy = np.array([(tree.predict(X32, check_input=False) == y_index).mean() for tree in trees])
+    keep = np.sort(np.argsort(-accuracy, kind='stable')[:n_trees])
+    return [trees[i] for i in keep]
+
+def prune_tree(tree, max_depth=None, max_leaves=None):
+    """Node table of a tree cut back to max_depth and/or at most max_leaves leaves"""
+    if max_depth is None and max_leaves is None:
+        return _tree_table(tree)
+
+    t = tree.tree_
+    left, right = t.children_left, t.children_right
+    depth = _node_depths(left, right) - 1  # root at depth 0
+
+    splittable = left != -1
+    if max_depth is not None:
+        splittable &= depth < max_depth
+
+    if max_leaves is None:
+        expanded = splittable
+    else:
+        # Best-first like max_leaf_nodes: keep splitting the heaviest leaf
+        expanded = np.zeros(t.node_count, dtype=bool)
+        heap = [(-t.weighted_n_node_samples[0], 0)]
+        leaves = 1
+        while heap and leaves < max_leaves:
+            _, node = heapq.heappop(heap)
+            if not splittable[node]:
+                continue
+            expanded[node] = True
+            leaves += 1
+            for child in (left[node], right[node]):
+                heapq.heappush(heap, (-t.weighted_n_node_samples[child], child))
+
+    # Keep the nodes still reachable, renumbered in breadth-first order
+    nodes = [0]
+    for node in nodes:
+        if expanded[node]:
+            nodes.extend((left[node], right[node]))
+    nodes = np.array(nodes)
+
+    new_index = np.full(t.node_count, -1)
+    new_index[nodes] = np.arange(len(nodes))
+    internal = expanded[nodes]
+
+    return {
+        'nodes': nodes,
+        'feature': np.where(internal, t.feature[nodes], 0),
+        'threshold': np.where(internal, t.threshold[nodes], np.inf),
+        'children_left': np.where(internal, new_index[left[nodes]], -1),
+        'children_right': np.where(internal, new_index[right[nodes]], -1),
+        'max_depth': int(depth[nodes].max())
+    }
+
+def _round_down_float32(threshold):
+    """Largest float32 <= each threshold, so x <= t is unchanged for float32 x"""
+    threshold32 = threshold.astype(np.float32)
+    over = threshold32.astype(np.float64) > threshold
+    threshold32[over] = np.nextafter(threshold32[over], np.float32(-np.inf))
+    return threshold32
+
+def _split_ranks(feature, threshold32, n_features):
+    """Replace thresholds by their rank among the feature's sorted split values"""
+    is_split = np.isfinite(threshold32)
+    codes = np.full(len(threshold32), np.iinfo(np.uint16).max, dtype=np.uint16)
+    offsets = [0]
+    values = []
+
+    for f in range(n_features):
+        mask = is_split & (feature == f)
+        splits = np.unique(threshold32[mask])
+        if len(splits) >= np.iinfo(np.uint16).max:
+            raise ValueError(f"Feature {f} has {len(splits)} distinct splits; prune further for 16-bit thresholds")
+        codes[mask] = np.searchsorted(splits, threshold32[mask])
+        values.append(splits)
+        offsets.append(offsets[-1] + len(splits))
+
+    return codes, np.array(offsets), np.concatenate(values).astype(np.float32)
+
+def evaluate(model, X, y):
+    """Size, latency and accuracy of a compiled forest on scaled rows"""
+    start = time.perf_counter()
+    predictions = model.predict(X)
+    batch_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(SINGLE_ROW_REPEATS):
+        model.predict_proba(X[i:i + 1])
+    single_seconds = (time.perf_counter() - start) / SINGLE_ROW_REPEATS
+
+    return {
+        'trees': model.n_trees,
+        'nodes': model.node_count,
+        'max_depth': model.max_depth,
+        'bytes': model.nbytes,
+        'accuracy': float((predictions == y).mean()),
+        'batch_us_per_row': round(batch_seconds / len(X) * 1e6, 2),
+        'single_row_us': round(single_seconds * 1e6, 1)
+    }
+
+def format_row(name, stats, baseline_accuracy):
+    return (f"{name:<75} {stats['trees']:>5} {stats['max_depth']:>5} {stats['bytes'] / 1e6:>8.2f}MB "
+            f"{stats['batch_us_per_row']:>8.1f}us {stats['single_row_us']:>8.0f}us "
+            f"{stats['accuracy']:>7.3f} {stats['accuracy'] - baseline_accuracy:>+7.3f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prune and quantize the risk RandomForest and compare the tradeoffs")
+    parser.add_argument('model_dir', help="directory holding the joblib risk model")
+    parser.add_argument('--max-depth', help="comma-separated depths ('none' keeps full depth)")
+    parser.add_argument('--max-leaves', help="comma-separated leaf budgets per tree")
+    parser.add_argument('--n-trees', help="comma-separated tree counts to keep")
+    parser.add_argument('--thresholds', help="comma-separated of float64, float32, uint16")
+    parser.add_argument('--proba', help="comma-separated of float64, float32, float16")
+    parser.add_argument('--samples', type=int, default=20000, help="validation rows (half select trees, half score)")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--max-accuracy-loss', type=float, default=0.01)
+    parser.add_argument('--output-dir', help="save the smallest configuration within the accuracy loss here")
+    args = parser.parse_args(argv)
+
+    risk_assessor = TouristRiskAssessment().load_model(os.path.join(args.model_dir, RISK_MODEL_FILE))
+    forest = risk_assessor.risk_model
+
+    # Fresh synthetic data: one half ranks trees, the other measures accuracy
+    validation = risk_assessor.create_risk_training_data(args.samples, seed=args.seed)
+    X = risk_assessor.scale_features(risk_assessor.build_features(validation))
+    y = validation['risk_level'].to_numpy(dtype=object)
+    half = len(X) // 2
+    X_select, y_select, X_eval, y_eval = X[:half], y[:half], X[half:], y[half:]
+
+    grid = {}
+    for name, default in DEFAULT_GRID.items():
+        value = getattr(args, name)
+        if value is None:
+            grid[name] = default
+        elif name in ('thresholds', 'proba'):
+            grid[name] = value.split(',')
+        else:
+            grid[name] = parse_values(value)
+
+    baseline = evaluate(CompiledRandomForest.from_estimator(forest), X_eval, y_eval)
+    print(f"{'configuration':<75} {'trees':>5} {'depth':>5} {'size':>10} {'batch':>10} {'single':>10} "
+          f"{'acc':>7} {'delta':>7}")
+    print(format_row('original', baseline, baseline['accuracy']))
+
+    results = []
+    for config in expand_grid(grid):
+        model = compress_forest(forest, X_select=X_select, y_select=y_select, **config)
+        stats = evaluate(model, X_eval, y_eval)
+        name = ' '.join(f"{key}={value}" for key, value in config.items())
+        print(format_row(name, stats, baseline['accuracy']))
+        results.append((stats, config, model))
+
+    eligible = [item for item in results if baseline['accuracy'] - item[0]['accuracy'] <= args.max_accuracy_loss]
+    if not eligible:
+        print(f"No configuration within {args.max_accuracy_loss} accuracy of the original")
+        return
+
+    stats, config, model = min(eligible, key=lambda item: (item[0]['bytes'], item[0]['batch_us_per_row']))
+    print(f"Smallest within {args.max_accuracy_loss} accuracy loss: {config} "
+          f"({stats['bytes'] / 1e6:.2f}MB, accuracy {stats['accuracy']:.3f})")
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        risk_assessor.compiled_model = model
+        risk_assessor.export_artifact(os.path.join(args.output_dir, RISK_ARTIFACT_FILE))
+        # Carry the anomaly model over so the directory is a complete version
+        for name in (ANOMALY_MODEL_FILE, ANOMALY_ARTIFACT_FILE):
+            source = os.path.join(args.model_dir, name)
+            if os.path.isfile(source):
+                link_artifact(source, os.path.join(args.output_dir, name))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+# training/metrics.py
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds (50us .. 5s)
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+class _Metric:
+    """Base for labelled metrics; children are created once per label set"""
+
+    kind = None
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def child(self, *label_values):
+        child = self._children.get(label_values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(label_values, self._new_child())
+        return child
+
+    def render(self, children=None):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for label_values, child in sorted((self._children if children is None else children).items()):
+            lines.extend(child.render(self.name, _format_labels(self.labels, label_values)))
+        return lines
+
+    def snapshot(self):
+        """[[label values, child state], ...] for writing to a metrics file"""
+        return [[list(label_values), child.state()] for label_values, child in list(self._children.items())]
+
+    def merge(self, snapshots):
+        """Children holding the sum of several processes' snapshots"""
+        children = {}
+        for samples in snapshots:
+            for label_values, state in samples:
+                key = tuple(label_values)
+                child = children.get(key)
+                if child is None:
+                    child = children[key] = self._new_child()
+                child.merge(state)
+        return children
+
+class _CounterChild:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def state(self):
+        return self.value
+
+    def merge(self, state):
+        self.value += state
+
+    def render(self, name, labels):
+        return [f"{name}{{{labels}}} {self.value}" if labels else f"{name} {self.value}"]
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+class _HistogramChild:
+    __slots__ = ('buckets', 'counts', 'total', 'count', '_lock')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        # Counts are per bucket here and made cumulative when rendered
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.total += value
+            self.count += 1
+
+    def state(self):
+        with self._lock:
+            return {'counts': list(self.counts), 'total': self.total, 'count': self.count}
+
+    def merge(self, state):
+        # Files written with other buckets can't be added bucket by bucket
+        if len(state['counts']) != len(self.counts):
+            return
+        self.counts = [a + b for a, b in zip(self.counts, state['counts'])]
+        self.total += state['total']
+        self.count += state['count']
+
+    def render(self, name, labels):
+        prefix = f"{labels}," if labels else ''
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += bucket_count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ''
+        lines.append(f"{name}_sum{suffix} {self.total}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+class MetricsRegistry:
+    """Metrics rendered in the Prometheus text format.
+
+    Hot-path cost is a dict lookup for the label set plus a bisect and a lock
+    around a few integer adds, well under a microsecond per observation.
+
+    Values are process-local unless multiprocess_dir is set, like
+    prometheus_client's multiprocess mode: each process then writes its
+    values to its own file there every flush interval, and render() adds up
+    every process's file. Counters and histograms of exited processes are
+    kept (see mark_process_dead); their gauges are dropped.
+    """
+
+    def __init__(self, multiprocess_dir=None):
+        self._metrics = []
+        self.multiprocess_dir = multiprocess_dir
+        self._pid = os.getpid()
+        self._flusher = None
+        self._stop = threading.Event()
+        # The writer thread and /metrics requests both flush
+        self._flush_lock = threading.Lock()
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, description, labels=()):
+        return self._register(Counter(name, description, labels))
+
+    def gauge(self, name, description, labels=()):
+        return self._register(Gauge(name, description, labels))
+
+    def histogram(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, description, labels, buckets))
+
+    def render(self):
+        if self.multiprocess_dir:
+            return self._render_multiprocess()
+
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def start_flushing(self, interval=1.0):
+        """Write this process's values to multiprocess_dir every interval seconds (call after forking)"""
+        if not self.multiprocess_dir or (self._flusher is not None and self._flusher.is_alive()):
+            return
+
+        if os.getpid() != self._pid:
+            # Values recorded before the fork belong to the parent
+            for metric in self._metrics:
+                metric._children.clear()
+            self._pid = os.getpid()
+
+        os.makedirs(self.multiprocess_dir, exist_ok=True)
+        self._stop.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, args=(interval,), name='metrics-writer',
+                                         daemon=True)
+        self._flusher.start()
+
+    def stop_flushing(self):
+        if not self.multiprocess_dir:
+            return
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+    def flush(self):
+        """Write this process's current values to its file in multiprocess_dir"""
+        with self._flush_lock:
+            snapshot = {metric.name: metric.snapshot() for metric in self._metrics}
+            _write_json(self._path(self._pid), snapshot)
+
+    def clear_files(self):
+        """Remove every metrics file; call once before starting workers"""
+        for path in self._files():
+            os.remove(path)
+
+    def mark_process_dead(self, pid):
+        """Fold an exited process's counters and histograms into the totals and drop its gauges"""
+        path = self._path(pid)
+        snapshot = _read_json(path)
+        if snapshot is None:
+            return
+
+        dead_path = self._path('dead')
+        totals = _read_json(dead_path) or {}
+        for metric in self._metrics:
+            if metric.kind != 'gauge' and snapshot.get(metric.name):
+                merged = metric.merge([totals.get(metric.name, []), snapshot[metric.name]])
+                totals[metric.name] = [[list(key), child.state()] for key, child in merged.items()]
+        _write_json(dead_path, totals)
+        os.remove(path)
+
+    def _path(self, pid):
+        return os.path.join(self.multiprocess_dir, f"metrics_{pid}.json")
+
+    def _files(self):
+        return glob.glob(os.path.join(self.multiprocess_dir, 'metrics_*.json'))
+
+    def _flush_loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except OSError as e:
+                logger.error(f"Writing metrics to {self.multiprocess_dir} failed: {str(e)}")
+
+    def _render_multiprocess(self):
+        # Include this process's newest values rather than its last flush
+        self.flush()
+        snapshots = [snapshot for snapshot in map(_read_json, self._files()) if snapshot is not None]
+
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(metric.merge(snapshot.get(metric.name, []) for snapshot in snapshots)))
+        return "\n".join(lines) + "\n"
+
+def add_stage_time(stage_timings, stage, seconds):
+    """Accumulate a stage duration into an optional per-request timings dict"""
+    if stage_timings is not None:
+        stage_timings[stage] = stage_timings.get(stage, 0.0) + seconds
+
+def _write_json(path, data):
+    # Write a private temp file then rename it, so readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.metrics-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        # The process exited and was folded into the totals meanwhile
+        return None
+    except ValueError as e:
+        logger.warning(f"Skipping unreadable metrics file {path}: {str(e)}")
+        return None
+
+def _format_labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,96 @@
+# training/model_artifact.py
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+
+# File layout: magic, little-endian uint64 header length, JSON header, then
+# each array's raw bytes at an aligned offset from the start of the data section
+ARTIFACT_MAGIC = b'TSMODEL\x00'
+SCHEMA_VERSION = 1
+ALIGNMENT = 64
+
+def write_artifact(filepath, kind, meta, arrays):
+    """Write a model as a JSON header plus flat typed arrays"""
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.hasobject:
+            raise TypeError(f"Array '{name}' has object dtype; store it in the header instead")
+        entries[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps({
+        'schema': SCHEMA_VERSION,
+        'kind': kind,
+        'meta': meta,
+        'arrays': entries
+    }, separators=(',', ':')).encode('utf-8')
+
+    data_start = _aligned(len(ARTIFACT_MAGIC) + 8 + len(header))
+
+    with open(filepath, 'wb') as f:
+        f.write(ARTIFACT_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.write(b'\x00' * (data_start + entries[name]['offset'] - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+
+def read_artifact(filepath, kind=None, mmap=True):
+    """Return (meta, arrays); with mmap the arrays are read-only views of the file"""
+    with open(filepath, 'rb') as f:
+        if f.read(len(ARTIFACT_MAGIC)) != ARTIFACT_MAGIC:
+            raise ValueError(f"{filepath} is not a model artifact")
+        (header_length,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+
+    if header['schema'] != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported model artifact schema {header['schema']} (expected {SCHEMA_VERSION})")
+    if kind is not None and header['kind'] != kind:
+        raise ValueError(f"{filepath} holds a '{header['kind']}' model, not '{kind}'")
+
+    data_start = _aligned(len(ARTIFACT_MAGIC) + 8 + header_length)
+    if mmap:
+        buffer = np.memmap(filepath, dtype=np.uint8, mode='r')
+    else:
+        buffer = np.fromfile(filepath, dtype=np.uint8)
+
+    arrays = {}
+    for name, entry in header['arrays'].items():
+        dtype = np.dtype(entry['dtype'])
+        start = data_start + entry['offset']
+        count = int(np.prod(entry['shape'], dtype=np.int64))
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(entry['shape'])
+
+    return header['meta'], arrays
+
+def is_artifact(filepath):
+    """Whether a file is in this format (rather than a joblib pickle)"""
+    with open(filepath, 'rb') as f:
+        return f.read(len(ARTIFACT_MAGIC)) == ARTIFACT_MAGIC
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the joblib models in a version directory as compact artifacts")
+    parser.add_argument('directory', help="directory holding the joblib model files")
+    args = parser.parse_args(argv)
+
+    # Imported here; the model modules import this one
+    from anomaly_detection import TouristAnomalyDetector
+    from risk_assessment import TouristRiskAssessment
+    from model_registry import ANOMALY_MODEL_FILE, ANOMALY_ARTIFACT_FILE, RISK_MODEL_FILE, RISK_ARTIFACT_FILE
+
+    detector = TouristAnomalyDetector().load_model(os.path.join(args.directory, ANOMALY_MODEL_FILE))
+    detector.export_artifact(os.path.join(args.directory, ANOMALY_ARTIFACT_FILE))
+
+    risk_assessor = TouristRiskAssessment().load_model(os.path.join(args.directory, RISK_MODEL_FILE))
+    risk_assessor.export_artifact(os.path.join(args.directory, RISK_ARTIFACT_FILE))
+
+if __name__ == '__main__':
+    main()
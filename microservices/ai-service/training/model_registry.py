@@ -0,0 +1,205 @@
+# training/model_registry.py
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Files every model version directory must contain
+ANOMALY_MODEL_FILE = 'tourist_anomaly_detector.pkl'
+RISK_MODEL_FILE = 'tourist_risk_assessment.pkl'
+
+# Compact artifacts (model_artifact.py), loaded instead of the pickles when present
+ANOMALY_ARTIFACT_FILE = 'tourist_anomaly_detector.tsm'
+RISK_ARTIFACT_FILE = 'tourist_risk_assessment.tsm'
+
+MODEL_FILES = {
+    'anomaly': (ANOMALY_ARTIFACT_FILE, ANOMALY_MODEL_FILE),
+    'risk': (RISK_ARTIFACT_FILE, RISK_MODEL_FILE)
+}
+
+# Version used when the artifacts sit directly in MODEL_PATH
+DEFAULT_VERSION = 'default'
+
+class ModelBundle:
+    """One loaded model version.
+
+    Requests take a reference to the active bundle once and use it until they
+    finish, so swapping in a new bundle never affects a request in flight.
+    """
+
+    def __init__(self, version, path, anomaly_detector, risk_assessor, safety_engine, load_seconds):
+        self.version = version
+        self.path = path
+        self.anomaly_detector = anomaly_detector
+        self.risk_assessor = risk_assessor
+        self.safety_engine = safety_engine
+        self.load_seconds = load_seconds
+        self.loaded_at = datetime.now()
+
+    def close(self):
+        """Release resources once the bundle has been swapped out"""
+        close = getattr(self.safety_engine, 'close', None)
+        if close is not None:
+            close()
+
+class ModelRegistry:
+    """Tracks versioned model artifacts under MODEL_PATH and hot-swaps them.
+
+    Each version is a subdirectory holding both model files; the highest
+    version (compared with numbers treated numerically, so v10 > v9) wins.
+    Publish a version by writing it to a hidden directory (leading '.') and
+    renaming it into place, so the watcher never sees half-written files.
+    on_reload(bundle), if set, is called by the watcher after it activates a
+    new version.
+    """
+
+    def __init__(self, model_path, loader, warmup=None, poll_interval=30, on_reload=None):
+        self.model_path = model_path
+        self.loader = loader
+        self.warmup = warmup
+        self.poll_interval = poll_interval
+        self.on_reload = on_reload
+        self.active = None
+        self.reloads = 0
+        self.last_error = None
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def available_versions(self):
+        """Return [(version, directory)] of complete versions, oldest first"""
+        versions = []
+
+        if os.path.isdir(self.model_path):
+            for name in os.listdir(self.model_path):
+                if name.startswith('.'):
+                    continue
+                directory = os.path.join(self.model_path, name)
+                if os.path.isdir(directory) and _has_artifacts(directory):
+                    versions.append((name, directory))
+
+        versions.sort(key=lambda item: _version_key(item[0]))
+
+        if not versions and _has_artifacts(self.model_path):
+            versions.append((DEFAULT_VERSION, self.model_path))
+
+        return versions
+
+    def load_version(self, version, directory):
+        """Load, warm up and atomically activate one version"""
+        start = time.perf_counter()
+        anomaly_detector, risk_assessor, safety_engine = self.loader(directory)
+        bundle = ModelBundle(version, directory, anomaly_detector, risk_assessor, safety_engine,
+                             load_seconds=0.0)
+
+        # Run a few predictions before taking traffic so first requests
+        # don't pay for lazy initialisation
+        if self.warmup is not None:
+            self.warmup(bundle)
+
+        bundle.load_seconds = time.perf_counter() - start
+
+        # Single reference assignment: requests see either the old or the new bundle
+        previous, self.active = self.active, bundle
+        if previous is not None:
+            previous.close()
+        self.reloads += 1
+        logger.info(f"Activated model version {version} in {bundle.load_seconds:.2f}s")
+        return bundle
+
+    def refresh(self):
+        """Activate the newest available version if it isn't active yet"""
+        with self._load_lock:
+            versions = self.available_versions()
+            if not versions:
+                raise FileNotFoundError(f"No model artifacts found in {self.model_path}")
+
+            version, directory = versions[-1]
+            if self.active is not None and self.active.version == version:
+                return False
+
+            self.load_version(version, directory)
+            return True
+
+    def start_watching(self):
+        """Poll MODEL_PATH for new versions on a background thread"""
+        if self.poll_interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name='model-registry', daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if self.refresh() and self.on_reload is not None:
+                    self.on_reload(self.active)
+                self.last_error = None
+            except Exception as e:
+                # Keep serving the current version
+                self.last_error = str(e)
+                logger.error(f"Model reload failed: {str(e)}")
+
+    def status(self):
+        """Active version and load details for /health"""
+        bundle = self.active
+        return {
+            'active_version': bundle.version if bundle else None,
+            'loaded_at': bundle.loaded_at.isoformat() if bundle else None,
+            'load_seconds': round(bundle.load_seconds, 3) if bundle else None,
+            'available_versions': [version for version, _ in self.available_versions()],
+            'reloads': self.reloads,
+            'last_error': self.last_error
+        }
+
+def publish_version(model_path, write_artifacts, version=None):
+    """Write a new version directory under MODEL_PATH and rename it into place.
+
+    write_artifacts(directory) saves the model files; the directory stays
+    hidden until it returns, so watchers never load a partial version.
+    Returns the version name (next 'vN' by default).
+    """
+    if version is None:
+        os.makedirs(model_path, exist_ok=True)
+        numbers = [int(name[1:]) for name in os.listdir(model_path) if re.fullmatch(r'v\d+', name)]
+        version = f"v{max(numbers, default=0) + 1}"
+
+    staging = os.path.join(model_path, f".{version}.tmp")
+    # Left over from an interrupted publish
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    write_artifacts(staging)
+    os.rename(staging, os.path.join(model_path, version))
+    return version
+
+def model_file(directory, kind):
+    """Path of the file to load for a model ('anomaly' or 'risk'), or None"""
+    for name in MODEL_FILES[kind]:
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+def link_artifact(source, destination):
+    """Hard-link a model file into another version directory, copying across filesystems"""
+    # Versions are immutable once published, so sharing the inode is safe
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+def _has_artifacts(directory):
+    return all(model_file(directory, kind) is not None for kind in MODEL_FILES)
+
+def _version_key(version):
+    """Sort key comparing digit runs numerically"""
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part) for part in re.split(r'(\d+)', version) if part]
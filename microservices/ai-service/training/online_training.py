@@ -0,0 +1,109 @@
+# training/online_training.py
+import argparse
+import logging
+import os
+import time
+
+from anomaly_detection import TouristAnomalyDetector
+from model_registry import (
+    ModelRegistry, ANOMALY_MODEL_FILE, ANOMALY_ARTIFACT_FILE, RISK_MODEL_FILE, RISK_ARTIFACT_FILE, link_artifact,
+    publish_version
+)
+from telemetry_store import TelemetryRingStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class OnlineAnomalyTrainer:
+    """Refreshes the anomaly model from recorded production readings.
+
+    Each round loads the newest published version, refits the oldest share
+    of its trees on a sliding window of the telemetry store and publishes
+    the result as a new version, which the service then hot-reloads. Runs
+    as its own process so serving is never blocked by training.
+    """
+
+    def __init__(self, store, model_path, window=100000, min_rows=10000, replace_fraction=0.25):
+        self.store = store
+        self.model_path = model_path
+        self.window = window
+        self.min_rows = min_rows
+        self.replace_fraction = replace_fraction
+        self.last_seen = store.total_written
+
+    def run_once(self, force=False):
+        """Refresh and publish if enough new readings arrived; returns the new version or None"""
+        new_rows = self.store.total_written - self.last_seen
+        if new_rows < self.min_rows and not force:
+            logger.info(f"Only {new_rows} new readings since last refresh; skipping")
+            return None
+
+        versions = ModelRegistry(self.model_path, loader=None).available_versions()
+        if not versions:
+            raise FileNotFoundError(f"No model artifacts found in {self.model_path}")
+        base_version, base_directory = versions[-1]
+
+        # Refitting needs the full estimator, which .tsm-only versions don't ship
+        base_model = os.path.join(base_directory, ANOMALY_MODEL_FILE)
+        if not os.path.isfile(base_model):
+            logger.warning(f"{base_version} has no {ANOMALY_MODEL_FILE} to refit; skipping")
+            return None
+
+        seen = self.store.total_written
+        raw = self.store.window(self.window)
+
+        start = time.perf_counter()
+        detector = TouristAnomalyDetector()
+        detector.load_model(base_model)
+        replaced = detector.refresh_trees(raw, replace_fraction=self.replace_fraction, random_state=seen)
+
+        def write_artifacts(directory):
+            detector.save_model(os.path.join(directory, ANOMALY_MODEL_FILE))
+            # Keep the compact artifact in step if the base version shipped one
+            if os.path.isfile(os.path.join(base_directory, ANOMALY_ARTIFACT_FILE)):
+                detector.export_artifact(os.path.join(directory, ANOMALY_ARTIFACT_FILE))
+            for name in (RISK_MODEL_FILE, RISK_ARTIFACT_FILE):
+                if os.path.isfile(os.path.join(base_directory, name)):
+                    link_artifact(os.path.join(base_directory, name), os.path.join(directory, name))
+
+        version = publish_version(self.model_path, write_artifacts)
+        # Only now, so a failed round retries the same readings next time
+        self.last_seen = seen
+        logger.info(f"Published {version}: replaced {replaced} trees of {base_version} "
+                    f"using {len(raw)} readings in {time.perf_counter() - start:.2f}s")
+        return version
+
+    def run_forever(self, interval):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Online training round failed: {str(e)}")
+            time.sleep(interval)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Periodically refresh the anomaly model from recorded telemetry")
+    parser.add_argument('--store', default=os.environ.get('TELEMETRY_STORE'), help="telemetry ring store file")
+    parser.add_argument('--model-path', default=os.environ.get('MODEL_PATH', 'models'))
+    parser.add_argument('--window', type=int, default=100000, help="newest readings to refit on")
+    parser.add_argument('--min-rows', type=int, default=10000, help="new readings required before refreshing")
+    parser.add_argument('--replace-fraction', type=float, default=0.25, help="share of trees replaced per round")
+    parser.add_argument('--interval', type=float, default=3600, help="seconds between rounds; 0 runs once")
+    args = parser.parse_args(argv)
+
+    if not args.store:
+        parser.error("--store (or TELEMETRY_STORE) is required")
+
+    trainer = OnlineAnomalyTrainer(
+        TelemetryRingStore.open(args.store), args.model_path, window=args.window,
+        min_rows=args.min_rows, replace_fraction=args.replace_fraction
+    )
+
+    if args.interval <= 0:
+        # One-shot: refresh from whatever is already recorded
+        trainer.run_once(force=True)
+    else:
+        trainer.run_forever(args.interval)
+
+if __name__ == '__main__':
+    main()
@@ -6,131 +6,122 @@ from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.metrics import classification_report, confusion_matrix
 import joblib
+import time
 from datetime import datetime, timedelta
 
+from compiled_forest import CompiledRandomForest
+from metrics import add_stage_time
+from model_artifact import write_artifact, read_artifact, is_artifact
+
+# Model inputs
+CATEGORICAL_COLUMNS = ['weather_risk', 'terrain_type', 'time_of_day', 'season', 'tourist_experience']
+NUMERICAL_COLUMNS = ['group_size', 'elevation', 'temperature', 'humidity']
+RAW_NUMERIC_COLUMNS = [
+    'group_size', 'has_guide', 'emergency_equipment', 'elevation', 'temperature', 'humidity'
+]
+FEATURE_COLUMNS = [
+    'weather_risk_encoded', 'terrain_type_encoded', 'time_of_day_encoded',
+    'season_encoded', 'tourist_experience_encoded', 'group_size',
+    'has_guide', 'emergency_equipment', 'elevation', 'temperature', 'humidity'
+]
+
+# Synthetic training data: category values and the risk each one adds
+RISK_FACTORS = {
+    'weather_risk': ['clear', 'cloudy', 'rain', 'storm', 'fog'],
+    'terrain_type': ['urban', 'forest', 'mountain', 'river', 'desert'],
+    'time_of_day': ['morning', 'afternoon', 'evening', 'night'],
+    'season': ['spring', 'summer', 'monsoon', 'winter'],
+    'tourist_experience': ['beginner', 'intermediate', 'expert']
+}
+RISK_WEIGHTS = {
+    'weather_risk': np.array([0, 1, 3, 5, 4], dtype=np.int16),
+    'terrain_type': np.array([0, 2, 4, 3, 4], dtype=np.int16),
+    'time_of_day': np.array([1, 0, 2, 4], dtype=np.int16),
+    'season': np.array([1, 2, 4, 2], dtype=np.int16),  # Specific to Northeast India
+    'tourist_experience': np.array([2, 0, -1], dtype=np.int16)
+}
+# Indexed by group size 0..8
+GROUP_SIZE_RISK = np.array([0, 2, 0, 0, 0, 0, 1, 1, 1], dtype=np.int16)
+
+# Upper score bound (inclusive) of each level but the last
+RISK_LEVEL_THRESHOLDS = [2, 5, 8]
+RISK_LEVELS = ['low', 'medium', 'high', 'critical']
+
 class TouristRiskAssessment:
-    def __init__(self):
-        self.risk_model = RandomForestClassifier(n_estimators=100, random_state=42)
+    def __init__(self, n_estimators=100, max_depth=None, max_samples=None, n_jobs=None):
+        self.risk_model = RandomForestClassifier(
+            n_estimators=n_estimators,
+            max_depth=max_depth,
+            max_samples=max_samples,
+            n_jobs=n_jobs,
+            random_state=42
+        )
+        self.n_jobs = n_jobs
+        self.evaluation = {}
+        # Set when loaded from a compact artifact; replaces risk_model for inference
+        self.compiled_model = None
         self.scaler = StandardScaler()
         self.encoders = {}
+        self.category_codes = {}
 
-    def create_risk_training_data(self, n_samples=5000):
+    def create_risk_training_data(self, n_samples=5000, seed=42):
         """Create synthetic risk assessment training data"""
-        np.random.seed(42)
-        data = []
-
-        # Define risk factors and their weights
-        risk_factors = {
-            'weather_risk': ['clear', 'cloudy', 'rain', 'storm', 'fog'],
-            'terrain_type': ['urban', 'forest', 'mountain', 'river', 'desert'],
-            'time_of_day': ['morning', 'afternoon', 'evening', 'night'],
-            'season': ['spring', 'summer', 'monsoon', 'winter'],
-            'tourist_experience': ['beginner', 'intermediate', 'expert'],
-            'group_size': [1, 2, 3, 4, 5, 6, 7, 8],
-            'has_guide': [0, 1],
-            'emergency_equipment': [0, 1]
-        }
+        rng = np.random.default_rng(seed)
+        columns = {}
+        risk_score = np.zeros(n_samples, dtype=np.int16)
+
+        # Draw category codes and add each factor's risk by array lookup
+        for col in CATEGORICAL_COLUMNS:
+            codes = rng.integers(0, len(RISK_FACTORS[col]), size=n_samples, dtype=np.int8)
+            risk_score += RISK_WEIGHTS[col][codes]
+            columns[col] = pd.Categorical.from_codes(codes, categories=RISK_FACTORS[col])
+
+        group_size = rng.integers(1, 9, size=n_samples, dtype=np.int8)
+        has_guide = rng.integers(0, 2, size=n_samples, dtype=np.int8)
+        emergency_equipment = rng.integers(0, 2, size=n_samples, dtype=np.int8)
+
+        # Lone travelers are riskier; safety equipment reduces risk
+        risk_score += GROUP_SIZE_RISK[group_size]
+        risk_score -= has_guide * 2
+        risk_score -= emergency_equipment
+
+        # Add some additional numerical features
+        mountain = columns['terrain_type'].codes == RISK_FACTORS['terrain_type'].index('mountain')
+        elevation = rng.normal(100, 50, n_samples)
+        elevation[mountain] = rng.normal(1000, 500, np.count_nonzero(mountain))
+        temperature = rng.normal(25, 10, n_samples)
+        humidity = rng.normal(70, 20, n_samples)
+
+        # Convert to categorical risk level
+        risk_level = pd.Categorical.from_codes(
+            np.digitize(risk_score, RISK_LEVEL_THRESHOLDS, right=True), categories=RISK_LEVELS, ordered=True
+        )
 
-        # Risk level mapping
-        def calculate_risk_level(weather, terrain, time, season, experience, group, guide, equipment):
-            risk_score = 0
-
-            # Weather risk
-            weather_risk = {'clear': 0, 'cloudy': 1, 'rain': 3, 'storm': 5, 'fog': 4}
-            risk_score += weather_risk[weather]
-
-            # Terrain risk
-            terrain_risk = {'urban': 0, 'forest': 2, 'mountain': 4, 'river': 3, 'desert': 4}
-            risk_score += terrain_risk[terrain]
-
-            # Time risk
-            time_risk = {'morning': 1, 'afternoon': 0, 'evening': 2, 'night': 4}
-            risk_score += time_risk[time]
-
-            # Season risk (specific to Northeast India)
-            season_risk = {'spring': 1, 'summer': 2, 'monsoon': 4, 'winter': 2}
-            risk_score += season_risk[season]
-
-            # Experience modifier
-            exp_modifier = {'beginner': 2, 'intermediate': 0, 'expert': -1}
-            risk_score += exp_modifier[experience]
-
-            # Group size (lone travelers are riskier)
-            if group == 1:
-                risk_score += 2
-            elif group > 5:
-                risk_score += 1
-
-            # Safety equipment
-            risk_score -= guide * 2  # Guide reduces risk
-            risk_score -= equipment * 1  # Equipment reduces risk
-
-            # Convert to categorical risk level
-            if risk_score <= 2:
-                return 'low'
-            elif risk_score <= 5:
-                return 'medium'
-            elif risk_score <= 8:
-                return 'high'
-            else:
-                return 'critical'
-
-        # Generate samples
-        for _ in range(n_samples):
-            weather = np.random.choice(risk_factors['weather_risk'])
-            terrain = np.random.choice(risk_factors['terrain_type'])
-            time = np.random.choice(risk_factors['time_of_day'])
-            season = np.random.choice(risk_factors['season'])
-            experience = np.random.choice(risk_factors['tourist_experience'])
-            group_size = np.random.choice(risk_factors['group_size'])
-            has_guide = np.random.choice(risk_factors['has_guide'])
-            emergency_equipment = np.random.choice(risk_factors['emergency_equipment'])
-
-            risk_level = calculate_risk_level(
-                weather, terrain, time, season, experience, 
-                group_size, has_guide, emergency_equipment
-            )
-
-            # Add some additional numerical features
-            elevation = np.random.normal(1000, 500) if terrain == 'mountain' else np.random.normal(100, 50)
-            temperature = np.random.normal(25, 10)
-            humidity = np.random.normal(70, 20)
-
-            data.append([
-                weather, terrain, time, season, experience, group_size,
-                has_guide, emergency_equipment, elevation, temperature,
-                humidity, risk_level
-            ])
-
-        df = pd.DataFrame(data, columns=[
-            'weather_risk', 'terrain_type', 'time_of_day', 'season',
-            'tourist_experience', 'group_size', 'has_guide',
-            'emergency_equipment', 'elevation', 'temperature',
-            'humidity', 'risk_level'
-        ])
-
-        return df
-
-    def train(self, df):
+        return pd.DataFrame({
+            **columns,
+            'group_size': group_size,
+            'has_guide': has_guide,
+            'emergency_equipment': emergency_equipment,
+            'elevation': elevation,
+            'temperature': temperature,
+            'humidity': humidity,
+            'risk_level': risk_level
+        }, copy=False)
+
+    def train(self, df, verbose=True):
         """Train the risk assessment model"""
         # Encode categorical variables
-        categorical_cols = ['weather_risk', 'terrain_type', 'time_of_day', 'season', 'tourist_experience']
-
         df_encoded = df.copy()
 
-        for col in categorical_cols:
+        for col in CATEGORICAL_COLUMNS:
             encoder = LabelEncoder()
             df_encoded[f'{col}_encoded'] = encoder.fit_transform(df[col])
             self.encoders[col] = encoder
 
-        # Features and target
-        feature_cols = [
-            'weather_risk_encoded', 'terrain_type_encoded', 'time_of_day_encoded',
-            'season_encoded', 'tourist_experience_encoded', 'group_size',
-            'has_guide', 'emergency_equipment', 'elevation', 'temperature', 'humidity'
-        ]
+        self.build_lookup_tables()
 
-        X = df_encoded[feature_cols]
+        # Features and target
+        X = df_encoded[FEATURE_COLUMNS]
         y = df_encoded['risk_level']
 
         # Train-test split
@@ -139,12 +130,11 @@ class TouristRiskAssessment:
         )
 
         # Scale numerical features
-        numerical_cols = ['group_size', 'elevation', 'temperature', 'humidity']
         X_train_scaled = X_train.copy()
         X_test_scaled = X_test.copy()
 
-        X_train_scaled[numerical_cols] = self.scaler.fit_transform(X_train[numerical_cols])
-        X_test_scaled[numerical_cols] = self.scaler.transform(X_test[numerical_cols])
+        X_train_scaled[NUMERICAL_COLUMNS] = self.scaler.fit_transform(X_train[NUMERICAL_COLUMNS])
+        X_test_scaled[NUMERICAL_COLUMNS] = self.scaler.transform(X_test[NUMERICAL_COLUMNS])
 
         # Train model
         self.risk_model.fit(X_train_scaled, y_train)
@@ -153,68 +143,124 @@ class TouristRiskAssessment:
         train_score = self.risk_model.score(X_train_scaled, y_train)
         test_score = self.risk_model.score(X_test_scaled, y_test)
 
-        print(f"Training completed!")
-        print(f"Train accuracy: {train_score:.3f}")
-        print(f"Test accuracy: {test_score:.3f}")
+        # Cross-validation (folds run in parallel when n_jobs is set)
+        cv_scores = cross_val_score(self.risk_model, X_train_scaled, y_train, cv=5, n_jobs=self.n_jobs)
+
+        self.evaluation = {
+            'train_accuracy': float(train_score),
+            'accuracy': float(test_score),
+            'cv_accuracy': float(cv_scores.mean()),
+            'cv_std': float(cv_scores.std())
+        }
 
-        # Cross-validation
-        cv_scores = cross_val_score(self.risk_model, X_train_scaled, y_train, cv=5)
-        print(f"CV accuracy: {cv_scores.mean():.3f} (+/- {cv_scores.std() * 2:.3f})")
+        if verbose:
+            print(f"Training completed!")
+            print(f"Train accuracy: {train_score:.3f}")
+            print(f"Test accuracy: {test_score:.3f}")
+            print(f"CV accuracy: {cv_scores.mean():.3f} (+/- {cv_scores.std() * 2:.3f})")
 
-        # Feature importance
-        feature_importance = pd.DataFrame({
-            'feature': feature_cols,
-            'importance': self.risk_model.feature_importances_
-        }).sort_values('importance', ascending=False)
+            # Feature importance
+            feature_importance = pd.DataFrame({
+                'feature': FEATURE_COLUMNS,
+                'importance': self.risk_model.feature_importances_
+            }).sort_values('importance', ascending=False)
 
-        print("\nTop 5 Important Features:")
-        print(feature_importance.head())
+            print("\nTop 5 Important Features:")
+            print(feature_importance.head())
 
         return self
 
-    def predict_risk(self, conditions):
+    def build_lookup_tables(self):
+        """Precompute label -> code tables so inference skips LabelEncoder.transform"""
+        self.category_codes = {
+            col: {label: code for code, label in enumerate(encoder.classes_)}
+            for col, encoder in self.encoders.items()
+        }
+        return self
+
+    def raw_value_limits(self):
+        """{numeric input: (low, high)} outside which a value overflows float32 in the trees"""
+        largest = float(np.finfo(np.float32).max)
+        limits = {col: (-largest, largest) for col in RAW_NUMERIC_COLUMNS}
+        for k, col in enumerate(NUMERICAL_COLUMNS):
+            mean, scale = float(self.scaler.mean_[k]), float(self.scaler.scale_[k])
+            limits[col] = (mean - scale * largest, mean + scale * largest)
+        return limits
+
+    def predict_risk(self, conditions, stage_timings=None):
         """Predict risk level for given conditions"""
-        # Convert to DataFrame
         if isinstance(conditions, dict):
-            df = pd.DataFrame([conditions])
-        else:
-            df = pd.DataFrame(conditions)
+            conditions = [conditions]
 
-        # Encode categorical variables
-        df_encoded = df.copy()
-        categorical_cols = ['weather_risk', 'terrain_type', 'time_of_day', 'season', 'tourist_experience']
+        return self.predict_risk_batch(conditions, stage_timings=stage_timings)[0]
 
-        for col in categorical_cols:
-            if col in df.columns and col in self.encoders:
-                df_encoded[f'{col}_encoded'] = self.encoders[col].transform(df[col])
+    def build_features(self, conditions_list):
+        """Unscaled model input matrix for a list of conditions dicts or a DataFrame"""
+        if isinstance(conditions_list, pd.DataFrame):
+            columns = {col: conditions_list[col].to_numpy() for col in conditions_list.columns}
+        else:
+            columns = {col: [conditions[col] for conditions in conditions_list]
+                       for col in CATEGORICAL_COLUMNS + RAW_NUMERIC_COLUMNS}
+
+        # Fill a preallocated matrix in FEATURE_COLUMNS order, encoding
+        # categoricals through the lookup tables
+        X = np.empty((len(conditions_list), len(FEATURE_COLUMNS)), dtype=np.float64)
+        for j, col in enumerate(CATEGORICAL_COLUMNS):
+            codes = self.category_codes[col]
+            try:
+                X[:, j] = [codes[value] for value in columns[col]]
+            except KeyError as e:
+                raise ValueError(f"y contains previously unseen labels: {e} ({col})")
+
+        for j, col in enumerate(RAW_NUMERIC_COLUMNS, start=len(CATEGORICAL_COLUMNS)):
+            X[:, j] = columns[col]
+
+        return X
+
+    def scale_features(self, X):
+        """Scale numerical features in place (same arithmetic as StandardScaler.transform)"""
+        for k, col in enumerate(NUMERICAL_COLUMNS):
+            j = FEATURE_COLUMNS.index(col)
+            X[:, j] -= self.scaler.mean_[k]
+            X[:, j] /= self.scaler.scale_[k]
+        return X
+
+    def predict_risk_batch(self, conditions_list, stage_timings=None):
+        """Predict risk levels for many sets of conditions with one model call"""
+        if len(conditions_list) == 0:
+            return []
+
+        start = time.perf_counter()
+        X = self.build_features(conditions_list)
+        features_done = time.perf_counter()
+        self.scale_features(X)
+        scaling_done = time.perf_counter()
+
+        # Predict; RandomForestClassifier.predict is the argmax of predict_proba
+        if self.compiled_model is not None:
+            probabilities = self.compiled_model.predict_proba(X)
+            classes = self.compiled_model.classes_
+        else:
+            probabilities = self.risk_model.predict_proba(pd.DataFrame(X, columns=FEATURE_COLUMNS, copy=False))
+            classes = self.risk_model.classes_
+        predictions = classes.take(np.argmax(probabilities, axis=1))
+        confidences = probabilities.max(axis=1)
 
-        # Prepare features
-        feature_cols = [
-            'weather_risk_encoded', 'terrain_type_encoded', 'time_of_day_encoded',
-            'season_encoded', 'tourist_experience_encoded', 'group_size',
-            'has_guide', 'emergency_equipment', 'elevation', 'temperature', 'humidity'
+        # Get probability for each class
+        results = [
+            {
+                'risk_level': prediction,
+                'probabilities': {cls: prob for cls, prob in zip(classes, row_probabilities)},
+                'confidence': confidence
+            }
+            for prediction, row_probabilities, confidence in zip(predictions, probabilities, confidences)
         ]
 
-        X = df_encoded[feature_cols]
-
-        # Scale numerical features
-        numerical_cols = ['group_size', 'elevation', 'temperature', 'humidity']
-        X_scaled = X.copy()
-        X_scaled[numerical_cols] = self.scaler.transform(X[numerical_cols])
-
-        # Predict
-        prediction = self.risk_model.predict(X_scaled)[0]
-        probabilities = self.risk_model.predict_proba(X_scaled)[0]
-
-        # Get probability for each class
-        classes = self.risk_model.classes_
-        prob_dict = {cls: prob for cls, prob in zip(classes, probabilities)}
+        add_stage_time(stage_timings, 'risk_features', features_done - start)
+        add_stage_time(stage_timings, 'risk_scaling', scaling_done - features_done)
+        add_stage_time(stage_timings, 'risk_inference', time.perf_counter() - scaling_done)
 
-        return {
-            'risk_level': prediction,
-            'probabilities': prob_dict,
-            'confidence': max(probabilities)
-        }
+        return results
 
     def save_model(self, filepath):
         """Save the trained model"""
@@ -226,11 +272,51 @@ class TouristRiskAssessment:
         joblib.dump(model_data, filepath)
         print(f"Risk assessment model saved to {filepath}")
 
-    def load_model(self, filepath):
+    def export_artifact(self, filepath):
+        """Save the model as a compact artifact (see model_artifact.py)"""
+        compiled = self.compiled_model or CompiledRandomForest.from_estimator(self.risk_model)
+        forest_meta, arrays = compiled.to_artifact()
+        meta = {
+            'categories': {col: [str(label) for label in encoder.classes_] for col, encoder in self.encoders.items()},
+            'forest': forest_meta
+        }
+        arrays['scaler_mean'] = self.scaler.mean_
+        arrays['scaler_scale'] = self.scaler.scale_
+        write_artifact(filepath, 'risk', meta, arrays)
+        print(f"Risk assessment model artifact saved to {filepath}")
+
+    def load_artifact(self, filepath, mmap=True):
+        """Load a compact artifact; arrays are memory-mapped unless mmap=False"""
+        meta, arrays = read_artifact(filepath, kind='risk', mmap=mmap)
+
+        self.encoders = {}
+        for col, labels in meta['categories'].items():
+            encoder = LabelEncoder()
+            encoder.classes_ = np.array(labels, dtype=object)
+            self.encoders[col] = encoder
+
+        self.scaler = StandardScaler()
+        self.scaler.mean_ = arrays['scaler_mean']
+        self.scaler.scale_ = arrays['scaler_scale']
+
+        # Inference only; retraining needs the joblib model
+        self.compiled_model = CompiledRandomForest.from_artifact(meta['forest'], arrays)
+        self.risk_model = None
+        self.build_lookup_tables()
+        return self
+
+    def load_model(self, filepath, mmap_mode=None):
         """Load the trained model"""
-        model_data = joblib.load(filepath)
+        if is_artifact(filepath):
+            self.load_artifact(filepath, mmap=mmap_mode is not None)
+            print(f"Risk assessment model loaded from {filepath}")
+            return self
+
+        model_data = joblib.load(filepath, mmap_mode=mmap_mode)
         self.risk_model = model_data['risk_model']
+        self.compiled_model = None
         self.scaler = model_data['scaler']
         self.encoders = model_data['encoders']
+        self.build_lookup_tables()
         print(f"Risk assessment model loaded from {filepath}")
         return self
\ No newline at end of file
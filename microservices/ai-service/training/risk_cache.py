@@ -0,0 +1,124 @@
+# training/risk_cache.py
+import threading
+from collections import OrderedDict
+
+from risk_assessment import CATEGORICAL_COLUMNS
+
+# Inputs that are already small integers and go into the key as-is
+DISCRETE_COLUMNS = ['group_size', 'has_guide', 'emergency_equipment']
+
+# Quantization step per continuous input; 0 or None keys on the exact value.
+# Exact by default, so a cached prediction always matches the model. Snapping
+# (e.g. 'elevation=10,temperature=0.5,humidity=1') raises the hit rate but
+# answers nearby inputs with the snapped point's prediction; it is opt-in.
+DEFAULT_QUANTIZATION = {
+    'elevation': 0,
+    'temperature': 0,
+    'humidity': 0
+}
+
+def parse_quantization(spec):
+    """Parse 'elevation=10,temperature=0.5' into a quantization dict"""
+    quantization = dict(DEFAULT_QUANTIZATION)
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        name, _, step = item.partition('=')
+        if name not in DEFAULT_QUANTIZATION:
+            raise ValueError(f"Unknown quantized field: {name}")
+        quantization[name] = float(step)
+    return quantization
+
+class CachedRiskAssessment:
+    """Bounded LRU cache in front of TouristRiskAssessment.
+
+    The key is the categorical tuple, the small integer inputs and the
+    continuous inputs, snapped to their quantization step if one is set.
+    Misses are scored on the snapped values, so a cached entry is exactly
+    what the model returns for its key no matter which request filled it.
+    """
+
+    def __init__(self, risk_assessor, max_size=4096, quantization=None):
+        self.risk_assessor = risk_assessor
+        self.max_size = max_size
+        self.quantization = dict(DEFAULT_QUANTIZATION if quantization is None else quantization)
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Everything else (encoders, category_codes, ...) comes from the model
+        if name == 'risk_assessor':
+            raise AttributeError(name)
+        return getattr(self.risk_assessor, name)
+
+    def _quantize(self, conditions):
+        """Return (cache key, conditions with continuous values snapped)"""
+        quantized = dict(conditions)
+        for col, step in self.quantization.items():
+            value = float(conditions[col])
+            quantized[col] = round(value / step) * step if step else value
+
+        key = (
+            tuple(conditions[col] for col in CATEGORICAL_COLUMNS)
+            + tuple(float(conditions[col]) for col in DISCRETE_COLUMNS)
+            + tuple(quantized[col] for col in self.quantization)
+        )
+        return key, quantized
+
+    def predict_risk(self, conditions, stage_timings=None):
+        """Predict risk level for given conditions, using the cache"""
+        return self.predict_risk_batch([conditions], stage_timings=stage_timings)[0]
+
+    def predict_risk_batch(self, conditions_list, stage_timings=None):
+        """Predict risk levels for many conditions, scoring only cache misses"""
+        keyed = [self._quantize(conditions) for conditions in conditions_list]
+        results = [None] * len(keyed)
+        pending = OrderedDict()
+
+        with self._lock:
+            for i, (key, quantized) in enumerate(keyed):
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    results[i] = cached
+                else:
+                    self.misses += 1
+                    pending.setdefault(key, (quantized, []))[1].append(i)
+
+        if pending:
+            # Score each distinct miss once, outside the lock
+            predictions = self.risk_assessor.predict_risk_batch(
+                [quantized for quantized, _ in pending.values()], stage_timings=stage_timings)
+
+            with self._lock:
+                for (key, (_, indices)), prediction in zip(pending.items(), predictions):
+                    for i in indices:
+                        results[i] = prediction
+                    self._cache[key] = prediction
+                    self._cache.move_to_end(key)
+
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+
+        # Callers annotate results, so never hand out the cached dicts themselves
+        return [dict(result, probabilities=dict(result['probabilities'])) for result in results]
+
+    def stats(self):
+        """Cache size and hit/miss counters"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._cache),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+    def clear(self):
+        """Drop all cached predictions and reset the counters"""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
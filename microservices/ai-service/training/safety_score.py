@@ -0,0 +1,147 @@
+# training/safety_score.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from anomaly_detection import RAW_FEATURE_COLUMNS
+from metrics import add_stage_time
+
+# Defaults for fields missing from a safety score request
+ANOMALY_DEFAULTS = {
+    'hour': 12,
+    'speed_kmh': 3,
+    'distance_from_entry_km': 5,
+    'battery_level': 80,
+    'gps_accuracy_m': 10,
+    'risk_zone_distance_km': 5,
+    'days_since_entry': 1
+}
+
+RISK_DEFAULTS = {
+    'weather_risk': 'clear',
+    'terrain_type': 'urban',
+    'time_of_day': 'afternoon',
+    'season': 'spring',
+    'tourist_experience': 'intermediate',
+    'group_size': 2,
+    'has_guide': 0,
+    'emergency_equipment': 0,
+    'elevation': 100,
+    'temperature': 25,
+    'humidity': 70
+}
+
+# Score deductions
+ANOMALY_PENALTY = 30
+RISK_PENALTIES = {'low': 0, 'medium': 15, 'high': 35, 'critical': 60}
+LOW_BATTERY_PENALTY = 10
+POOR_GPS_PENALTY = 5
+NEAR_RISK_ZONE_PENALTY = 15
+
+# Column positions in the raw anomaly matrix
+BATTERY = RAW_FEATURE_COLUMNS.index('battery_level')
+GPS_ACCURACY = RAW_FEATURE_COLUMNS.index('gps_accuracy_m')
+RISK_ZONE_DISTANCE = RAW_FEATURE_COLUMNS.index('risk_zone_distance_km')
+
+class SafetyScoreEngine:
+    """Fused anomaly + risk scoring behind /analyze/safety-score.
+
+    Each request is parsed once into a row of the raw anomaly matrix and a
+    risk conditions dict, both models score the whole batch in one call each
+    (concurrently when max_workers > 1; sklearn releases the GIL while
+    predicting) and the penalty rules are applied as array operations.
+    """
+
+    def __init__(self, anomaly_detector, risk_assessor, max_workers=0):
+        self.anomaly_detector = anomaly_detector
+        self.risk_assessor = risk_assessor
+        self.executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+
+    def close(self):
+        """Release the worker threads; requests still in flight finish sequentially"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    def parse(self, data_list):
+        """Split requests into the raw anomaly matrix and risk conditions"""
+        raw = np.empty((len(data_list), len(RAW_FEATURE_COLUMNS)), dtype=np.float64)
+        risk_conditions = []
+
+        for i, data in enumerate(data_list):
+            raw[i] = [data.get(col, ANOMALY_DEFAULTS[col]) for col in RAW_FEATURE_COLUMNS]
+            risk_conditions.append({col: data.get(col, default) for col, default in RISK_DEFAULTS.items()})
+
+        return raw, risk_conditions
+
+    def score(self, data, stage_timings=None):
+        """Calculate the safety score for a single request"""
+        return self.score_batch([data], stage_timings=stage_timings)[0]
+
+    def score_batch(self, data_list, stage_timings=None):
+        """Calculate safety scores for many requests"""
+        if not data_list:
+            return []
+
+        start = time.perf_counter()
+        raw, risk_conditions = self.parse(data_list)
+        add_stage_time(stage_timings, 'safety_parse', time.perf_counter() - start)
+
+        # The two models record different stage names, so sharing the dict
+        # across threads is safe
+        anomaly_future = None
+        if self.executor is not None:
+            try:
+                anomaly_future = self.executor.submit(self.anomaly_detector.score_raw, raw, stage_timings)
+            except RuntimeError:
+                # Closed by a model reload while this request held the old bundle
+                anomaly_future = None
+
+        if anomaly_future is not None:
+            risk_results = self.risk_assessor.predict_risk_batch(risk_conditions, stage_timings=stage_timings)
+            is_anomaly, confidence, _ = anomaly_future.result()
+        else:
+            is_anomaly, confidence, _ = self.anomaly_detector.score_raw(raw, stage_timings=stage_timings)
+            risk_results = self.risk_assessor.predict_risk_batch(risk_conditions, stage_timings=stage_timings)
+
+        rules_start = time.perf_counter()
+
+        risk_levels = [result['risk_level'] for result in risk_results]
+
+        low_battery = raw[:, BATTERY] < 20
+        poor_gps = raw[:, GPS_ACCURACY] > 50
+        near_risk_zone = raw[:, RISK_ZONE_DISTANCE] < 1
+
+        # Calculate composite safety score (0-100), deducting in the same order
+        # as the per-request rules so the floats come out identical
+        scores = np.full(len(data_list), 100.0)
+        scores -= np.where(is_anomaly, ANOMALY_PENALTY * confidence, 0.0)
+        scores -= np.array([RISK_PENALTIES.get(level, 0) for level in risk_levels], dtype=np.float64)
+        scores -= LOW_BATTERY_PENALTY * low_battery
+        scores -= POOR_GPS_PENALTY * poor_gps
+        scores -= NEAR_RISK_ZONE_PENALTY * near_risk_zone
+        scores = np.clip(scores, 0, 100).astype(int)
+
+        results = [
+            {
+                'safety_score': int(scores[i]),
+                'risk_level': risk_levels[i],
+                'anomaly_detected': bool(is_anomaly[i]),
+                'anomaly_confidence': float(confidence[i]),
+                'risk_probabilities': risk_results[i]['probabilities'],
+                'factors': {
+                    'behavior_anomaly': bool(is_anomaly[i]),
+                    'environmental_risk': risk_levels[i],
+                    'technical_issues': {
+                        'low_battery': bool(low_battery[i]),
+                        'poor_gps': bool(poor_gps[i]),
+                        'near_risk_zone': bool(near_risk_zone[i])
+                    }
+                }
+            }
+            for i in range(len(data_list))
+        ]
+
+        add_stage_time(stage_timings, 'safety_rules', time.perf_counter() - rules_start)
+
+        return results
@@ -0,0 +1,113 @@
+# training/structured_logging.py
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# Bounded so a slow log sink can't grow memory; overflow is dropped and counted
+LOG_QUEUE_SIZE = 10000
+
+_listener = None
+
+class JsonLineFormatter(logging.Formatter):
+    """One compact JSON object per record.
+
+    Records logged with extra={'event': ..., 'fields': {...}} put the fields at
+    the top level; anything else is logged under 'msg'.
+    """
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name
+        }
+
+        fields = getattr(record, 'fields', None)
+        if fields is not None:
+            entry['event'] = getattr(record, 'event', record.msg)
+            entry.update(fields)
+        else:
+            entry['msg'] = record.getMessage()
+
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, separators=(',', ':'), default=_json_default)
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that defers all formatting to the listener thread and
+    drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The listener's handler formats the record; the caller only enqueues it
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def configure_logging(structured=False, level=logging.INFO):
+    """Set up root logging: plain text, or JSON lines written on a background thread.
+
+    Call again in each forked worker; threads don't survive fork, so the
+    child gets its own queue and listener.
+    """
+    global _listener
+
+    root = logging.getLogger()
+    root.setLevel(level)
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+
+    if not structured:
+        stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+        root.addHandler(stream_handler)
+        return
+
+    stream_handler.setFormatter(JsonLineFormatter())
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    root.addHandler(DroppingQueueHandler(log_queue))
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+def dropped_records():
+    """Records dropped because the log queue was full"""
+    return sum(getattr(handler, 'dropped', 0) for handler in logging.getLogger().handlers)
+
+class PredictionLogSampler:
+    """Decides which successful predictions get logged; flagged ones always do"""
+
+    def __init__(self, sample_rate=1.0):
+        self.sample_rate = sample_rate
+
+    def should_log(self, flagged=False):
+        return flagged or self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+def _json_default(value):
+    # numpy scalars and anything else json can't handle natively
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+@atexit.register
+def _flush_on_exit():
+    if _listener is not None:
+        _listener.stop()
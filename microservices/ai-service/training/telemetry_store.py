@@ -0,0 +1,169 @@
+# training/telemetry_store.py
+import fcntl
+import logging
+import os
+import threading
+
+import numpy as np
+
+from anomaly_detection import RAW_FEATURE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Header: magic, capacity, n_features, rows written so far (int64 each)
+STORE_MAGIC = 0x544C4D31  # 'TLM1'
+HEADER_FIELDS = 4
+HEADER_BYTES = HEADER_FIELDS * 8
+
+class TelemetryRingStore:
+    """Fixed-size on-disk ring of raw anomaly readings (float32, RAW_FEATURE_COLUMNS order).
+
+    The file is memory-mapped and shared: writers and readers in different
+    processes coordinate with flock, and once full the oldest rows are
+    overwritten. Open it after forking; flock locks are shared by processes
+    that inherit the same file descriptor.
+    """
+
+    def __init__(self, path, capacity=1000000, n_features=len(RAW_FEATURE_COLUMNS)):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        with self._locked(fcntl.LOCK_EX):
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, HEADER_BYTES + capacity * n_features * 4)
+                header = np.memmap(path, dtype=np.int64, mode='r+', shape=(HEADER_FIELDS,))
+                header[:] = [STORE_MAGIC, capacity, n_features, 0]
+                header.flush()
+            else:
+                header = np.memmap(path, dtype=np.int64, mode='r+', shape=(HEADER_FIELDS,))
+                if header[0] != STORE_MAGIC:
+                    raise ValueError(f"{path} is not a telemetry store")
+
+        self._header = header
+        self.capacity = int(header[1])
+        self.n_features = int(header[2])
+        self._rows = np.memmap(path, dtype=np.float32, mode='r+', offset=HEADER_BYTES,
+                               shape=(self.capacity, self.n_features))
+
+    @classmethod
+    def open(cls, path):
+        """Open an existing store with whatever capacity it was created with"""
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"No telemetry store at {path}")
+        return cls(path)
+
+    def _locked(self, operation):
+        return _FileLock(self._fd, operation)
+
+    def __len__(self):
+        return int(min(self._header[3], self.capacity))
+
+    @property
+    def total_written(self):
+        return int(self._header[3])
+
+    def append(self, rows):
+        """Write rows after the newest ones, overwriting the oldest when full"""
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, self.n_features)
+        n_rows = len(rows)
+        if n_rows > self.capacity:
+            rows = rows[-self.capacity:]
+
+        with self._locked(fcntl.LOCK_EX):
+            written = int(self._header[3])
+            # Rows beyond capacity would have been overwritten anyway
+            start = (written + n_rows - len(rows)) % self.capacity
+            first = min(len(rows), self.capacity - start)
+            self._rows[start:start + first] = rows[:first]
+            self._rows[:len(rows) - first] = rows[first:]
+            self._header[3] = written + n_rows
+
+    def window(self, n_rows=None):
+        """Copy of the newest n_rows rows (all stored rows by default), oldest first"""
+        with self._locked(fcntl.LOCK_SH):
+            written = int(self._header[3])
+            count = min(written, self.capacity)
+            if n_rows is not None:
+                count = min(count, n_rows)
+
+            end = written % self.capacity
+            start = end - count
+            if start >= 0:
+                window = self._rows[start:end]
+            else:
+                window = np.concatenate([self._rows[start:], self._rows[:end]])
+
+            return np.array(window, dtype=np.float64)
+
+    def flush(self):
+        self._rows.flush()
+        self._header.flush()
+
+    def close(self):
+        self.flush()
+        os.close(self._fd)
+
+class _FileLock:
+    def __init__(self, fd, operation):
+        self.fd = fd
+        self.operation = operation
+
+    def __enter__(self):
+        fcntl.flock(self.fd, self.operation)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+class TelemetryRecorder:
+    """Buffers readings on the request path and writes them to the ring store
+    from a background thread, so serving never waits on the disk."""
+
+    def __init__(self, path, capacity=1000000, flush_interval=1.0, max_pending=100000):
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._store = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, rows):
+        """Queue rows of raw readings (RAW_FEATURE_COLUMNS order)"""
+        with self._lock:
+            if len(self._pending) + len(rows) > self.max_pending:
+                self.dropped += len(rows)
+                return
+            self._pending.extend(rows)
+
+    def start(self):
+        """Open the store and start the flush thread (call after forking)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._store = TelemetryRingStore(self.path, capacity=self.capacity)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='telemetry-recorder', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        if pending and self._store is not None:
+            self._store.append(pending)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Telemetry flush failed: {str(e)}")
@@ -0,0 +1,204 @@
+# training/train.py
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import pickle
+import resource
+import time
+from pathlib import Path
+
+from anomaly_detection import TouristAnomalyDetector, RAW_FEATURE_COLUMNS
+from risk_assessment import TouristRiskAssessment
+from model_registry import ANOMALY_MODEL_FILE, ANOMALY_ARTIFACT_FILE, RISK_MODEL_FILE, RISK_ARTIFACT_FILE
+
+MODEL_KINDS = ['anomaly', 'risk']
+MODEL_FILES = {'anomaly': ANOMALY_MODEL_FILE, 'risk': RISK_MODEL_FILE}
+ARTIFACT_FILES = {'anomaly': ANOMALY_ARTIFACT_FILE, 'risk': RISK_ARTIFACT_FILE}
+DEFAULT_SAMPLES = {'anomaly': 10000, 'risk': 5000}
+
+# Hyperparameters each model accepts, with the values used when none are given
+DEFAULT_PARAMS = {
+    'anomaly': {'n_estimators': [100], 'max_samples': ['auto'], 'contamination': [0.1]},
+    'risk': {'n_estimators': [100], 'max_depth': [None], 'max_samples': [None]}
+}
+
+# Grid used by --sweep
+SWEEP_PARAMS = {
+    'anomaly': {'n_estimators': [25, 50, 100, 200], 'max_samples': ['auto', 128, 512], 'contamination': [0.05, 0.1]},
+    'risk': {'n_estimators': [25, 50, 100, 200], 'max_depth': [None, 8, 16], 'max_samples': [None, 0.5]}
+}
+
+# Rows scored to measure inference latency
+LATENCY_ROWS = 2000
+
+def build_model(kind, params, n_jobs):
+    if kind == 'anomaly':
+        return TouristAnomalyDetector(n_jobs=n_jobs, **params)
+    return TouristRiskAssessment(n_jobs=n_jobs, **params)
+
+def create_training_data(model, kind, n_samples, seed):
+    if kind == 'anomaly':
+        return model.create_synthetic_training_data(n_samples=n_samples, seed=seed)
+    return model.create_risk_training_data(n_samples=n_samples, seed=seed)
+
+def measure_latency(model, kind, seed):
+    """Held-out accuracy (anomaly only) and batch inference time per row in microseconds"""
+    validation = create_training_data(model, kind, LATENCY_ROWS, seed + 1)
+
+    if kind == 'anomaly':
+        raw = validation[RAW_FEATURE_COLUMNS].to_numpy(dtype='float64')
+        start = time.perf_counter()
+        is_anomaly, _, _ = model.score_raw(raw)
+        elapsed = time.perf_counter() - start
+        accuracy = float((is_anomaly == validation['is_anomaly'].to_numpy()).mean())
+    else:
+        conditions = validation.drop(columns='risk_level').to_dict('records')
+        start = time.perf_counter()
+        model.predict_risk_batch(conditions)
+        elapsed = time.perf_counter() - start
+        accuracy = None
+
+    return accuracy, elapsed / LATENCY_ROWS * 1e6
+
+def train_config(kind, params, n_samples, seed, n_jobs):
+    """Train one configuration and return its measurements"""
+    model = build_model(kind, params, n_jobs)
+    df = create_training_data(model, kind, n_samples, seed)
+
+    start = time.perf_counter()
+    model.train(df, verbose=False)
+    fit_seconds = time.perf_counter() - start
+
+    validation_accuracy, latency_us = measure_latency(model, kind, seed)
+    fitted = model.isolation_forest if kind == 'anomaly' else model.risk_model
+
+    result = {
+        'kind': kind,
+        'params': params,
+        'fit_seconds': round(fit_seconds, 3),
+        'predict_us_per_row': round(latency_us, 2),
+        # ru_maxrss is in KB on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'model_bytes': len(pickle.dumps(fitted, protocol=pickle.HIGHEST_PROTOCOL)),
+        **model.evaluation
+    }
+    if validation_accuracy is not None:
+        # IsolationForest is fit on normal rows only; score it on unseen data
+        result['train_accuracy'] = result['accuracy']
+        result['accuracy'] = validation_accuracy
+
+    return model, result
+
+def _run_task(task):
+    _, result = train_config(*task)
+    return result
+
+def expand_grid(grid):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def run_sweep(kind, grid, n_samples, seed, jobs):
+    """Train every configuration in the grid, one process per configuration"""
+    tasks = [(kind, params, n_samples, seed, 1) for params in expand_grid(grid)]
+
+    # A fresh process per configuration keeps peak memory per configuration
+    with multiprocessing.Pool(processes=min(jobs, len(tasks)), maxtasksperchild=1) as pool:
+        results = []
+        for result in pool.imap_unordered(_run_task, tasks):
+            print(format_result(result))
+            results.append(result)
+
+    return results
+
+def select_best(results, accuracy_floor):
+    """Fastest configuration meeting the accuracy floor (most accurate if none do)"""
+    eligible = [result for result in results if result['accuracy'] >= accuracy_floor]
+    if not eligible:
+        print(f"No configuration reached accuracy {accuracy_floor}; picking the most accurate")
+        return max(results, key=lambda result: result['accuracy'])
+    return min(eligible, key=lambda result: (result['predict_us_per_row'], result['fit_seconds']))
+
+def format_result(result):
+    params = ' '.join(f"{name}={value}" for name, value in result['params'].items())
+    return (f"[{result['kind']}] {params}: accuracy {result['accuracy']:.3f}, "
+            f"fit {result['fit_seconds']:.2f}s, predict {result['predict_us_per_row']:.1f}us/row, "
+            f"{result['model_bytes'] / 1e6:.1f}MB, peak {result['peak_rss_mb']:.0f}MB")
+
+def parse_values(text):
+    """Parse a comma-separated list such as 'none,8,16' or 'auto,0.5'"""
+    values = []
+    for item in text.split(','):
+        item = item.strip()
+        if item.lower() == 'none':
+            values.append(None)
+        elif item == 'auto':
+            values.append(item)
+        elif item.isdigit():
+            values.append(int(item))
+        else:
+            values.append(float(item))
+    return values
+
+def build_grid(kind, args):
+    grid = {name: list(values) for name, values in (SWEEP_PARAMS if args.sweep else DEFAULT_PARAMS)[kind].items()}
+    for name in grid:
+        override = getattr(args, name)
+        if override is not None:
+            grid[name] = parse_values(override)
+    return grid
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the AI service models, optionally sweeping hyperparameters")
+    parser.add_argument('model', nargs='?', choices=MODEL_KINDS + ['all'], default='all')
+    parser.add_argument('--samples', type=int, help="training rows (default 10000 anomaly, 5000 risk)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="worker processes / cores to use")
+    parser.add_argument('--sweep', action='store_true', help="sweep the built-in hyperparameter grid")
+    parser.add_argument('--n-estimators', dest='n_estimators')
+    parser.add_argument('--max-depth', dest='max_depth', help="risk model only")
+    parser.add_argument('--max-samples', dest='max_samples')
+    parser.add_argument('--contamination', help="anomaly model only")
+    parser.add_argument('--accuracy-floor', type=float, default=0.0,
+                        help="pick the fastest configuration with at least this accuracy")
+    parser.add_argument('--output-dir', default='models', help="where the chosen models are saved")
+    parser.add_argument('--report', help="write every configuration's measurements to this JSON file")
+    parser.add_argument('--compact', action='store_true', help="also export compact .tsm artifacts")
+    args = parser.parse_args(argv)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    report = {}
+
+    for kind in MODEL_KINDS if args.model == 'all' else [args.model]:
+        n_samples = args.samples or DEFAULT_SAMPLES[kind]
+        grid = build_grid(kind, args)
+        configs = expand_grid(grid)
+
+        if len(configs) == 1:
+            # Single configuration: let the model and CV folds use every core
+            print(f"Training {kind} model on {n_samples} samples...")
+            model, best = train_config(kind, configs[0], n_samples, args.seed, args.jobs)
+            print(format_result(best))
+            results = [best]
+        else:
+            print(f"Sweeping {len(configs)} {kind} configurations on {n_samples} samples...")
+            results = run_sweep(kind, grid, n_samples, args.seed, args.jobs)
+            best = select_best(results, args.accuracy_floor)
+            print(f"Selected: {format_result(best)}")
+            # Refit the chosen configuration using every core
+            model, _ = train_config(kind, best['params'], n_samples, args.seed, args.jobs)
+
+        model.save_model(str(output_dir / MODEL_FILES[kind]))
+        if args.compact:
+            model.export_artifact(str(output_dir / ARTIFACT_FILES[kind]))
+        report[kind] = {'selected': best, 'results': results}
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+# wsgi.py
+from api.ai_service_api import app, load_models
+
+# Load models at import time; with preload_app the gunicorn master does this
+# once before forking, so every worker shares the loaded models
+load_models()